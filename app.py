@@ -1,8 +1,39 @@
+import hashlib
+
 import streamlit as st
 
-from ui import render_header, render_sidebar
-from generator import generate_question_paper
-from utils import text_to_pdf_bytes
+from ui import render_header, render_search, render_sidebar
+
+# generator, usage_history and utils are imported on first use, so a cold
+# start only pays for Streamlit and the sidebar before the page is served.
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _render_pdf(content_hash: str, title: str, _text: str) -> bytes:
+    """
+    Render a PDF once per distinct text. Keyed by the content hash (the
+    underscore-prefixed text is not hashed by Streamlit) and shared across
+    sessions, so reruns that do not change the paper reuse the bytes.
+    """
+    from utils import text_to_pdf_bytes
+
+    return text_to_pdf_bytes(_text, title=title)
+
+
+@st.cache_resource(show_spinner=False)
+def _usage_history():
+    """
+    The usage history named by QP_HISTORY_PATH (or None), opened once per
+    server process.
+    """
+    from usage_history import UsageHistory
+
+    return UsageHistory.from_env()
+
+
+def _cached_pdf_bytes(text: str, title: str) -> bytes:
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return _render_pdf(content_hash, title, text)
 
 
 def main():
@@ -13,13 +44,21 @@ def main():
 
     render_header()
 
+    # Each rerun picks up edits appended to the bank file's delta log;
+    # cheap when there are none.
+    from question_bank import reload_bank
+
+    reload_bank()
+
     grade, subject, num_mcq, num_short, num_long = render_sidebar()
+    render_search(grade, subject)
 
-    # Initialize session state
-    if "qp_text" not in st.session_state:
-        st.session_state["qp_text"] = ""
-    if "answer_key_text" not in st.session_state:
-        st.session_state["answer_key_text"] = ""
+    # Initialize session state. The paper formats its answer key and PDFs
+    # only when they are first needed; the answer key PDF only once asked
+    # for with "Prepare Answer Key (PDF)".
+    if "paper" not in st.session_state:
+        st.session_state["paper"] = None
+        st.session_state["answer_key_pdf_requested"] = False
 
     st.markdown("### 🟦  Generate Question Paper")
 
@@ -30,55 +69,64 @@ def main():
     )
 
     if generate_clicked:
-        qp_text, answer_key_text = generate_question_paper(
-            grade=grade,
-            subject=subject,
-            num_mcq=num_mcq,
-            num_short=num_short,
-            num_long=num_long,
-        )
-        st.session_state["qp_text"] = qp_text
-        st.session_state["answer_key_text"] = answer_key_text
-
-    qp_text = st.session_state["qp_text"]
-    answer_key_text = st.session_state["answer_key_text"]
+        from generator import generate_from_spec, generate_question_paper, make_paper_spec
+
+        history = _usage_history()
+        if history is not None:
+            # Recency-weighted papers depend on the history, so they have no paper ID.
+            paper = generate_question_paper(
+                grade, subject, num_mcq, num_short, num_long, history=history
+            )
+        else:
+            spec = make_paper_spec(
+                grade=grade,
+                subject=subject,
+                num_mcq=num_mcq,
+                num_short=num_short,
+                num_long=num_long,
+            )
+            paper = generate_from_spec(spec)
+        st.session_state["paper"] = paper
+        st.session_state["answer_key_pdf_requested"] = False
+
+    paper = st.session_state["paper"]
 
     # (B) Question Paper Preview
     st.markdown("### 🟩  Question Paper Preview")
-    if qp_text:
+    if paper is not None:
+        if paper.paper_id:
+            st.caption(f"Paper ID: {paper.paper_id}")
         st.text_area(
             "Question Paper",
-            value=qp_text,
+            value=paper.qp_text,
             height=400,
         )
     else:
         st.info("Generate a question paper to preview it here.")
 
-    # (C) Answer Key Preview
+    # (C) Answer Key Preview, only shown when asked for
     st.markdown("### 🟨  Answer Key Preview")
-    if answer_key_text:
+    show_answer_key = st.checkbox("Show answer key", value=False)
+    if paper is not None and show_answer_key:
         st.text_area(
             "Answer Key",
-            value=answer_key_text,
+            value=paper.answer_key_text,
             height=300,
         )
-    else:
+    elif paper is None:
         st.info("Generate a question paper to view the answer key here.")
 
     # (D) Download Section (4 buttons in a 2x2 grid)
     st.markdown("### 🟧  Download Section")
 
-    if qp_text:
-        qp_txt_bytes = qp_text.encode("utf-8")
-        answer_txt_bytes = answer_key_text.encode("utf-8") if answer_key_text else b""
-
-        qp_pdf_bytes = text_to_pdf_bytes(qp_text, title="Question Paper")
-        answer_pdf_bytes = text_to_pdf_bytes(answer_key_text, title="Answer Key") if answer_key_text else b""
+    if paper is not None:
+        qp_txt_bytes = paper.qp_text.encode("utf-8")
+        qp_pdf_bytes = _cached_pdf_bytes(paper.qp_text, title="Question Paper")
     else:
         qp_txt_bytes = b""
-        answer_txt_bytes = b""
         qp_pdf_bytes = b""
-        answer_pdf_bytes = b""
+
+    answer_txt_bytes = paper.answer_key_text.encode("utf-8") if paper is not None else b""
 
     # Row 1
     col1, col2 = st.columns(2)
@@ -113,14 +161,25 @@ def main():
             use_container_width=True,
         )
     with col4:
-        st.download_button(
-            label="Download Answer Key (PDF)",
-            data=answer_pdf_bytes,
-            file_name="answer_key.pdf",
-            mime="application/pdf",
-            disabled=not bool(answer_pdf_bytes),
-            use_container_width=True,
-        )
+        if paper is not None and not st.session_state["answer_key_pdf_requested"]:
+            st.session_state["answer_key_pdf_requested"] = st.button(
+                "Prepare Answer Key (PDF)",
+                use_container_width=True,
+            )
+        if paper is not None and st.session_state["answer_key_pdf_requested"]:
+            # Cached by _render_pdf, so later reruns reuse the bytes.
+            answer_pdf_bytes = _cached_pdf_bytes(paper.answer_key_text, title="Answer Key")
+        else:
+            answer_pdf_bytes = b""
+        if paper is None or answer_pdf_bytes:
+            st.download_button(
+                label="Download Answer Key (PDF)",
+                data=answer_pdf_bytes,
+                file_name="answer_key.pdf",
+                mime="application/pdf",
+                disabled=not bool(answer_pdf_bytes),
+                use_container_width=True,
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,558 @@
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from records import Question, question_key
+
+
+# Versioned edits to a bank file, without rewriting it.
+#
+# Edits add, retire or modify one question of a grade/subject/type. They
+# are appended to a log next to the bank file ("<bank>.delta"): a header
+# line naming the bank version the log applies to, then one JSON object
+# per edit. Each edit line moves the bank to a new version, a hash of the
+# previous version and the line, so every process that has read the same
+# log agrees on the version. Each grade/subject also keeps the version of
+# the last edit that touched it; paper IDs and per-subject caches use that,
+# so editing one subject leaves papers and caches of the others valid.
+#
+# Running processes pick up new lines with question_bank.reload_bank():
+# only the partitions the edits touch are replaced, and the near-duplicate
+# and search indexes are updated for those partitions only. compact()
+# folds the log into a new bank file that keeps the same versions, and
+# starts an empty log. A partially written last line is left for the next
+# read.
+
+FORMAT_VERSION = 1
+OPS = ("add", "retire", "modify")
+
+# (grade, subject, type)
+Partition = Tuple[str, str, str]
+
+
+def delta_path(bank_path: str) -> str:
+    return bank_path + ".delta"
+
+
+def next_version(version: str, line: bytes) -> str:
+    """
+    Bank version after applying one edit line to a bank at `version`.
+    """
+    return hashlib.blake2b(bytes.fromhex(version) + line, digest_size=8).hexdigest()
+
+
+class StaleDeltaError(ValueError):
+    """Raised when a delta log was written for another bank version."""
+
+
+class DeltaOp(NamedTuple):
+    op: str
+    grade: str
+    subject: str
+    qtype: str
+    # Key of the question edited; for "add", of the new question
+    key: int
+    # The new question, for "add" and "modify"
+    question: Optional[Question]
+    # Bank version once this edit is applied
+    version: str
+
+
+def _header(base_version: str) -> bytes:
+    return json.dumps({"format": FORMAT_VERSION, "base": base_version}).encode("utf-8") + b"\n"
+
+
+def read_delta(path: str, base_version: str, version: str, offset: int = 0) -> Tuple[List[DeltaOp], str, int]:
+    """
+    Edits appended to the log at `path` after byte `offset`, for a bank
+    file at `base_version` whose edits up to `offset` brought it to
+    `version`. Returns (edits, version after them, new offset).
+
+    Raises StaleDeltaError if the log belongs to another base version
+    (e.g. the bank file was compacted); a missing log has no edits.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return [], version, offset
+    with f:
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            return [], version, offset  # still being created
+        if header != _header(base_version):
+            raise StaleDeltaError(f"{path} is not a delta log for bank version {base_version}")
+        f.seek(max(offset, len(header)))
+        data = f.read()
+        offset = f.tell() - len(data)
+
+    end = data.rfind(b"\n") + 1
+    ops = []
+    for line in data[:end].splitlines():
+        version = next_version(version, line)
+        row = json.loads(line)
+        question = Question.from_dict(row["question"]) if "question" in row else None
+        key = int(row["key"], 16) if "key" in row else question_key(question)
+        ops.append(DeltaOp(row["op"], row["grade"], row["subject"], row["type"], key, question, version))
+    return ops, version, offset + end
+
+
+# ---------- BANK WITH EDITS APPLIED ----------
+
+class DeltaBank(Mapping):
+    """
+    A bank with its logged edits applied, as a read-only QUESTION_BANK-style
+    mapping. Partitions the edits touched are served from edited copies;
+    all others come from the `base` mapping as they are.
+
+    Applying more edits (refreshed()) returns a new DeltaBank, so readers
+    holding this one keep a consistent view.
+    """
+
+    def __init__(self, base: Mapping, version: str, partition_versions: Optional[Dict[Tuple[str, str], str]] = None):
+        self.base = base
+        self.base_version = version
+        self.version = version
+        self.partition_versions: Dict[Tuple[str, str], str] = dict(partition_versions or {})
+        # Edits applied, and the byte offset of the log read so far
+        self.edits = 0
+        self.offset = 0
+        self.edited: Dict[Partition, List[Question]] = {}
+        # Grades -> subjects with edited partitions, in the order edited
+        self._edited_subjects: Dict[str, Dict[str, None]] = {}
+
+    @classmethod
+    def open(cls, store) -> "DeltaBank":
+        """
+        The bank of a BankStore with the edits logged next to it.
+        """
+        versions = {
+            (grade, subject): version
+            for grade, subjects in store.partition_versions().items()
+            for subject, version in subjects.items()
+        }
+        bank = cls(store.mapping(), store.version, versions)
+        with contextlib.suppress(StaleDeltaError):  # mid-compaction: the new log follows
+            bank = bank.refreshed(delta_path(store.path))[0]
+        return bank
+
+    def partition_version(self, grade: str, subject: str) -> str:
+        """
+        Bank version at the last edit of this grade/subject.
+        """
+        return self.partition_versions.get((grade, subject), self.base_version)
+
+    def questions(self, grade: str, subject: str, qtype: str) -> List[Question]:
+        edited = self.edited.get((grade, subject, qtype))
+        if edited is not None:
+            return edited
+        return self.base.get(grade, {}).get(subject, {}).get(qtype, [])
+
+    def base_changes(self):
+        """
+        Every edited partition as partition_changes() gives it, from the
+        base bank to this one.
+        """
+        return partition_changes(DeltaBank(self.base, self.base_version), self, self.edited)
+
+    def refreshed(self, path: str) -> Tuple["DeltaBank", Set[Partition]]:
+        """
+        This bank with the edits appended to the log at `path` since it
+        was last read, and the partitions they changed. Raises
+        StaleDeltaError if the log was replaced by compaction.
+        """
+        ops, version, offset = read_delta(path, self.base_version, self.version, self.offset)
+        if not ops:
+            return self, set()
+        bank = DeltaBank(self.base, self.base_version, self.partition_versions)
+        bank.edited = dict(self.edited)
+        bank._edited_subjects = {grade: dict(subjects) for grade, subjects in self._edited_subjects.items()}
+        changed = bank._apply(ops)
+        bank.version = version
+        bank.edits = self.edits + len(ops)
+        bank.offset = offset
+        return bank, changed
+
+    def _apply(self, ops: Iterable[DeltaOp]) -> Set[Partition]:
+        # Retired questions leave None until the end, so positions stay valid.
+        changed: Dict[Partition, List[Optional[Question]]] = {}
+        positions: Dict[Partition, Dict[int, int]] = {}
+        for op in ops:
+            partition = (op.grade, op.subject, op.qtype)
+            questions = changed.get(partition)
+            if questions is None:
+                questions = changed[partition] = list(self.questions(*partition))
+                positions[partition] = {question_key(q): pos for pos, q in enumerate(questions)}
+            keys = positions[partition]
+            pos = keys.get(op.key)
+            if op.op == "add" and pos is None:
+                keys[op.key] = len(questions)
+                questions.append(op.question)
+            elif op.op == "retire" and pos is not None:
+                questions[pos] = None
+                del keys[op.key]
+            elif op.op == "modify" and pos is not None:
+                questions[pos] = op.question
+                del keys[op.key]
+                keys[question_key(op.question)] = pos
+            self.partition_versions[(op.grade, op.subject)] = op.version
+
+        for (grade, subject, qtype), questions in changed.items():
+            self.edited[(grade, subject, qtype)] = [q for q in questions if q is not None]
+            self._edited_subjects.setdefault(grade, {})[subject] = None
+        return set(changed)
+
+    def __getitem__(self, grade: str) -> Mapping:
+        if grade in self._edited_subjects:
+            return _EditedGrade(self, grade)
+        return self.base[grade]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.base
+        yield from (grade for grade in self._edited_subjects if grade not in self.base)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _EditedGrade(Mapping):
+    def __init__(self, bank: DeltaBank, grade: str):
+        self._bank = bank
+        self._grade = grade
+        self._base = bank.base.get(grade, {})
+
+    def __getitem__(self, subject: str) -> Mapping:
+        if subject in self._bank._edited_subjects[self._grade]:
+            return _EditedSubject(self._bank, self._grade, subject)
+        return self._base[subject]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._base
+        yield from (s for s in self._bank._edited_subjects[self._grade] if s not in self._base)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _EditedSubject(Mapping):
+    def __init__(self, bank: DeltaBank, grade: str, subject: str):
+        self._bank = bank
+        self._grade = grade
+        self._subject = subject
+
+    def _types(self) -> List[str]:
+        types = dict.fromkeys(self._bank.base.get(self._grade, {}).get(self._subject, {}))
+        types.update((t, None) for g, s, t in self._bank.edited if g == self._grade and s == self._subject)
+        return list(types)
+
+    def __getitem__(self, qtype: str) -> List[Question]:
+        if qtype not in self._types():
+            raise KeyError(qtype)
+        return self._bank.questions(self._grade, self._subject, qtype)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._types())
+
+    def __len__(self) -> int:
+        return len(self._types())
+
+
+def partition_changes(old: DeltaBank, new: DeltaBank, partitions: Iterable[Partition]):
+    """
+    (grade, subject, type, old questions, new questions) per partition,
+    as near_duplicates.update_index takes them.
+    """
+    for grade, subject, qtype in sorted(partitions):
+        yield grade, subject, qtype, old.questions(grade, subject, qtype), new.questions(grade, subject, qtype)
+
+
+def update_search_index(index, changes: Iterable[Tuple[str, str, str, List, List]], version: str):
+    """
+    `index` with only the questions that changed in each partition
+    removed and re-added.
+    """
+    import search_index
+
+    builder = search_index.SearchIndexBuilder(index)
+    for grade, subject, qtype, old, new in changes:
+        old_questions = {question_key(q): q for q in old}
+        new_questions = {question_key(q): q for q in new}
+        for key, question in old_questions.items():
+            if new_questions.get(key) != question:
+                builder.remove(grade, subject, qtype, question)
+        for key, question in new_questions.items():
+            if old_questions.get(key) != question:
+                builder.add(grade, subject, qtype, question)
+    return builder.finish(version)
+
+
+# ---------- WRITING EDITS ----------
+
+@contextlib.contextmanager
+def _locked_log(bank_path: str):
+    """
+    (log, store): the delta log of the bank file at `bank_path`, opened for
+    appending under an exclusive lock (where the platform has one) and
+    created with its header if missing, and the bank file as a BankStore.
+    The bank is opened once the lock is held, so a compaction cannot
+    replace it in between.
+    """
+    from bank_store import BankStore
+
+    try:
+        import fcntl
+    except ImportError:  # Windows: a single writer is assumed
+        fcntl = None
+
+    path = delta_path(bank_path)
+
+    while True:
+        f = open(path, "ab+")
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        # Compaction may have replaced the log while we waited for the lock.
+        if os.path.exists(path) and os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+            break
+        f.close()
+    try:
+        try:
+            store = BankStore.open(bank_path)
+        except OSError:
+            if f.seek(0, os.SEEK_END) == 0:  # created above, for a bank that is missing
+                os.remove(path)
+            raise
+        try:
+            if f.seek(0, os.SEEK_END) == 0:
+                f.write(_header(store.version))
+                f.flush()
+            yield f, store
+        finally:
+            store.close()
+    finally:
+        f.close()
+
+
+def _target_key(row: Dict, field: str) -> int:
+    if row.get("key"):
+        return int(str(row["key"]), 16)
+    text = str(row.get(field) or "").strip()
+    if not text:
+        raise ValueError(f"{row['op']} needs the question's \"key\" or its text in \"{field}\"")
+    return question_key({"question": text})
+
+
+def append_edits(bank_path: str, rows: Iterable[Dict]) -> Dict:
+    """
+    Validate edit rows against the bank file and its logged edits, then
+    append them to its log: all of them, or none if any row is invalid
+    (ValueError lists the problems).
+
+        {"op": "add", <question row as for import_questions>}
+        {"op": "retire", "grade", "subject", "type", "question": <text>}
+        {"op": "modify", "grade", "subject", "type", "replaces": <old text>,
+         <new question fields>}
+
+    Retire and modify may name the question by "key" (hex question key)
+    instead of its text. Returns edit counts and the new bank version.
+    """
+    from question_bank import ImportErrorRow, validate_question_row
+
+    with _locked_log(bank_path) as (log, store):
+        bank = DeltaBank.open(store)
+        keys: Dict[Partition, Set[int]] = {}
+        lines: List[bytes] = []
+        errors: List[str] = []
+        counts = {op: 0 for op in OPS}
+        for number, row in enumerate(rows, start=1):
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError(f"expected a JSON object, got {type(row).__name__}")
+                op = row.get("op")
+                if op not in OPS:
+                    raise ValueError(f"op must be one of {', '.join(OPS)}, got {op!r}")
+                if op == "retire":
+                    grade, subject, qtype = (str(row.get(f) or "").strip() for f in ("grade", "subject", "type"))
+                    question = None
+                else:
+                    grade, subject, qtype, question = validate_question_row(
+                        {k: v for k, v in row.items() if k not in ("op", "replaces", "key")}
+                    )
+                partition = (grade, subject, qtype)
+                if partition not in keys:
+                    keys[partition] = {question_key(q) for q in bank.questions(*partition)}
+                present = keys[partition]
+
+                line = {"op": op, "grade": grade, "subject": subject, "type": qtype}
+                if op == "add":
+                    if question_key(question) in present:
+                        raise ValueError("the question is already in the bank")
+                    present.add(question_key(question))
+                else:
+                    target = _target_key(row, "question" if op == "retire" else "replaces")
+                    if target not in present:
+                        raise ValueError(f"no such question in {grade} - {subject} ({qtype})")
+                    present.discard(target)
+                    line["key"] = f"{target:016x}"
+                    if question is not None:
+                        if question_key(question) in present:
+                            raise ValueError("the new question is already in the bank")
+                        present.add(question_key(question))
+                if question is not None:
+                    line["question"] = question.to_dict()
+                lines.append(json.dumps(line, ensure_ascii=False).encode("utf-8"))
+                counts[op] += 1
+            except (ImportErrorRow, ValueError) as exc:
+                errors.append(f"row {number}: {exc}")
+
+        if errors:
+            more = f" (and {len(errors) - 20} more)" if len(errors) > 20 else ""
+            raise ValueError("invalid edits, none applied:\n  " + "\n  ".join(errors[:20]) + more)
+
+        version = bank.version
+        for line in lines:
+            version = next_version(version, line)
+        # One write, so a reader never sees half of an edit batch
+        # except for an incomplete last line, which it skips.
+        log.write(b"".join(line + b"\n" for line in lines))
+    return dict(counts, version=version)
+
+
+# ---------- COMPACTION ----------
+
+def compact(bank_path: str) -> Dict:
+    """
+    Fold the delta log into a new bank file (keeping the bank and
+    per-subject versions) with its near-duplicate and search indexes, and
+    start an empty log. Processes that have the old file open switch to
+    the new one on their next reload_bank().
+    """
+    from bank_store import BankWriter
+    import near_duplicates
+    import search_index
+
+    started = time.perf_counter()
+    with _locked_log(bank_path) as (_, store):
+        bank = DeltaBank.open(store)
+        if bank.version == store.version:
+            return {"edited_partitions": 0, "version": bank.version, "elapsed": time.perf_counter() - started}
+
+        partition_versions: Dict[str, Dict[str, str]] = {}
+        for grade, subjects in bank.items():
+            for subject in subjects:
+                version = bank.partition_version(grade, subject)
+                if version != bank.version:
+                    partition_versions.setdefault(grade, {})[subject] = version
+
+        tmp_path = f"{bank_path}.{os.getpid()}.tmp"
+        with BankWriter(tmp_path, bank.version, partition_versions) as writer:
+            for grade, subjects in bank.items():
+                for subject, types in subjects.items():
+                    for qtype, questions in types.items():
+                        for question in questions:
+                            writer.add(grade, subject, qtype, question)
+
+        changes = list(bank.base_changes())
+        duplicates = None
+        if os.path.exists(near_duplicates.sidecar_path(bank_path)):
+            duplicates = near_duplicates.NearDuplicateIndex.load(near_duplicates.sidecar_path(bank_path))
+        if duplicates is not None and duplicates.bank_version == store.version:
+            duplicates = near_duplicates.update_index(duplicates, changes, bank.version)
+        elif duplicates is None or duplicates.bank_version != bank.version:
+            duplicates = near_duplicates.build_index(bank, bank.version)
+        duplicates.save(near_duplicates.sidecar_path(tmp_path))
+
+        searcher = None
+        if os.path.exists(search_index.sidecar_path(bank_path)):
+            searcher = search_index.SearchIndex.load(search_index.sidecar_path(bank_path))
+        if searcher is not None and searcher.bank_version == store.version:
+            searcher = update_search_index(searcher, changes, bank.version)
+        elif searcher is None or searcher.bank_version != bank.version:
+            searcher = search_index.build_index(bank, bank.version)
+        searcher.save(search_index.sidecar_path(tmp_path))
+
+        with open(delta_path(tmp_path), "wb") as f:
+            f.write(_header(bank.version))
+
+        # Indexes first: they match the edited bank either way. The new
+        # log last, so a reader never pairs the old bank file with it.
+        os.replace(near_duplicates.sidecar_path(tmp_path), near_duplicates.sidecar_path(bank_path))
+        os.replace(search_index.sidecar_path(tmp_path), search_index.sidecar_path(bank_path))
+        os.replace(tmp_path, bank_path)
+        os.replace(delta_path(tmp_path), delta_path(bank_path))
+    return {
+        "edited_partitions": len(bank.edited),
+        "version": bank.version,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Edit a bank file through its delta log, or compact the log:
+
+        python bank_delta.py question_bank.qpb apply edits.jsonl
+        python bank_delta.py question_bank.qpb compact
+        python bank_delta.py question_bank.qpb status
+    """
+    import argparse
+
+    from bank_store import BankStore
+
+    parser = argparse.ArgumentParser(description="Append edits to a bank file's delta log, or compact it.")
+    parser.add_argument("bank", help="Path of the bank file")
+    parser.add_argument("command", choices=("apply", "compact", "status"))
+    parser.add_argument("edits", nargs="?", help="JSONL file of edits (for apply)")
+    args = parser.parse_args(argv)
+
+    if args.command == "apply":
+        if not args.edits:
+            parser.error("apply needs a JSONL file of edits")
+        from question_bank import _iter_jsonl_rows
+
+        try:
+            rows = list(_iter_jsonl_rows(args.edits))
+        except (OSError, UnicodeDecodeError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        bad = [f"{args.edits}:{line_no}: {row['__error__']}" for line_no, row in rows if "__error__" in row]
+        if bad:
+            print("error: invalid edits file, no edits applied:\n  " + "\n  ".join(bad[:20]), file=sys.stderr)
+            return 1
+        try:
+            result = append_edits(args.bank, [row for _, row in rows])
+        except (OSError, ValueError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        print(
+            f"{result['add']} added, {result['retire']} retired, {result['modify']} modified "
+            f"-> bank version {result['version']}"
+        )
+        return 0
+
+    if args.command == "compact":
+        result = compact(args.bank)
+        print(
+            f"compacted {result['edited_partitions']} edited partitions in {result['elapsed']:.2f}s "
+            f"-> bank version {result['version']}"
+        )
+        return 0
+
+    store = BankStore.open(args.bank)
+    try:
+        bank = DeltaBank.open(store)
+        print(f"bank file version {store.version}, {store.header['count']:,} questions")
+        print(f"delta log: {bank.edits} edits, {len(bank.edited)} edited partitions")
+        for grade, subject, qtype in sorted(bank.edited):
+            print(f"  {grade} / {subject} / {qtype}: {len(bank.edited[(grade, subject, qtype)])} questions")
+        print(f"current version {bank.version}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,505 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+
+from records import Question, as_question_dict, shared_options
+
+
+# On-disk layout of a question bank file (all integers little-endian):
+#
+#   [0:8]    MAGIC (6 bytes) + format version (u16)
+#   [8:24]   header offset (u64), header length (u64)
+#   [24:..]  sections, each aligned to 8 bytes:
+#              strings         utf-8 string table, strings back to back
+#              string_offsets  u64[n_strings + 1], start of each string
+#              records         u32[6 * n_records]:
+#                                question id, answer id, options start, options count,
+#                                tags start, tags count
+#              options         u32[...], string ids of MCQ options
+#              tags            u32[...], string ids of question tags
+#              partitions      u32[n_records], record ids grouped per grade/subject/type
+#   header   JSON index written last: section offsets plus
+#            grades -> subjects -> type -> [start, count, {tag: count}], where
+#            start/count index into "partitions"
+#
+# The header alone answers grade/subject/count/tag queries; question bodies
+# are only decoded when a grade/subject/type partition is first requested.
+#
+# The file is memory-mapped read-only, so every process serving it shares
+# one copy through the page cache. What each process holds privately is
+# the partitions it has decoded; those are kept up to a budget of
+# DECODED_CACHE_QUESTIONS, dropping the least recently used partition
+# beyond it, and the option/tag strings shared between them, at most
+# SHARED_STRINGS_CACHE of them, so a worker's memory does not grow to the
+# size of the bank.
+
+MAGIC = b"QPBANK"
+FORMAT_VERSION = 2
+_PREFIX = struct.Struct("<6sH")
+_HEADER_REF = struct.Struct("<QQ")
+_DATA_START = _PREFIX.size + _HEADER_REF.size
+_RECORD_FIELDS = 6
+
+# Strings up to this length (typically MCQ options) are interned in the
+# string table, so "A) Option A" is stored once for the whole bank.
+_INTERN_MAX_LEN = 64
+_INTERN_MAX_ENTRIES = 1 << 16
+DECODED_CACHE_QUESTIONS = 1 << 17
+SHARED_STRINGS_CACHE = 1 << 16
+
+
+def _pad8(f) -> None:
+    remainder = f.tell() % 8
+    if remainder:
+        f.write(b"\0" * (8 - remainder))
+
+
+def _update_version(digest, grade: str, subject: str, qtype: str, question: Dict) -> None:
+    data = as_question_dict(question)
+    digest.update(json.dumps([grade, subject, qtype, data], sort_keys=True).encode("utf-8"))
+
+
+def bank_version(bank: Mapping) -> str:
+    """
+    Content hash of a QUESTION_BANK-style mapping. Matches the "version" a
+    BankWriter records for the same questions, so a bank keeps its version
+    when exported to a bank file.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for grade, subjects in bank.items():
+        for subject, types in subjects.items():
+            for qtype, questions in types.items():
+                for question in questions:
+                    _update_version(digest, grade, subject, qtype, question)
+    return digest.hexdigest()
+
+
+class BankWriter:
+    """
+    Stream questions into a bank file.
+
+    Question text is spooled to a temporary file as it arrives, so memory
+    only grows by a few small integers per question. Call close() (or use
+    the writer as a context manager) to write the final file.
+
+    A given `version` is recorded instead of the content hash, with the
+    `partition_versions` ({grade: {subject: version}}) of subjects that
+    changed since it was computed; compacting delta edits into a bank file
+    keeps the versions they had (see bank_delta.py).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        version: Optional[str] = None,
+        partition_versions: Optional[Dict[str, Dict[str, str]]] = None,
+    ):
+        # Writer-only imports, kept out of the read path a server starts on.
+        import tempfile
+
+        self.path = path
+        self._version = version
+        self._partition_versions = partition_versions
+        self._spool = tempfile.TemporaryFile()
+        self._spool_size = 0
+        self._string_offsets = array("Q", [0])
+        self._interned: Dict[str, int] = {}
+        self._records = array("I")
+        self._options = array("I")
+        self._tags = array("I")
+        self._partitions: Dict[str, Dict[str, Dict[str, array]]] = {}
+        self._tag_counts: Dict[tuple, Dict[str, int]] = {}
+        self._digest = hashlib.blake2b(digest_size=8)
+        self.count = 0
+
+    def _add_string(self, text: str) -> int:
+        intern = len(text) <= _INTERN_MAX_LEN
+        if intern:
+            string_id = self._interned.get(text)
+            if string_id is not None:
+                return string_id
+
+        data = text.encode("utf-8")
+        self._spool.write(data)
+        self._spool_size += len(data)
+        self._string_offsets.append(self._spool_size)
+        string_id = len(self._string_offsets) - 2
+
+        if intern and len(self._interned) < _INTERN_MAX_ENTRIES:
+            self._interned[text] = string_id
+        return string_id
+
+    def add(self, grade: str, subject: str, qtype: str, question: Question) -> int:
+        """
+        Append one question to the grade/subject/type partition and return
+        its record id.
+        """
+        options = question.get("options", [])
+        tags = question.get("tags", [])
+        record_id = len(self._records) // _RECORD_FIELDS
+
+        self._records.append(self._add_string(question["question"]))
+        self._records.append(self._add_string(question.get("answer", "")))
+        self._records.append(len(self._options))
+        self._records.append(len(options))
+        self._records.append(len(self._tags))
+        self._records.append(len(tags))
+        for opt in options:
+            self._options.append(self._add_string(opt))
+        if tags:
+            tag_counts = self._tag_counts.setdefault((grade, subject, qtype), {})
+            for tag in tags:
+                self._tags.append(self._add_string(tag))
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+
+        subjects = self._partitions.setdefault(grade, {})
+        types = subjects.setdefault(subject, {})
+        types.setdefault(qtype, array("I")).append(record_id)
+
+        _update_version(self._digest, grade, subject, qtype, question)
+        self.count += 1
+        return record_id
+
+    @property
+    def version(self) -> str:
+        """
+        Version (content hash) of the questions added so far, unless one
+        was given.
+        """
+        return self._version if self._version is not None else self._digest.hexdigest()
+
+    def close(self) -> Dict:
+        """
+        Write the bank file and return its header. The file is written under
+        a temporary name and renamed over the target, so processes that have
+        the old file mapped keep reading it intact.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            header = self._write(tmp_path)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            self._spool.close()
+        return header
+
+    def _write(self, path: str) -> Dict:
+        import shutil
+
+        sections = {}
+        grades_index: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+
+        with open(path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION))
+            f.write(_HEADER_REF.pack(0, 0))
+
+            def _section(name: str, writer) -> None:
+                _pad8(f)
+                start = f.tell()
+                writer()
+                sections[name] = [start, f.tell() - start]
+
+            self._spool.seek(0)
+            _section("strings", lambda: shutil.copyfileobj(self._spool, f))
+            _section("string_offsets", lambda: self._string_offsets.tofile(f))
+            _section("records", lambda: self._records.tofile(f))
+            _section("options", lambda: self._options.tofile(f))
+            _section("tags", lambda: self._tags.tofile(f))
+
+            def _write_partitions():
+                position = 0
+                for grade, subjects in self._partitions.items():
+                    grades_index[grade] = {}
+                    for subject, types in subjects.items():
+                        grades_index[grade][subject] = {}
+                        for qtype, record_ids in types.items():
+                            record_ids.tofile(f)
+                            grades_index[grade][subject][qtype] = [
+                                position,
+                                len(record_ids),
+                                self._tag_counts.get((grade, subject, qtype), {}),
+                            ]
+                            position += len(record_ids)
+
+            _section("partitions", _write_partitions)
+
+            header = {
+                "format": FORMAT_VERSION,
+                "byteorder": sys.byteorder,
+                "version": self.version,
+                "count": self.count,
+                "sections": sections,
+                "grades": grades_index,
+            }
+            if self._partition_versions:
+                header["partition_versions"] = self._partition_versions
+            header_bytes = json.dumps(header).encode("utf-8")
+            _pad8(f)
+            header_offset = f.tell()
+            f.write(header_bytes)
+            f.seek(_PREFIX.size)
+            f.write(_HEADER_REF.pack(header_offset, len(header_bytes)))
+        return header
+
+    def __enter__(self) -> "BankWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._spool.close()
+
+
+def write_bank(bank: Mapping, path: str) -> Dict:
+    """
+    Write a nested QUESTION_BANK-style mapping to a bank file.
+    """
+    with BankWriter(path) as writer:
+        for grade, subjects in bank.items():
+            for subject, types in subjects.items():
+                for qtype, questions in types.items():
+                    for question in questions:
+                        writer.add(grade, subject, qtype, question)
+    return read_header(path)
+
+
+def read_header(path: str) -> Dict:
+    with open(path, "rb") as f:
+        return _parse_header(f.read(_DATA_START), f)
+
+
+def _parse_header(prefix: bytes, f) -> Dict:
+    magic, fmt = _PREFIX.unpack_from(prefix)
+    if magic != MAGIC:
+        raise ValueError("Not a question bank file")
+    if fmt != FORMAT_VERSION:
+        raise ValueError(f"Unsupported question bank format {fmt}")
+    offset, length = _HEADER_REF.unpack_from(prefix, _PREFIX.size)
+    f.seek(offset)
+    header = json.loads(f.read(length).decode("utf-8"))
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError("Question bank was written on a machine with different byte order")
+    return header
+
+
+class BankStore:
+    """
+    Read-only, memory-mapped view of a bank file.
+
+    Grade/subject/count queries are answered from the header. Question
+    bodies are decoded per grade/subject/type partition on first access,
+    and the most recently used partitions are kept, up to `max_decoded`
+    questions in all (default DECODED_CACHE_QUESTIONS).
+    """
+
+    def __init__(self, path: str, max_decoded: Optional[int] = None):
+        self.path = path
+        self.max_decoded = DECODED_CACHE_QUESTIONS if max_decoded is None else max_decoded
+        self._file = open(path, "rb")
+        self.header = _parse_header(self._file.read(_DATA_START), self._file)
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        sections = self.header["sections"]
+        self._strings_start = sections["strings"][0]
+        self._string_offsets = self._view(sections["string_offsets"], "Q")
+        self._records = self._view(sections["records"], "I")
+        self._options = self._view(sections["options"], "I")
+        self._tags = self._view(sections["tags"], "I")
+        self._partitions = self._view(sections["partitions"], "I")
+        self._grades: Dict[str, Dict[str, Dict[str, List[int]]]] = self.header["grades"]
+        self._decoded: "OrderedDict[tuple, List[Question]]" = OrderedDict()
+        self._decoded_count = 0
+        self._decoded_lock = threading.Lock()
+        # Option and tag strings repeat across questions; decode each one once.
+        self._shared_strings: Dict[int, str] = {}
+
+    @classmethod
+    def open(cls, path: str, max_decoded: Optional[int] = None) -> "BankStore":
+        return cls(path, max_decoded)
+
+    def _view(self, section: List[int], fmt: str) -> memoryview:
+        start, length = section
+        return self._buffer[start:start + length].cast(fmt)
+
+    @property
+    def version(self) -> str:
+        return self.header["version"]
+
+    def partition_versions(self) -> Dict[str, Dict[str, str]]:
+        """
+        {grade: {subject: version}} for subjects last changed by a delta
+        edit before this file was compacted; other subjects have the bank's
+        version.
+        """
+        return self.header.get("partition_versions", {})
+
+    def grades(self) -> List[str]:
+        return list(self._grades.keys())
+
+    def subjects(self, grade: str) -> List[str]:
+        return list(self._grades.get(grade, {}).keys())
+
+    def type_counts(self, grade: str, subject: str) -> Dict[str, int]:
+        types = self._grades.get(grade, {}).get(subject, {})
+        return {qtype: entry[1] for qtype, entry in types.items()}
+
+    def tag_counts(self, grade: str, subject: str, qtype: str) -> Dict[str, int]:
+        entry = self._grades.get(grade, {}).get(subject, {}).get(qtype)
+        return dict(entry[2]) if entry else {}
+
+    def _string(self, string_id: int) -> str:
+        start = self._strings_start + self._string_offsets[string_id]
+        end = self._strings_start + self._string_offsets[string_id + 1]
+        return str(self._buffer[start:end], "utf-8")
+
+    def _shared_string(self, string_id: int) -> str:
+        text = self._shared_strings.get(string_id)
+        if text is None:
+            if len(self._shared_strings) >= SHARED_STRINGS_CACHE:
+                # Start over rather than track recency on every lookup:
+                # decoded questions keep the strings they already share.
+                self._shared_strings.clear()
+            text = self._shared_strings[string_id] = self._string(string_id)
+        return text
+
+    def _decode_record(self, record_id: int) -> Question:
+        base = record_id * _RECORD_FIELDS
+        question_id, answer_id, opt_start, opt_count, tag_start, tag_count = (
+            self._records[base:base + _RECORD_FIELDS]
+        )
+        options = shared_options(
+            self._shared_string(self._options[i]) for i in range(opt_start, opt_start + opt_count)
+        )
+        tags = [self._shared_string(self._tags[i]) for i in range(tag_start, tag_start + tag_count)]
+        return Question(self._string(question_id), options, self._string(answer_id), tags)
+
+    def questions(self, grade: str, subject: str, qtype: str) -> List[Question]:
+        key = (grade, subject, qtype)
+        with self._decoded_lock:
+            cached = self._decoded.get(key)
+            if cached is not None:
+                self._decoded.move_to_end(key)
+                return cached
+
+        entry = self._grades.get(grade, {}).get(subject, {}).get(qtype)
+        if entry is None:
+            return []
+        start, count = entry[:2]
+        decoded = [self._decode_record(self._partitions[i]) for i in range(start, start + count)]
+        with self._decoded_lock:
+            if key in self._decoded:  # decoded by another thread meanwhile
+                return self._decoded[key]
+            self._decoded[key] = decoded
+            self._decoded_count += count
+            # Callers may still hold evicted lists; they are only dropped here.
+            while self._decoded_count > self.max_decoded and len(self._decoded) > 1:
+                _, evicted = self._decoded.popitem(last=False)
+                self._decoded_count -= len(evicted)
+        return decoded
+
+    def mapping(self) -> "BankView":
+        return BankView(self)
+
+    def close(self) -> None:
+        self._decoded.clear()
+        self._decoded_count = 0
+        self._shared_strings.clear()
+        for view in (self._string_offsets, self._records, self._options, self._tags, self._partitions):
+            view.release()
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
+
+
+# ---------- READ-ONLY MAPPING VIEWS ----------
+# These let a BankStore stand in for the nested QUESTION_BANK dicts:
+# QUESTION_BANK[grade][subject]["mcq"] decodes only that partition.
+
+class BankView(Mapping):
+    def __init__(self, store: BankStore):
+        self._store = store
+
+    def __getitem__(self, grade: str) -> "_GradeView":
+        if grade not in self._store._grades:
+            raise KeyError(grade)
+        return _GradeView(self._store, grade)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store._grades)
+
+    def __len__(self) -> int:
+        return len(self._store._grades)
+
+
+class _GradeView(Mapping):
+    def __init__(self, store: BankStore, grade: str):
+        self._store = store
+        self._grade = grade
+
+    def __getitem__(self, subject: str) -> "_SubjectView":
+        if subject not in self._store._grades[self._grade]:
+            raise KeyError(subject)
+        return _SubjectView(self._store, self._grade, subject)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store._grades[self._grade])
+
+    def __len__(self) -> int:
+        return len(self._store._grades[self._grade])
+
+
+class _SubjectView(Mapping):
+    def __init__(self, store: BankStore, grade: str, subject: str):
+        self._store = store
+        self._grade = grade
+        self._subject = subject
+
+    def _types(self) -> Dict[str, List[int]]:
+        return self._store._grades[self._grade][self._subject]
+
+    def __getitem__(self, qtype: str) -> List[Question]:
+        if qtype not in self._types():
+            raise KeyError(qtype)
+        return self._store.questions(self._grade, self._subject, qtype)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._types())
+
+    def __len__(self) -> int:
+        return len(self._types())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Export the built-in question bank to a bank file:
+
+        python bank_store.py question_bank.qpb
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write the built-in question bank to a bank file.")
+    parser.add_argument("output", help="Path of the bank file to write")
+    args = parser.parse_args(argv)
+
+    from question_bank import export_question_bank
+
+    header = export_question_bank(args.output)
+    print(f"Wrote {header['count']} questions to {args.output} (version {header['version']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
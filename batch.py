@@ -0,0 +1,401 @@
+"""
+Headless batch generation: one unique question paper per student.
+
+    python batch.py --grade "B.Tech" --subject DBMS --mcq 5 --short 3 --long 2 \
+        --count 10000 --out papers/
+
+Each worker process looks the pools up once and generates papers in chunks;
+the parent streams every QP/answer-key pair to disk as it arrives. Workers
+map the same bank file (see question_bank.share_bank) instead of each
+holding a copy of the bank. This module does not import streamlit.
+
+Paper i is generated with seed `base_seed + i`, and manifest.tsv records each
+paper's ID. With --manifest-only only the manifest is written; any paper can
+be re-derived later (e.g. its answer key at grading time) with:
+
+    python batch.py --regenerate <paper ID> --answer-key
+
+With --sets K, K non-overlapping sets (A, B, C, ...) of one paper are
+written instead, e.g. for neighbouring seats in an exam hall.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from generator import (
+    build_question_paper,
+    encode_paper_id,
+    generate_parallel_sets,
+    get_question_pools,
+    make_paper_spec,
+    regenerate_question_paper,
+)
+from question_bank import share_bank
+from utils import PaperCompilation
+
+# Per-worker state, set once by _init_worker.
+_WORKER_CONFIG: Dict = {}
+_WORKER_POOLS: Optional[Tuple[List[Dict], List[Dict], List[Dict]]] = None
+
+# (seed, qp text, answer key text, qp pdf, answer key pdf)
+PaperResult = Tuple[int, str, str, bytes, bytes]
+
+
+def _init_worker(config: Dict) -> None:
+    global _WORKER_CONFIG, _WORKER_POOLS
+    _WORKER_CONFIG = config
+    _WORKER_POOLS = get_question_pools(config["grade"], config["subject"])
+
+
+def _generate_chunk(seeds: List[int]) -> List[PaperResult]:
+    config = _WORKER_CONFIG
+    results = []
+    for seed in seeds:
+        paper = build_question_paper(
+            config["grade"],
+            config["subject"],
+            _WORKER_POOLS,
+            config["num_mcq"],
+            config["num_short"],
+            config["num_long"],
+            random.Random(seed),
+        )
+        # Answer keys are only formatted when something will use them, and
+        # then in the same pass as the question paper.
+        if config["answer_keys"]:
+            qp_text, answer_key_text = paper.texts()
+        else:
+            qp_text, answer_key_text = paper.qp_text, ""
+        if config["pdf"]:
+            qp_pdf = paper.qp_pdf(config["compress"])
+            answer_pdf = paper.answer_key_pdf(config["compress"])
+        else:
+            qp_pdf = answer_pdf = b""
+        results.append((seed, qp_text, answer_key_text, qp_pdf, answer_pdf))
+    return results
+
+
+def max_unique_papers(
+    pools: Tuple[List[Dict], List[Dict], List[Dict]],
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+) -> int:
+    """
+    Number of distinct papers (question choice and order) the pools allow.
+    """
+    total = 1
+    for pool, requested in zip(pools, (num_mcq, num_short, num_long)):
+        total *= math.perm(len(pool), max(min(requested, len(pool)), 0))
+    return total
+
+
+def _write_paper(output_dir: str, number: int, result: PaperResult) -> None:
+    _, qp_text, answer_key_text, qp_pdf, answer_pdf = result
+    stem = os.path.join(output_dir, f"paper_{number:06d}")
+    with open(f"{stem}_qp.txt", "w", encoding="utf-8") as f:
+        f.write(qp_text)
+    with open(f"{stem}_answer_key.txt", "w", encoding="utf-8") as f:
+        f.write(answer_key_text)
+    if qp_pdf:
+        with open(f"{stem}_qp.pdf", "wb") as f:
+            f.write(qp_pdf)
+        with open(f"{stem}_answer_key.pdf", "wb") as f:
+            f.write(answer_pdf)
+
+
+def generate_batch(
+    grade: str,
+    subject: str,
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    count: int,
+    output_dir: str,
+    workers: Optional[int] = None,
+    pdf: bool = False,
+    compress: bool = False,
+    seed: Optional[int] = None,
+    manifest_only: bool = False,
+    compile_path: Optional[str] = None,
+    compile_answer_keys: bool = False,
+    chunk_size: int = 50,
+    max_attempts_factor: int = 10,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict:
+    """
+    Generate `count` unique papers for one configuration and write each
+    QP/answer-key pair to `output_dir` as soon as it is produced.
+
+    Paper seeds are `seed`, `seed + 1`, ...; manifest.tsv maps each paper
+    number to its seed and paper ID. With manifest_only the texts are not
+    written at all and can be regenerated from the IDs.
+
+    With compile_path, every paper (plus its answer key if
+    compile_answer_keys) is also streamed into one bookmarked PDF.
+
+    With workers=0 everything runs in the calling process. Papers whose
+    question paper text repeats an earlier one are discarded and redrawn.
+    """
+    pools = get_question_pools(grade, subject)
+    possible = max_unique_papers(pools, num_mcq, num_short, num_long)
+    if count > possible:
+        raise ValueError(
+            f"Only {possible} unique papers are possible for {grade} - {subject} "
+            f"with this configuration, {count} requested"
+        )
+
+    base_spec = make_paper_spec(grade, subject, num_mcq, num_short, num_long, seed)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "batch.json"), "w", encoding="utf-8") as f:
+        json.dump(base_spec._asdict(), f, indent=2)
+
+    config = {
+        "grade": grade,
+        "subject": subject,
+        "num_mcq": num_mcq,
+        "num_short": num_short,
+        "num_long": num_long,
+        "pdf": pdf and not manifest_only,
+        "compress": compress,
+        "answer_keys": not manifest_only or bool(compile_path and compile_answer_keys),
+    }
+
+    seen: Set[bytes] = set()
+    written = 0
+    generated = 0
+    next_seed = base_spec.seed
+    max_generated = count * max_attempts_factor
+    started = time.perf_counter()
+
+    def _accept(results: List[PaperResult]) -> None:
+        nonlocal written, generated
+        for result in results:
+            generated += 1
+            if written >= count:
+                continue
+            fingerprint = hashlib.blake2b(result[1].encode("utf-8"), digest_size=16).digest()
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            written += 1
+            paper_id = encode_paper_id(base_spec._replace(seed=result[0]))
+            manifest.write(f"{written}\t{result[0]}\t{paper_id}\n")
+            if not manifest_only:
+                _write_paper(output_dir, written, result)
+            if compilation is not None:
+                compilation.add_paper(
+                    f"Paper {written}",
+                    result[1],
+                    result[2] if compile_answer_keys else None,
+                )
+            if progress is not None:
+                progress(written)
+
+    def _next_seeds(size: int) -> List[int]:
+        nonlocal next_seed
+        seeds = list(range(next_seed, next_seed + size))
+        next_seed += size
+        return seeds
+
+    compilation: Optional[PaperCompilation] = None
+    compile_file = open(compile_path, "wb") if compile_path else contextlib.nullcontext()
+
+    with open(os.path.join(output_dir, "manifest.tsv"), "w", encoding="utf-8") as manifest, compile_file:
+        manifest.write("paper\tseed\tpaper_id\n")
+        if compile_path:
+            compilation = PaperCompilation(
+                compile_file, title=f"{grade} - {subject}", compress=compress
+            )
+
+        if workers == 0:
+            _init_worker(config)
+            while written < count and generated < max_generated:
+                _accept(_generate_chunk(_next_seeds(min(chunk_size, count - written))))
+        else:
+            workers = workers or os.cpu_count() or 1
+            max_in_flight = workers * 2
+            # Workers map one shared copy of the bank rather than each building their own.
+            share_bank()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(config,),
+            ) as executor:
+                pending: Set[Future] = set()
+                submitted = 0
+                while written < count and generated < max_generated:
+                    # Keep a bounded number of chunks in flight so finished papers
+                    # are written out instead of piling up in memory.
+                    while len(pending) < max_in_flight and written + submitted < count:
+                        size = min(chunk_size, count - written - submitted)
+                        pending.add(executor.submit(_generate_chunk, _next_seeds(size)))
+                        submitted += size
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results = future.result()
+                        submitted -= len(results)
+                        _accept(results)
+                for future in pending:
+                    future.cancel()
+
+        if compilation is not None:
+            compilation.close()
+
+    if written < count:
+        raise RuntimeError(
+            f"Generated only {written} unique papers out of {count} after {generated} attempts"
+        )
+
+    elapsed = time.perf_counter() - started
+    return {
+        "seed": base_spec.seed,
+        "papers": written,
+        "generated": generated,
+        "elapsed": elapsed,
+        "papers_per_sec": written / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def write_parallel_sets(
+    grade: str,
+    subject: str,
+    num_sets: int,
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    output_dir: str,
+    pdf: bool = False,
+    compress: bool = False,
+    seed: Optional[int] = None,
+) -> List[str]:
+    """
+    Write set_A_qp.txt, set_A_answer_key.txt, ... (and PDFs) for
+    `num_sets` non-overlapping sets. Returns the set labels.
+    """
+    papers = generate_parallel_sets(grade, subject, num_sets, num_mcq, num_short, num_long, seed)
+    os.makedirs(output_dir, exist_ok=True)
+    for paper in papers:
+        stem = os.path.join(output_dir, paper.set_label.lower().replace(" ", "_"))
+        qp_text, answer_key_text = paper.texts()
+        with open(f"{stem}_qp.txt", "w", encoding="utf-8") as f:
+            f.write(qp_text)
+        with open(f"{stem}_answer_key.txt", "w", encoding="utf-8") as f:
+            f.write(answer_key_text)
+        if pdf:
+            with open(f"{stem}_qp.pdf", "wb") as f:
+                f.write(paper.qp_pdf(compress))
+            with open(f"{stem}_answer_key.pdf", "wb") as f:
+                f.write(paper.answer_key_pdf(compress))
+    return [paper.set_label for paper in papers]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate many unique question papers.")
+    parser.add_argument("--grade", help='e.g. "Grade 5" or "B.Tech"')
+    parser.add_argument("--subject")
+    parser.add_argument("--mcq", type=int, default=5, help="Number of MCQs per paper")
+    parser.add_argument("--short", type=int, default=3, help="Number of short answer questions")
+    parser.add_argument("--long", type=int, default=2, help="Number of long answer questions")
+    parser.add_argument("--count", type=int, help="Number of papers to generate")
+    parser.add_argument(
+        "--sets",
+        type=int,
+        metavar="K",
+        help="Write K non-overlapping sets (A, B, ...) of one paper instead of --count papers",
+    )
+    parser.add_argument("--out", help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (0 = in-process)")
+    parser.add_argument("--pdf", action="store_true", help="Also write PDF files")
+    parser.add_argument("--compress", action="store_true", help="Write compressed (PDF 1.5) PDFs")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Papers per worker task")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the first paper")
+    parser.add_argument(
+        "--manifest-only",
+        action="store_true",
+        help="Only write paper IDs; regenerate papers on demand with --regenerate",
+    )
+    parser.add_argument("--compile", metavar="PDF", help="Also write all papers into one PDF")
+    parser.add_argument(
+        "--compile-answer-keys",
+        action="store_true",
+        help="With --compile, include each paper's answer key after it",
+    )
+    parser.add_argument("--regenerate", metavar="PAPER_ID", help="Print the paper for a paper ID")
+    parser.add_argument(
+        "--answer-key",
+        action="store_true",
+        help="With --regenerate, print the answer key instead of the question paper",
+    )
+    args = parser.parse_args(argv)
+
+    if args.regenerate:
+        try:
+            paper = regenerate_question_paper(args.regenerate)
+        except ValueError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        sys.stdout.write(paper.answer_key_text if args.answer_key else paper.qp_text)
+        return 0
+
+    if args.sets is not None:
+        missing = [name for name in ("grade", "subject", "out") if getattr(args, name) is None]
+        if missing:
+            parser.error("the following arguments are required: " + ", ".join(f"--{m}" for m in missing))
+        try:
+            labels = write_parallel_sets(
+                args.grade, args.subject, args.sets, args.mcq, args.short, args.long,
+                args.out, pdf=args.pdf, compress=args.compress, seed=args.seed,
+            )
+        except ValueError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        print(f"Wrote {', '.join(labels)} to {args.out}")
+        return 0
+
+    missing = [name for name in ("grade", "subject", "count", "out") if getattr(args, name) is None]
+    if missing:
+        parser.error("the following arguments are required: " + ", ".join(f"--{m}" for m in missing))
+
+    try:
+        stats = generate_batch(
+            grade=args.grade,
+            subject=args.subject,
+            num_mcq=args.mcq,
+            num_short=args.short,
+            num_long=args.long,
+            count=args.count,
+            output_dir=args.out,
+            workers=args.workers,
+            pdf=args.pdf,
+            compress=args.compress,
+            seed=args.seed,
+            manifest_only=args.manifest_only,
+            compile_path=args.compile,
+            compile_answer_keys=args.compile_answer_keys,
+            chunk_size=args.chunk_size,
+        )
+    except (ValueError, RuntimeError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    print(
+        f"Wrote {stats['papers']:,} papers to {args.out} in {stats['elapsed']:.2f}s "
+        f"({stats['papers_per_sec']:,.0f} papers/sec, {stats['generated']:,} generated, "
+        f"seed {stats['seed']})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark: blueprint selection time on large synthetic pools.
+
+Builds pools of tagged questions (difficulty, topic and marks tags),
+indexes them once and solves a blueprint with type counts, a total marks
+target, difficulty and topic minimums and an exclusion set.
+
+    python benchmarks/bench_blueprint.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import Blueprint, BlueprintInfeasible, _PoolIndex, _solve_blueprint  # noqa: E402
+from records import Question, question_key  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+RUNS = 20
+LEVELS = ("easy", "medium", "hard")
+TOPICS = tuple(f"topic:t{i}" for i in range(20))
+MARKS = {"mcq": (1,), "short": (2, 3), "long": (4, 5, 6)}
+
+
+def _pools(count: int):
+    rng = random.Random(count)
+    pools = {}
+    for qtype in ("mcq", "short", "long"):
+        pools[qtype] = [
+            Question(
+                f"Synthetic {qtype} question {i}?",
+                ("A) a", "B) b", "C) c", "D) d") if qtype == "mcq" else (),
+                "A",
+                (
+                    f"difficulty:{rng.choice(LEVELS)}",
+                    rng.choice(TOPICS),
+                    f"marks:{rng.choice(MARKS[qtype])}",
+                ),
+            )
+            for i in range(count // 3)
+        ]
+    return pools
+
+
+def main() -> int:
+    print(f"{'pool':>8} {'index ms':>9} {'solve ms':>9} {'infeasible ms':>14}")
+    for count in SIZES:
+        pools = _pools(count)
+        started = time.perf_counter()
+        index = _PoolIndex(pools)
+        index_time = time.perf_counter() - started
+
+        exclude = frozenset(question_key(q) for q in pools["mcq"][: count // 30])
+        blueprint = Blueprint(
+            counts={"mcq": 10, "short": 6, "long": 4},
+            total_marks=10 + 15 + 20,
+            difficulty={"hard": 5, "easy": 5},
+            topics={"topic:t0": 3, "topic:t1": 2},
+            exclude=exclude,
+        )
+        rng = random.Random(0)
+        started = time.perf_counter()
+        for _ in range(RUNS):
+            _solve_blueprint(index, blueprint, rng, max_attempts=50)
+        solve_time = (time.perf_counter() - started) / RUNS
+
+        impossible = blueprint._replace(total_marks=1000)
+        started = time.perf_counter()
+        try:
+            _solve_blueprint(index, impossible, rng, max_attempts=50)
+        except BlueprintInfeasible:
+            pass
+        infeasible_time = time.perf_counter() - started
+
+        print(
+            f"{count:>8,} {index_time * 1000:>9.1f} {solve_time * 1000:>9.2f} "
+            f"{infeasible_time * 1000:>14.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Benchmark: hot reload of delta edits versus rebuilding the bank's indexes.
+
+Writes a synthetic bank file (with its near-duplicate and search indexes)
+and serves it as QP_BANK_PATH would. Each round appends a batch of edits
+to one grade/subject through the delta log and times reload_bank(), which
+replaces that partition and updates both indexes for it, against
+rebuilding both indexes over the whole edited bank (what picking up the
+edits would cost without deltas). Finally times compacting the log into a
+new bank file.
+
+    python benchmarks/bench_delta.py
+    python benchmarks/bench_delta.py --questions 500000 --edits 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Question  # noqa: E402
+
+VOCABULARY = [f"term{i}" for i in range(20_000)]
+GRADES = 10
+SUBJECTS = 10
+
+
+def _question(rng: random.Random) -> Question:
+    return Question(f"Explain {' '.join(rng.choices(VOCABULARY, k=rng.randint(6, 14)))}.", answer="answer text")
+
+
+def _bank(count: int, rng: random.Random):
+    per_partition = max(1, count // (GRADES * SUBJECTS))
+    return {
+        f"Grade {g}": {
+            f"Subject {s}": {"short": [_question(rng) for _ in range(per_partition)]}
+            for s in range(SUBJECTS)
+        }
+        for g in range(GRADES)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark delta edit hot reload.")
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--edits", type=int, default=20, help="Edits per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import bank_delta
+    import near_duplicates
+    import search_index
+    from bank_store import write_bank
+
+    rng = random.Random(5)
+    bank = _bank(args.questions, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.qpb")
+        version = write_bank(bank, path)["version"]
+        near_duplicates.build_index(bank, version).save(near_duplicates.sidecar_path(path))
+        search_index.build_index(bank, version).save(search_index.sidecar_path(path))
+        del bank
+
+        os.environ["QP_BANK_PATH"] = path
+        import question_bank
+
+        question_bank.get_near_duplicate_index()
+        question_bank.get_search_index()
+        print(f"{args.questions:,} questions in {GRADES * SUBJECTS} subjects, {args.edits} edits per round")
+
+        reloads, rebuilds = [], []
+        for round_ in range(args.rounds):
+            grade, subject = f"Grade {round_ % GRADES}", f"Subject {round_ % SUBJECTS}"
+            current = question_bank.QUESTION_BANK[grade][subject]["short"]
+            rows = []
+            for question in rng.sample(list(current), args.edits // 2):
+                rows.append({"op": "retire", "grade": grade, "subject": subject, "type": "short",
+                             "question": question.question})
+            for _ in range(args.edits - len(rows)):
+                rows.append(dict(_question(rng).to_dict(), op="add", grade=grade, subject=subject, type="short"))
+            bank_delta.append_edits(path, rows)
+
+            started = time.perf_counter()
+            replaced = question_bank.reload_bank()
+            question_bank.get_near_duplicate_index()
+            question_bank.get_search_index()
+            reloads.append(time.perf_counter() - started)
+            assert replaced == 1, replaced
+
+            version = question_bank.get_bank_version()
+            started = time.perf_counter()
+            near_duplicates.build_index(question_bank.QUESTION_BANK, version)
+            search_index.build_index(question_bank.QUESTION_BANK, version)
+            rebuilds.append(time.perf_counter() - started)
+
+        reload_ms = statistics.median(reloads) * 1000
+        rebuild_ms = statistics.median(rebuilds) * 1000
+        print(f"{'reload_bank()':>24} {reload_ms:>10.1f}ms median")
+        print(f"{'full index rebuild':>24} {rebuild_ms:>10.1f}ms median ({rebuild_ms / reload_ms:.0f}x)")
+
+        result = bank_delta.compact(path)
+        print(f"{'compact':>24} {result['elapsed'] * 1000:>10.1f}ms ({result['edited_partitions']} partitions)")
+        assert question_bank.reload_bank() == -1
+        assert question_bank.get_bank_version() == version
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark: PDF text layout, fixed 90-character textwrap versus Helvetica
+font-metric line breaking.
+
+Reports layout time, resulting line/page counts and how many lines the
+character-count wrapper produces that are wider than the printable area.
+
+    python benchmarks/bench_layout.py
+"""
+import os
+import sys
+import textwrap
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import generate_question_paper  # noqa: E402
+from utils import (  # noqa: E402
+    _LINE_HEIGHT,
+    _MARGIN_TOP,
+    _PAGE_HEIGHT,
+    _TEXT_WIDTH,
+    _iter_layout_lines,
+    _word_width,
+)
+
+REPEATS = (10, 100, 1000)
+
+
+def _wrap_text_to_lines(text: str, max_chars_per_line: int = 90) -> List[str]:
+    """
+    The character-count wrapping PDFs used before font-metric layout.
+    """
+    return [
+        wrapped
+        for line in text.splitlines()
+        for wrapped in (textwrap.wrap(line, width=max_chars_per_line) or [""])
+    ]
+
+
+def _pages(line_count: int) -> int:
+    per_page = int((_PAGE_HEIGHT - 2 * _MARGIN_TOP) // _LINE_HEIGHT)
+    return -(-line_count // per_page)
+
+
+def main() -> int:
+    texts = [
+        "\n".join(generate_question_paper(grade, subject, 10, 6, 4, seed=seed))
+        for seed, (grade, subject) in enumerate(
+            [("B.Tech", "DBMS"), ("B.Tech", "Data Structures"), ("B.Tech", "Python Programming")]
+        )
+    ]
+    base_text = "\n".join(texts)
+
+    print(f"{'copies':>7} {'engine':>9} {'ms':>9} {'lines':>8} {'pages':>6} {'overflow':>9}")
+    for repeat in REPEATS:
+        text = "\n".join([base_text] * repeat)
+
+        started = time.perf_counter()
+        char_lines = _wrap_text_to_lines(text, max_chars_per_line=90)
+        char_time = time.perf_counter() - started
+
+        _word_width.cache_clear()
+        started = time.perf_counter()
+        metric_lines = list(_iter_layout_lines(text.splitlines()))
+        metric_time = time.perf_counter() - started
+
+        for engine, lines, elapsed in (("textwrap", char_lines, char_time), ("metrics", metric_lines, metric_time)):
+            overflow = sum(1 for line in lines if _word_width(line) > _TEXT_WIDTH)
+            print(
+                f"{repeat:>7} {engine:>9} {elapsed * 1000:>9.1f} {len(lines):>8,} "
+                f"{_pages(len(lines)):>6,} {overflow:>9,}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
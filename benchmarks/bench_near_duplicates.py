@@ -0,0 +1,64 @@
+"""
+Benchmark: near-duplicate index build time and detection quality.
+
+Builds synthetic subjects where every tenth question also appears
+reworded (different function words, word order and plurals) and reports
+build time per question, the share of planted pairs found and how many
+unrelated questions were grouped.
+
+    python benchmarks/bench_near_duplicates.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from near_duplicates import build_index  # noqa: E402
+from records import Question, question_key  # noqa: E402
+
+SIZES = (10_000, 100_000)
+VOCABULARY = [f"term{i}" for i in range(5_000)]
+
+
+def _bank(count: int, rng: random.Random):
+    questions = []
+    planted = []
+    for i in range(count):
+        words = rng.sample(VOCABULARY, 4)
+        text = f"What is the {words[0]} of {words[1]} in {words[2]} and {words[3]}?"
+        questions.append(Question(text, answer="x"))
+        if i % 10 == 0:
+            copy = f"Explain {words[1]}s {words[0]} for {words[3]} with {words[2]}."
+            questions.append(Question(copy, answer="x"))
+            planted.append((question_key(questions[-2]), question_key(questions[-1])))
+    return {"Grade": {"Subject": {"short": questions}}}, planted
+
+
+def main() -> int:
+    rng = random.Random(42)
+    print(f"{'questions':>10} {'build s':>8} {'us/q':>7} {'recall':>7} {'false keys':>11}")
+    for size in SIZES:
+        bank, planted = _bank(size, rng)
+        count = len(bank["Grade"]["Subject"]["short"])
+
+        started = time.perf_counter()
+        index = build_index(bank, "synthetic")
+        elapsed = time.perf_counter() - started
+
+        found = sum(
+            1 for a, b in planted
+            if index.group_of_key(a) is not None and index.group_of_key(a) == index.group_of_key(b)
+        )
+        planted_keys = {key for pair in planted for key in pair}
+        false_keys = sum(1 for members in index.groups().values() for key in members if key not in planted_keys)
+        print(
+            f"{count:>10,} {elapsed:>8.2f} {elapsed / count * 1e6:>7.1f} "
+            f"{found / len(planted):>7.1%} {false_keys:>11,}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
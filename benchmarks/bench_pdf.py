@@ -0,0 +1,53 @@
+"""
+Benchmark: PDF size and generation time, uncompressed vs compressed.
+
+Renders question papers of increasing length with text_to_pdf_bytes and
+reports bytes per page and milliseconds per document for the default
+PDF 1.4 output and for compress=True (FlateDecode streams, object streams
+and an xref stream).
+
+    python benchmarks/bench_pdf.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import generate_question_paper  # noqa: E402
+from utils import text_to_pdf_bytes  # noqa: E402
+
+REPEATS = (1, 10, 100, 1000)
+
+
+def _measure(text: str, compress: bool, runs: int):
+    best = float("inf")
+    pdf = b""
+    for _ in range(runs):
+        started = time.perf_counter()
+        pdf = text_to_pdf_bytes(text, title="Question Paper", compress=compress)
+        best = min(best, time.perf_counter() - started)
+    return pdf, best
+
+
+def main() -> int:
+    qp_text, _ = generate_question_paper("B.Tech", "DBMS", 10, 6, 4, seed=1)
+
+    print(f"{'pages':>6} {'mode':>12} {'bytes/page':>11} {'ms/doc':>9} {'size':>7}")
+    for repeat in REPEATS:
+        text = qp_text * repeat
+        runs = max(1, 50 // repeat)
+        plain, plain_time = _measure(text, False, runs)
+        packed, packed_time = _measure(text, True, runs)
+        pages = plain.count(b"/Type /Page ")
+
+        for mode, pdf, elapsed in (("uncompressed", plain, plain_time), ("compressed", packed, packed_time)):
+            print(
+                f"{pages:>6} {mode:>12} {len(pdf) / pages:>11,.0f} {elapsed * 1000:>9.2f} "
+                f"{len(pdf) / len(plain):>6.0%}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Benchmark: recency-weighted selection, Fenwick tree versus cumulative
+weights.
+
+The baseline rebuilds cumulative weights for every section (O(n)) and
+draws with random.choices, redrawing repeats. The Fenwick sampler is built
+once per pool and draws each question in O(log n).
+
+    python benchmarks/bench_recency.py
+"""
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import FenwickSampler, _select_questions  # noqa: E402
+
+POOL_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+REQUESTED = 10
+
+
+def _cumulative_choice(pool, weights, requested, rng):
+    cum_weights = list(itertools.accumulate(weights))
+    chosen = {}
+    while len(chosen) < requested:
+        pos = rng.choices(range(len(pool)), cum_weights=cum_weights)[0]
+        chosen[pos] = pool[pos]
+    return list(chosen.values())
+
+
+def main() -> int:
+    rng = random.Random(5)
+    print(f"Selecting {REQUESTED} questions (microseconds per section)")
+    print(f"{'pool size':>10} {'build ms':>9} {'cumulative':>11} {'fenwick':>9} {'speedup':>8}")
+    for size in POOL_SIZES:
+        pool = [{"question": f"Q{i}", "answer": "A"} for i in range(size)]
+        weights = [rng.choice((0.05, 0.5, 1.0)) for _ in range(size)]
+        runs = max(3, 100_000 // size)
+
+        started = time.perf_counter()
+        sampler = FenwickSampler(weights)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(runs):
+            _cumulative_choice(pool, weights, REQUESTED, rng)
+        baseline = (time.perf_counter() - started) / runs
+
+        started = time.perf_counter()
+        for _ in range(runs * 10):
+            _select_questions(pool, REQUESTED, rng, sampler=sampler)
+        fenwick = (time.perf_counter() - started) / (runs * 10)
+
+        print(
+            f"{size:>10,} {build * 1000:>9.1f} {baseline * 1e6:>11.0f} {fenwick * 1e6:>9.0f} "
+            f"{baseline / fenwick:>7.0f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
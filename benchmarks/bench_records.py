@@ -0,0 +1,65 @@
+"""
+Memory benchmark: bytes per question for plain dicts versus Question records.
+
+Builds synthetic banks in the style of _create_sample_grade_questions
+(MCQs with identical options, short and long answers) and measures the
+allocated memory with tracemalloc.
+
+    python benchmarks/bench_records.py
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Question  # noqa: E402
+
+SIZES = (1_000, 100_000)
+
+
+def _dict_bank(count: int):
+    bank = []
+    for i in range(count):
+        if i % 2:
+            bank.append({"question": f"Sample MCQ question {i}?", "options": [
+                "A) Option A", "B) Option B", "C) Option C", "D) Option D",
+            ], "answer": "A"})
+        else:
+            bank.append({"question": f"Sample short answer question {i}.",
+                         "answer": f"Sample short answer {i}."})
+    return bank
+
+
+def _record_bank(count: int):
+    options = ("A) Option A", "B) Option B", "C) Option C", "D) Option D")
+    bank = []
+    for i in range(count):
+        if i % 2:
+            bank.append(Question(f"Sample MCQ question {i}?", options, "A"))
+        else:
+            bank.append(Question(f"Sample short answer question {i}.",
+                                 answer=f"Sample short answer {i}."))
+    return bank
+
+
+def _measure(build, count: int) -> float:
+    tracemalloc.start()
+    bank = build(count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del bank
+    return size / count
+
+
+def main() -> int:
+    print(f"{'questions':>10} {'dict B/q':>9} {'record B/q':>11} {'saving':>7}")
+    for count in SIZES:
+        as_dicts = _measure(_dict_bank, count)
+        as_records = _measure(_record_bank, count)
+        print(f"{count:>10,} {as_dicts:>9.0f} {as_records:>11.0f} {1 - as_records / as_dicts:>7.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
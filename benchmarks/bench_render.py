@@ -0,0 +1,143 @@
+"""
+Benchmark: paper rendering, the two-pass formatter pair versus the
+single-pass renderer, and PDFs laid out from the formatted text versus
+from pre-rendered question fragments.
+
+The text baseline is the previous format_question_paper_text /
+format_answer_key_text pair, which each walked the selection and built
+their own line lists. render_paper walks it once and writes both outputs.
+The PDF baseline wraps and escapes the formatted text of every paper
+(text_to_pdf_bytes); paper_pdf_bytes numbers and concatenates lines each
+question has wrapped and escaped once. Also checks the outputs are
+identical.
+
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --papers 10000 --mcq 20 --short 10 --long 5
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import get_question_pools, select_question_paper  # noqa: E402
+from utils import format_paper_texts, paper_pdf_bytes, render_paper, text_to_pdf_bytes  # noqa: E402
+
+
+def _two_pass_question_paper(grade, subject, mcqs, shorts, longs, set_label=None) -> str:
+    lines = [f"{grade} - {subject}", f"Question Paper - {set_label}" if set_label else "Question Paper",
+             "-" * 60, ""]
+    q_num = 1
+    if mcqs:
+        lines += ["Section A: Multiple Choice Questions", ""]
+        for q in mcqs:
+            lines.append(f"{q_num}. {q['question']}")
+            for opt in q.get("options", []):
+                lines.append(f"   {opt}")
+            lines.append("")
+            q_num += 1
+    for heading, questions in (("Section B: Short Answer Questions", shorts),
+                               ("Section C: Long Answer Questions", longs)):
+        if questions:
+            lines += ["", heading, ""]
+            for q in questions:
+                lines += [f"{q_num}. {q['question']}", ""]
+                q_num += 1
+    return "\n".join(lines).strip() + "\n"
+
+
+def _two_pass_answer_key(grade, subject, mcqs, shorts, longs, set_label=None) -> str:
+    lines = [f"{grade} - {subject}", f"Answer Key - {set_label}" if set_label else "Answer Key", "-" * 60, ""]
+    q_num = 1
+    if mcqs:
+        lines += ["Section A: Multiple Choice Questions", ""]
+        for q in mcqs:
+            lines.append(f"{q_num}. {q.get('answer', '')}")
+            q_num += 1
+        lines.append("")
+    for heading, questions in (("Section B: Short Answer Questions", shorts),
+                               ("Section C: Long Answer Questions", longs)):
+        if questions:
+            lines += [heading, ""]
+            for q in questions:
+                lines += [f"{q_num}. {q.get('answer', '')}", ""]
+                q_num += 1
+    return "\n".join(lines).strip() + "\n"
+
+
+def _selections(count: int, counts: Tuple[int, int, int]) -> List[Tuple[List[Dict], List[Dict], List[Dict]]]:
+    pools = get_question_pools("B.Tech", "DBMS")
+    rng = random.Random(0)
+    return [select_question_paper(pools, *counts, rng=rng) for _ in range(count)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark question paper + answer key rendering.")
+    parser.add_argument("--papers", type=int, default=10_000)
+    parser.add_argument("--mcq", type=int, default=5)
+    parser.add_argument("--short", type=int, default=3)
+    parser.add_argument("--long", type=int, default=2)
+    parser.add_argument("--pdf-papers", type=int, default=2_000, help="Papers to render as PDFs")
+    args = parser.parse_args(argv)
+
+    selections = _selections(args.papers, (args.mcq, args.short, args.long))
+
+    started = time.perf_counter()
+    baseline = [
+        (_two_pass_question_paper("B.Tech", "DBMS", *s), _two_pass_answer_key("B.Tech", "DBMS", *s))
+        for s in selections
+    ]
+    two_pass = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rendered = [format_paper_texts("B.Tech", "DBMS", *s) for s in selections]
+    one_pass = time.perf_counter() - started
+
+    # Writing straight into one buffer per output for the whole batch.
+    started = time.perf_counter()
+    question_papers, answer_keys = io.StringIO(), io.StringIO()
+    for s in selections:
+        render_paper("B.Tech", "DBMS", *s, question_paper=question_papers, answer_key=answer_keys)
+    shared = time.perf_counter() - started
+
+    pdf_count = min(args.papers, args.pdf_papers)
+    started = time.perf_counter()
+    text_pdfs = [
+        (text_to_pdf_bytes(qp_text), text_to_pdf_bytes(answer_key_text))
+        for qp_text, answer_key_text in rendered[:pdf_count]
+    ]
+    from_text = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fragment_pdfs = [
+        (paper_pdf_bytes("B.Tech", "DBMS", *s), paper_pdf_bytes("B.Tech", "DBMS", *s, answer_key=True))
+        for s in selections[:pdf_count]
+    ]
+    from_fragments = time.perf_counter() - started
+
+    if rendered != baseline:
+        print("single-pass output differs from the two-pass formatters", file=sys.stderr)
+        return 1
+    if fragment_pdfs != text_pdfs:
+        print("PDFs from fragments differ from PDFs of the text", file=sys.stderr)
+        return 1
+
+    print(f"{args.papers:,} papers ({args.mcq} mcq, {args.short} short, {args.long} long), QP + answer key")
+    print(f"{'renderer':>22} {'total ms':>9} {'us/paper':>9} {'speedup':>8}")
+    for name, elapsed in (("two-pass pair", two_pass), ("single pass", one_pass),
+                          ("single pass, 2 buffers", shared)):
+        print(f"{name:>22} {elapsed * 1000:>9.1f} {elapsed / args.papers * 1e6:>9.1f} "
+              f"{two_pass / elapsed:>7.2f}x")
+    print(f"{pdf_count:,} papers, QP + answer key PDFs")
+    for name, elapsed in (("PDF from text", from_text), ("PDF from fragments", from_fragments)):
+        print(f"{name:>22} {elapsed * 1000:>9.1f} {elapsed / pdf_count * 1e6:>9.1f} "
+              f"{from_text / elapsed:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
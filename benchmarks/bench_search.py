@@ -0,0 +1,121 @@
+"""
+Benchmark: full-text search, BM25 inverted index versus a linear scan of
+the bank.
+
+Builds a synthetic bank whose words follow a Zipf distribution (a few very
+common words, a long tail of rare ones), then reports index build, save
+and load times and query latency percentiles for one- to three-word
+queries, with and without a grade/subject filter. The baseline scans every
+question for the query words, as a search over QUESTION_BANK without an
+index would.
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --questions 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Question  # noqa: E402
+from search_index import SearchIndex, build_index, tokenize  # noqa: E402
+
+VOCABULARY = [f"term{i}" for i in range(50_000)]
+SUBJECTS = 20
+QUERIES = 200
+
+
+def _bank(count: int, rng: random.Random):
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+    bank = {}
+    per_subject = count // SUBJECTS
+    for s in range(SUBJECTS):
+        questions = []
+        for _ in range(per_subject):
+            words = rng.choices(VOCABULARY, cum_weights=weights, k=rng.randint(6, 14))
+            questions.append(Question(f"Explain {' '.join(words)}.", answer="answer text"))
+        bank.setdefault(f"Grade {s % 4}", {})[f"Subject {s}"] = {"short": questions}
+    return bank, weights
+
+
+def _percentiles(values: List[float]) -> str:
+    ordered = sorted(values)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000  # noqa: E731
+    return f"{pick(50):>8.2f} {pick(90):>8.2f} {pick(99):>8.2f}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the question search index.")
+    parser.add_argument("--questions", type=int, default=200_000)
+    parser.add_argument("--scan-queries", type=int, default=5, help="Queries timed for the linear scan")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(3)
+    bank, weights = _bank(args.questions, rng)
+
+    started = time.perf_counter()
+    index = build_index(bank, "synthetic")
+    build = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.search")
+        started = time.perf_counter()
+        index.save(path)
+        save = time.perf_counter() - started
+        started = time.perf_counter()
+        index = SearchIndex.load(path)
+        load = time.perf_counter() - started
+
+        print(f"{len(index):,} questions, {index.term_count:,} terms")
+        print(f"build {build:.1f}s ({build / len(index) * 1e6:.0f} us/question), "
+              f"save {save * 1000:.0f}ms, load {load * 1000:.1f}ms")
+
+        print(f"{'query':>24} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+        index.search("term0")  # length norms are computed on first search
+        for words in (1, 2, 3):
+            queries = [" ".join(rng.choices(VOCABULARY, cum_weights=weights, k=words)) for _ in range(QUERIES)]
+            for filtered in (False, True):
+                latencies = []
+                for query in queries:
+                    started = time.perf_counter()
+                    if filtered:
+                        index.search(query, grade="Grade 1", subject="Subject 5")
+                    else:
+                        index.search(query)
+                    latencies.append(time.perf_counter() - started)
+                name = f"{words} word{'s' if words > 1 else ''}{', filtered' if filtered else ''}"
+                print(f"{name:>24} {_percentiles(latencies)}")
+
+        # The most common word is the worst case: its postings cover most questions.
+        latencies = []
+        for _ in range(20):
+            started = time.perf_counter()
+            index.search(VOCABULARY[0])
+            latencies.append(time.perf_counter() - started)
+        print(f"{'most common word':>24} {_percentiles(latencies)}")
+
+        questions = [
+            (grade, subject, question)
+            for grade, subjects in bank.items()
+            for subject, types in subjects.items()
+            for question in types["short"]
+        ]
+        latencies = []
+        for _ in range(args.scan_queries):
+            terms = set(tokenize(" ".join(rng.choices(VOCABULARY, cum_weights=weights, k=2))))
+            started = time.perf_counter()
+            [q for _, _, q in questions if terms & set(tokenize(q.question))]
+            latencies.append(time.perf_counter() - started)
+        print(f"{'linear scan, 2 words':>24} {_percentiles(latencies)}")
+        del index
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Micro-benchmark: question selection cost versus pool size.
+
+Compares the previous copy-and-shuffle selection with the current
+generator._select_questions (random.sample) for pools of 10 to 1M items.
+
+    python benchmarks/bench_select.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import _select_questions  # noqa: E402
+
+POOL_SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+REQUESTED = 10
+
+
+def _copy_shuffle(pool, requested, rng):
+    local_copy = pool[:]
+    rng.shuffle(local_copy)
+    return local_copy[:min(requested, len(local_copy))]
+
+
+def main() -> int:
+    rng = random.Random(1234)
+    print(f"Selecting {REQUESTED} questions (microseconds per call)")
+    print(f"{'pool size':>10} {'copy+shuffle':>14} {'sample':>10} {'speedup':>9}")
+
+    for size in POOL_SIZES:
+        pool = [{"question": f"Q{i}", "answer": "A"} for i in range(size)]
+        number = max(1, 200_000 // size)
+
+        old = min(timeit.repeat(lambda: _copy_shuffle(pool, REQUESTED, rng), number=number, repeat=3))
+        new = min(timeit.repeat(lambda: _select_questions(pool, REQUESTED, rng), number=number, repeat=3))
+        old_us = old / number * 1e6
+        new_us = new / number * 1e6
+        print(f"{size:>10,} {old_us:>14.1f} {new_us:>10.1f} {old_us / new_us:>8.1f}x")
+
+    # Same seed, same selection.
+    pool = list(range(1000))
+    assert _select_questions(pool, 10, random.Random(7)) == _select_questions(pool, 10, random.Random(7))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Benchmark: K non-overlapping sets by rejection versus single-pass dealing.
+
+The rejection baseline draws each set with _select_questions and redraws
+it while it shares a question with an earlier set (up to MAX_TRIES). The
+dealer hands out all K sets from one lazy permutation of the pool.
+Reports time per K-set draw and how often rejection gives up, for pools
+filled to 50%, 90% and 100% by the K sets.
+
+    python benchmarks/bench_sets.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import _deal_sets, _select_questions  # noqa: E402
+
+NUM_SETS = 4
+REQUESTED = 10
+FILL = (0.5, 0.9, 1.0)
+RUNS = 200
+MAX_TRIES = 1000
+
+
+def _rejection(pool, rng):
+    sets = []
+    used = set()
+    for _ in range(NUM_SETS):
+        for _ in range(MAX_TRIES):
+            chosen = _select_questions(pool, REQUESTED, rng)
+            if not used.intersection(q["question"] for q in chosen):
+                break
+        else:
+            return None
+        used.update(q["question"] for q in chosen)
+        sets.append(chosen)
+    return sets
+
+
+def main() -> int:
+    rng = random.Random(99)
+    print(f"{'fill':>5} {'pool':>6} {'rejection ms':>13} {'failed':>7} {'dealt ms':>9}")
+    for fill in FILL:
+        size = int(NUM_SETS * REQUESTED / fill)
+        pool = [{"question": f"Q{i}", "answer": "A"} for i in range(size)]
+
+        failed = 0
+        started = time.perf_counter()
+        for _ in range(RUNS):
+            failed += _rejection(pool, rng) is None
+        rejection = (time.perf_counter() - started) / RUNS
+
+        started = time.perf_counter()
+        for _ in range(RUNS):
+            _deal_sets(pool, NUM_SETS, REQUESTED, rng, None, [set() for _ in range(NUM_SETS)])
+        dealt = (time.perf_counter() - started) / RUNS
+
+        print(f"{fill:>5.0%} {size:>6} {rejection * 1000:>13.2f} {failed / RUNS:>7.0%} {dealt * 1000:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
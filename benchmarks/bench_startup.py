@@ -0,0 +1,141 @@
+"""
+Benchmark: cold start time, with a budget CI can enforce.
+
+Each stage runs in a fresh interpreter, as a new server process would, and
+is timed from the first import to the end of the stage:
+
+    bank       import question_bank (no bank work should happen yet)
+    catalog    ... and build the catalog the sidebar renders from
+    generator  import generator
+    paper      import generator and render a first paper and answer key
+
+Stages are timed with the sample bank's snapshot (the normal warm start)
+and without it (QP_BANK_SNAPSHOT=0, building the bank in memory). Module
+bytecode is compiled first, as it would be in a deployed image. The modules
+that dominate the "paper" stage are listed from `python -X importtime`.
+
+Exits with status 1 if the median of a stage (with the snapshot) exceeds
+its budget:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 30 --budget paper=80
+"""
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = {
+    # The assert keeps bank loading out of import time.
+    "bank": "import question_bank; assert question_bank._BANK is None",
+    "catalog": "import question_bank; question_bank.get_catalog()",
+    "generator": "import generator",
+    "paper": "import generator; generator.generate_question_paper('B.Tech', 'DBMS', 5, 3, 2).texts()",
+}
+
+# Median milliseconds per stage, with room for slow CI machines.
+BUDGETS_MS = {
+    "bank": 40.0,
+    "catalog": 50.0,
+    "generator": 60.0,
+    "paper": 70.0,
+}
+
+_TIMED = "import time\n_started = time.perf_counter()\n{code}\nprint(time.perf_counter() - _started)\n"
+
+
+def _env(snapshot: bool) -> Dict[str, str]:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("QP_BANK_PATH", None)
+    env["QP_BANK_SNAPSHOT"] = "1" if snapshot else "0"
+    return env
+
+
+def _run(code: str, env: Dict[str, str], importtime: bool = False) -> Tuple[float, str]:
+    args = [sys.executable]
+    if importtime:
+        args += ["-X", "importtime"]
+    result = subprocess.run(
+        args + ["-c", _TIMED.format(code=code)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def _interpreter_ms(runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def _top_imports(stderr: str, count: int) -> List[Tuple[int, str]]:
+    """
+    (self microseconds, module) for the slowest modules in -X importtime output.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def _parse_budgets(overrides: List[str]) -> Dict[str, float]:
+    budgets = dict(BUDGETS_MS)
+    for item in overrides:
+        stage, sep, value = item.partition("=")
+        if not sep or stage not in STAGES:
+            raise SystemExit(f"--budget expects STAGE=MS with STAGE one of {', '.join(STAGES)}")
+        budgets[stage] = float(value)
+    return budgets
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold start time.")
+    parser.add_argument("--runs", type=int, default=15, help="Fresh interpreters per stage")
+    parser.add_argument("--budget", action="append", default=[], metavar="STAGE=MS",
+                        help="Override a stage's median budget")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+    budgets = _parse_budgets(args.budget)
+
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+    # Warm-up: writes the sample bank snapshot if it is missing or stale.
+    _run(STAGES["paper"], _env(snapshot=True))
+
+    print(f"interpreter startup {_interpreter_ms(args.runs):.1f}ms (not included below)")
+    print(f"{'stage':>10} {'snapshot ms':>12} {'max':>8} {'no snapshot':>12} {'budget':>8}")
+    over = []
+    for stage, code in STAGES.items():
+        warm = [_run(code, _env(snapshot=True))[0] * 1000 for _ in range(args.runs)]
+        cold = [_run(code, _env(snapshot=False))[0] * 1000 for _ in range(args.runs)]
+        median = statistics.median(warm)
+        flag = "" if median <= budgets[stage] else "  OVER BUDGET"
+        print(f"{stage:>10} {median:>12.1f} {max(warm):>8.1f} {statistics.median(cold):>12.1f} "
+              f"{budgets[stage]:>8.0f}{flag}")
+        if flag:
+            over.append(stage)
+
+    _, stderr = _run(STAGES["paper"], _env(snapshot=True), importtime=True)
+    print("\nslowest imports for 'paper' (self time):")
+    for self_us, name in _top_imports(stderr, args.top):
+        print(f"{self_us / 1000:>8.2f}ms  {name}")
+
+    if over:
+        print(f"\nover budget: {', '.join(over)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Benchmark suite: paper generation end to end, stage by stage, on a
+synthetic bank of configurable size, with stored baselines to catch
+regressions.
+
+The bank is built like question_bank._create_sample_grade_questions (every
+grade/subject gets MCQ, short and long questions) with --per-type questions
+of varied length per type, written to a bank file with its near-duplicate
+index and served as QP_BANK_PATH. Stages:
+
+    select    select_question_paper from a subject's pools
+    generate  generate_question_paper (pools, near-duplicates, selection)
+    format    format_question_paper_text + format_answer_key_text
+    layout    paper_pdf_lines of the question paper and answer key
+    pdf       text_to_pdf_bytes of the question paper
+
+Each stage reports throughput and latency percentiles (the best of
+--repeats passes, as noise only makes timings worse) and peak memory
+(tracemalloc, in a separate pass so it does not skew the timings). Papers
+cycle through every subject with fixed seeds; after the first pass over a
+subject its partitions and question fragments are cached, so these are
+steady-state numbers (bench_startup.py covers cold starts).
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --save-baseline
+    python benchmarks/bench_suite.py --compare            # exit 1 on regression
+    python benchmarks/bench_suite.py --per-type 2000 --stages generate pdf
+
+Baselines are machine-specific: save one on the machine (or CI runner)
+that compares against it. The stored benchmarks/baselines.json is for the
+default configuration.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from records import Question  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines.json")
+STAGES = ("select", "generate", "format", "layout", "pdf")
+# Metrics compared against the baseline, and whether higher is better.
+GATED = {"ops_per_sec": True, "p50_ms": False, "p90_ms": False, "peak_kb": False}
+
+_LOWER_SUBJECTS = ["English", "Mathematics", "EVS", "GK"]
+_HIGHER_SUBJECTS = ["English", "Mathematics", "Science", "Social Science", "Computer Science"]
+_WORDS = (
+    "explain describe compare the a of and in with for process system structure function value "
+    "energy table number graph example property relation method result cause effect model data "
+    "force cell language history market equation pattern circuit algorithm theorem"
+).split()
+_MCQ_OPTIONS = ("A) Option A", "B) Option B", "C) Option C", "D) Option D")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:]
+
+
+def create_synthetic_bank(bank: Dict, grades: int, per_type: int, seed: int = 0) -> None:
+    """
+    Add a synthetic bank to `bank`, shaped like the sample bank: Grades
+    1-3 get 4 subjects and later grades 5, each with `per_type` MCQ, short
+    and long questions. Long answers run to several wrapped lines.
+    """
+    rng = random.Random(seed)
+    for grade_num in range(1, grades + 1):
+        grade_key = f"Grade {grade_num}"
+        bank[grade_key] = {}
+        subjects = _LOWER_SUBJECTS if grade_num <= 3 else _HIGHER_SUBJECTS
+        for subject in subjects:
+            prefix = f"Grade {grade_num} {subject}"
+            bank[grade_key][subject] = {
+                "mcq": [
+                    Question(f"{prefix} {i}: {_sentence(rng, rng.randint(6, 16))}?",
+                             options=_MCQ_OPTIONS, answer=rng.choice("ABCD"))
+                    for i in range(per_type)
+                ],
+                "short": [
+                    Question(f"{prefix} {i}: {_sentence(rng, rng.randint(8, 20))}.",
+                             answer=_sentence(rng, rng.randint(10, 30)) + ".")
+                    for i in range(per_type)
+                ],
+                "long": [
+                    Question(f"{prefix} {i}: {_sentence(rng, rng.randint(12, 40))}.",
+                             answer=_sentence(rng, rng.randint(40, 120)) + ".")
+                    for i in range(per_type)
+                ],
+            }
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def _best_timings(call: Callable[[int], object], iterations: int, repeats: int) -> Dict[str, float]:
+    best: Dict[str, float] = {}
+    for _ in range(repeats):
+        latencies = []
+        for i in range(iterations):
+            started = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - started)
+        ordered = sorted(latencies)
+        timed = {
+            "ops_per_sec": iterations / sum(latencies),
+            "p50_ms": _percentile(ordered, 50) * 1000,
+            "p90_ms": _percentile(ordered, 90) * 1000,
+            "p99_ms": _percentile(ordered, 99) * 1000,
+        }
+        for metric, value in timed.items():
+            better = max if metric == "ops_per_sec" else min
+            best[metric] = better(best.get(metric, value), value)
+    return best
+
+
+def _measure(
+    call: Callable[[int], object], iterations: int, repeats: int, memory_iterations: int
+) -> Dict[str, float]:
+    """
+    Metrics of the best of `repeats` timed passes (timings only ever get
+    worse from outside noise), plus peak traced memory of one more pass.
+    """
+    call(0)  # warm-up
+    # Objects left by setup and earlier stages would make this stage's
+    # garbage collections slower; keep them out of the collector's view.
+    gc.collect()
+    gc.freeze()
+    try:
+        best = _best_timings(call, iterations, repeats)
+    finally:
+        gc.unfreeze()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        for i in range(memory_iterations):
+            call(i)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+    return dict(best, peak_kb=peak / 1024)
+
+
+def run_suite(config: Dict, stages: Tuple[str, ...]) -> Dict[str, Dict[str, float]]:
+    """
+    Run the stages for `config` (see _config) and return their metrics.
+    """
+    import near_duplicates
+    from bank_store import write_bank
+
+    bank: Dict = {}
+    create_synthetic_bank(bank, config["grades"], config["per_type"], config["seed"])
+    subjects = [(grade, subject) for grade, by_subject in bank.items() for subject in by_subject]
+    counts = (config["mcq"], config["short"], config["long"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.qpb")
+        version = write_bank(bank, path)["version"]
+        near_duplicates.build_index(bank, version).save(near_duplicates.sidecar_path(path))
+        del bank
+        os.environ["QP_BANK_PATH"] = path
+        import generator
+        import question_bank
+        import utils
+
+        index = question_bank.get_near_duplicate_index()
+        rng = random.Random(config["seed"])
+        papers = []
+        for i in range(config["papers"]):
+            grade, subject = subjects[i % len(subjects)]
+            sections = generator.select_question_paper(
+                generator.get_question_pools(grade, subject), *counts, rng=rng, near_duplicates=index,
+            )
+            papers.append((grade, subject, sections))
+        texts = [utils.format_paper_texts(grade, subject, *sections) for grade, subject, sections in papers]
+
+        def _select(i: int) -> object:
+            grade, subject = subjects[i % len(subjects)]
+            pools = generator.get_question_pools(grade, subject)
+            return generator.select_question_paper(pools, *counts, rng=random.Random(i), near_duplicates=index)
+
+        def _generate(i: int) -> object:
+            grade, subject = subjects[i % len(subjects)]
+            return generator.generate_question_paper(grade, subject, *counts, seed=i)
+
+        def _format(i: int) -> object:
+            grade, subject, sections = papers[i % len(papers)]
+            return (utils.format_question_paper_text(grade, subject, *sections),
+                    utils.format_answer_key_text(grade, subject, *sections))
+
+        def _layout(i: int) -> object:
+            grade, subject, sections = papers[i % len(papers)]
+            return (utils.paper_pdf_lines(grade, subject, *sections),
+                    utils.paper_pdf_lines(grade, subject, *sections, answer_key=True))
+
+        def _pdf(i: int) -> object:
+            return utils.text_to_pdf_bytes(texts[i % len(texts)][0], title="Question Paper")
+
+        calls = {"select": _select, "generate": _generate, "format": _format, "layout": _layout, "pdf": _pdf}
+        results = {}
+        for stage in stages:
+            results[stage] = _measure(
+                calls[stage], config["iterations"], config["repeats"], config["memory_iterations"]
+            )
+    return results
+
+
+def _config(args: argparse.Namespace) -> Dict:
+    return {
+        "grades": args.grades,
+        "per_type": args.per_type,
+        "mcq": args.mcq,
+        "short": args.short,
+        "long": args.long,
+        "papers": args.papers,
+        "iterations": args.iterations,
+        "repeats": args.repeats,
+        "memory_iterations": args.memory_iterations,
+        "seed": args.seed,
+    }
+
+
+def _compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Print each metric against the baseline; return the regressions.
+    """
+    regressions = []
+    print(f"\n{'stage':>9} {'metric':>12} {'baseline':>11} {'now':>11} {'change':>8}")
+    for stage, metrics in results.items():
+        before = baseline["stages"].get(stage)
+        if before is None:
+            continue
+        for metric, higher_is_better in GATED.items():
+            old, new = before[metric], metrics[metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            print(f"{stage:>9} {metric:>12} {old:>11.3f} {new:>11.3f} {change:>+7.0%}{flag}")
+            if flag:
+                regressions.append(f"{stage} {metric}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark paper generation stage by stage.")
+    parser.add_argument("--grades", type=int, default=12, help="Grades in the synthetic bank")
+    parser.add_argument("--per-type", type=int, default=500, help="Questions per subject and type")
+    parser.add_argument("--mcq", type=int, default=5)
+    parser.add_argument("--short", type=int, default=3)
+    parser.add_argument("--long", type=int, default=2)
+    parser.add_argument("--papers", type=int, default=500, help="Distinct papers the format/layout/pdf stages cycle through")
+    parser.add_argument("--iterations", type=int, default=1000, help="Timed calls per pass")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed passes per stage; the best counts")
+    parser.add_argument("--memory-iterations", type=int, default=200, help="Calls per stage under tracemalloc")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare with the baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative change for the worse before --compare fails")
+    args = parser.parse_args(argv)
+
+    config = _config(args)
+    if args.compare:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"no baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            return 2
+        if baseline["config"] != config:
+            print(f"baseline was recorded with {baseline['config']}, not {config}", file=sys.stderr)
+            return 2
+
+    results = run_suite(config, tuple(args.stages))
+
+    questions = config["per_type"] * 3 * (4 * min(config["grades"], 3) + 5 * max(0, config["grades"] - 3))
+    print(f"{questions:,} questions, papers of {config['mcq']} mcq, {config['short']} short, "
+          f"{config['long']} long, best of {config['repeats']} x {config['iterations']:,} calls per stage")
+    print(f"{'stage':>9} {'ops/s':>10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'peak KB':>9}")
+    for stage, m in results.items():
+        print(f"{stage:>9} {m['ops_per_sec']:>10.0f} {m['p50_ms']:>8.3f} {m['p90_ms']:>8.3f} "
+              f"{m['p99_ms']:>8.3f} {m['peak_kb']:>9.1f}")
+
+    if args.save_baseline:
+        record = {
+            "config": config,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "stages": {
+                stage: {metric: round(value, 4) for metric, value in metrics.items()}
+                for stage, metrics in results.items()
+            },
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline saved to {args.baseline}")
+
+    if args.compare:
+        regressions = _compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nregressed beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
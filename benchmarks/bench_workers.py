@@ -0,0 +1,139 @@
+"""
+Benchmark: memory of several worker processes serving one bank file.
+
+Writes a synthetic bank file (with its near-duplicate index) and starts 1,
+2, 4, ... worker processes at once, as batch.py or several app servers
+would. Each generates papers from every subject of the bank, then reports
+its memory from /proc/self/smaps_rollup while all of them are still alive:
+
+    private   memory only this worker holds (decoded questions, caches)
+    pss       its proportional share of memory shared with the others
+
+Workers run twice: keeping every decoded partition (as before the decode
+budget) and with the bank store's default budget
+(bank_store.DECODED_CACHE_QUESTIONS). The bank file and index pages are
+shared in both; what should not grow with the bank is the private column.
+Linux only (it reads /proc).
+
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --questions 400000 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from records import Question  # noqa: E402
+
+VOCABULARY = [f"term{i}" for i in range(20_000)]
+GRADES = 10
+SUBJECTS = 20
+
+
+def _bank(count: int, rng: random.Random):
+    per_type = max(1, count // (GRADES * SUBJECTS * 3))
+    bank = {}
+    for g in range(GRADES):
+        for s in range(SUBJECTS):
+            bank.setdefault(f"Grade {g}", {})[f"Subject {s}"] = {
+                qtype: [
+                    Question(f"Explain {' '.join(rng.choices(VOCABULARY, k=rng.randint(6, 14)))}.",
+                             options=("A", "B", "C", "D") if qtype == "mcq" else (),
+                             answer="answer text")
+                    for _ in range(per_type)
+                ]
+                for qtype in ("mcq", "short", "long")
+            }
+    return bank
+
+
+def _memory_kb() -> Dict[str, int]:
+    fields = {}
+    with open("/proc/self/smaps_rollup", "r", encoding="ascii") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    return {"private": fields["Private_Clean"] + fields["Private_Dirty"], "pss": fields["Pss"]}
+
+
+def _worker(path: str, unbounded: bool, barrier, results) -> None:
+    os.environ["QP_BANK_PATH"] = path
+    import bank_store
+
+    if unbounded:
+        bank_store.DECODED_CACHE_QUESTIONS = sys.maxsize
+    import generator
+
+    started = time.perf_counter()
+    papers = 0
+    for grade, subjects in generator.QUESTION_BANK.items():
+        for subject in subjects:
+            generator.generate_question_paper(grade, subject, 5, 3, 2, seed=papers).texts()
+            papers += 1
+    elapsed = time.perf_counter() - started
+    barrier.wait()  # every worker is alive (and has its pages mapped) when measured
+    results.put(dict(_memory_kb(), papers_per_sec=papers / elapsed))
+    barrier.wait()
+
+
+def _run(path: str, workers: int, unbounded: bool) -> List[Dict]:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(path, unbounded, barrier, results)) for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return measured
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark memory of workers sharing a bank file.")
+    parser.add_argument("--questions", type=int, default=300_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args(argv)
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("needs /proc/self/smaps_rollup (Linux)", file=sys.stderr)
+        return 1
+
+    import near_duplicates
+    from bank_store import DECODED_CACHE_QUESTIONS, write_bank
+
+    bank = _bank(args.questions, random.Random(11))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.qpb")
+        stats = write_bank(bank, path)
+        near_duplicates.build_index(bank, stats["version"]).save(near_duplicates.sidecar_path(path))
+        del bank
+        print(f"{stats['count']:,} questions in {GRADES * SUBJECTS} subjects, "
+              f"bank file {os.path.getsize(path) / 2**20:.0f} MB, "
+              f"decode budget {DECODED_CACHE_QUESTIONS:,} questions")
+        print(f"{'decoded kept':>14} {'workers':>8} {'private MB':>11} {'pss MB':>8} {'total pss MB':>13} "
+              f"{'papers/s':>9}")
+        for unbounded in (True, False):
+            for workers in args.workers:
+                measured = _run(path, workers, unbounded)
+                private = statistics.median(m["private"] for m in measured) / 1024
+                pss = statistics.median(m["pss"] for m in measured) / 1024
+                total = sum(m["pss"] for m in measured) / 1024
+                rate = statistics.median(m["papers_per_sec"] for m in measured)
+                print(f"{'all' if unbounded else 'budget':>14} {workers:>8} {private:>11.1f} {pss:>8.1f} "
+                      f"{total:>13.1f} {rate:>9.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
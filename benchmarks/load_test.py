@@ -0,0 +1,157 @@
+"""
+Load test for service.py: latency percentiles and throughput.
+
+Starts the service on a free port (or targets --url) and runs --concurrency
+keep-alive clients for --requests requests in total, mixing paper
+generation (POST /papers) and PDF rendering (GET /papers/<id>.pdf)
+according to --pdf-share. Reports p50/p90/p99 latency per request kind,
+throughput and status counts (503 = rejected by backpressure).
+
+    python benchmarks/load_test.py --requests 2000 --concurrency 64
+    python benchmarks/load_test.py --url http://127.0.0.1:8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAPER_REQUEST = {"grade": "B.Tech", "subject": "DBMS", "num_mcq": 5, "num_short": 3, "num_long": 2}
+
+
+class _Connection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode("latin-1")
+            + payload
+        )
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        data = await self.reader.readexactly(int(headers.get("content-length", "0")))
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(status_line.split(" ", 2)[1]), data
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+async def _run(host: str, port: int, total: int, concurrency: int, pdf_share: float, seed: int) -> int:
+    rng = random.Random(seed)
+    kinds = ["pdf" if rng.random() < pdf_share else "paper" for _ in range(total)]
+    latencies: Dict[str, List[float]] = {"paper": [], "pdf": []}
+    statuses: Counter = Counter()
+    next_request = iter(range(total))
+
+    # One paper ID to render, so PDF requests exercise the worker pool.
+    warmup = _Connection(host, port)
+    status, data = await warmup.request("POST", "/papers", PAPER_REQUEST)
+    warmup.close()
+    if status != 200:
+        print(f"warm-up request failed with {status}: {data[:200]!r}", file=sys.stderr)
+        return 1
+    paper_id = json.loads(data)["paper_id"]
+
+    async def _client() -> None:
+        connection = _Connection(host, port)
+        try:
+            for i in next_request:
+                kind = kinds[i]
+                started = time.perf_counter()
+                if kind == "pdf":
+                    status, _ = await connection.request("GET", f"/papers/{paper_id}.pdf")
+                else:
+                    status, _ = await connection.request("POST", "/papers", PAPER_REQUEST)
+                statuses[status] += 1
+                if status == 200:
+                    latencies[kind].append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{total:,} requests, {concurrency} clients, {elapsed:.2f}s, {total / elapsed:,.0f} req/s")
+    print(f"statuses: {dict(sorted(statuses.items()))}")
+    print(f"{'kind':>6} {'ok':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, values in latencies.items():
+        print(
+            f"{kind:>6} {len(values):>7,} "
+            + " ".join(f"{_percentile(values, p) * 1000:>8.2f}" for p in (50, 90, 99, 100))
+        )
+    return 0
+
+
+def _start_service(workers: Optional[int]) -> Tuple[subprocess.Popen, str, int]:
+    command = [sys.executable, os.path.join(ROOT, "service.py"), "--port", "0"]
+    if workers is not None:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Serving on "):
+        process.kill()
+        raise RuntimeError(f"service did not start: {line!r}")
+    url = urlsplit(line.split()[-1])
+    return process, url.hostname, url.port
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the HTTP generation service.")
+    parser.add_argument("--url", help="Service to test (default: start one on a free port)")
+    parser.add_argument("--workers", type=int, default=None, help="Workers for the started service")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pdf-share", type=float, default=0.5, help="Fraction of PDF requests")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        process, host, port = _start_service(args.workers)
+    try:
+        return asyncio.run(_run(host, port, args.requests, args.concurrency, args.pdf_share, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,112 @@
+import base64
+import binascii
+import bisect
+import contextlib
+import functools
 import random
-from typing import List, Dict, Tuple
+import string
+import struct
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING, Container, Deque, List, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional,
+    Sequence, Set, Tuple,
+)
 
-from question_bank import QUESTION_BANK
-from utils import format_question_paper_text, format_answer_key_text
+from question_bank import (
+    QUESTION_BANK,
+    QUESTION_TYPES,
+    get_near_duplicate_index,
+    get_partition_version,
+    get_question_type_counts,
+)
+from records import Question, question_key
+from utils import format_answer_key_text, format_paper_texts, format_question_paper_text, paper_pdf_bytes
+
+# Only needed for annotations; importing them (json, sqlite3) is left to
+# the callers that pass an index or a history in.
+if TYPE_CHECKING:
+    from near_duplicates import NearDuplicateIndex
+    from usage_history import UsageHistory
 
 
 def _select_questions(
     pool: List[Dict],
     requested: int,
+    rng: Optional[random.Random] = None,
+    near_duplicates: Optional["NearDuplicateIndex"] = None,
+    used_groups: Optional[Set[int]] = None,
+    sampler: Optional["FenwickSampler"] = None,
 ) -> List[Dict]:
     """
-    Select exactly 'requested' questions (or as many as available if fewer),
-    using a fresh local copy and shuffling it each time.
+    Select exactly 'requested' questions (or as many as available if fewer)
+    in random order, without mutating the pool.
+
+    random.sample only touches O(requested) items for large pools instead of
+    copying and shuffling the whole pool. Pass a seeded random.Random as `rng`
+    for reproducible output.
+
+    With a near-duplicate index, at most one question per near-duplicate
+    group is chosen; pass the same `used_groups` set for every section of a
+    paper. Rejected picks are replaced by further random draws, so papers
+    from a bank without near-duplicates are unchanged.
+
+    With a `sampler` over the pool's weights, questions are drawn by weight
+    instead of uniformly, in O(log n) per question.
     """
     if requested <= 0 or not pool:
         return []
 
-    local_copy = pool[:]  # IMPORTANT: do not mutate global pool
-    random.shuffle(local_copy)
-    requested = min(requested, len(local_copy))
-    return local_copy[:requested]
+    rng = rng or random
+    requested = min(requested, len(pool))
+    used_groups = set() if used_groups is None else used_groups
+    if sampler is not None:
+        with contextlib.closing(sampler.draw(rng)) as draws:
+            return _take_distinct(pool, draws, requested, near_duplicates, used_groups)
 
+    positions = rng.sample(range(len(pool)), requested)
+    if not near_duplicates:
+        return [pool[pos] for pos in positions]
 
-def generate_question_paper(
-    grade: str,
-    subject: str,
-    num_mcq: int,
-    num_short: int,
-    num_long: int,
-) -> Tuple[str, str]:
+    selected = _take_distinct(pool, positions, requested, near_duplicates, used_groups)
+    if len(selected) < requested:
+        drawn = set(positions)
+        rest = (pos for pos in _iter_random(range(len(pool)), rng) if pos not in drawn)
+        selected += _take_distinct(pool, rest, requested - len(selected), near_duplicates, used_groups)
+    return selected
+
+
+def _take_distinct(
+    pool: Sequence[Dict],
+    positions: Iterable[int],
+    requested: int,
+    near_duplicates: Optional["NearDuplicateIndex"],
+    used_groups: Set[int],
+) -> List[Dict]:
     """
-    Generate question paper and answer key text for the given configuration.
+    The first `requested` questions at `positions`, skipping near-duplicates
+    of questions already in the paper.
     """
+    selected = []
+    for pos in positions:
+        group = near_duplicates.group_of(pool[pos]) if near_duplicates else None
+        if group is not None:
+            if group in used_groups:
+                continue
+            used_groups.add(group)
+        selected.append(pool[pos])
+        if len(selected) == requested:
+            break
+    return selected
 
+
+def get_question_pools(grade: str, subject: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Look up the (mcq, short, long) pools for a grade/subject.
+    """
     subject_data = QUESTION_BANK.get(grade, {}).get(subject)
     if not subject_data:
         raise ValueError(f"No questions configured for {grade} - {subject}")
@@ -40,24 +114,1049 @@ def generate_question_paper(
     mcqs_pool = subject_data.get("mcq", [])
     short_pool = subject_data.get("short", [])
     long_pool = subject_data.get("long", [])
+    return mcqs_pool, short_pool, long_pool
+
+
+def select_question_paper(
+    pools: Tuple[List[Dict], List[Dict], List[Dict]],
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    rng: Optional[random.Random] = None,
+    near_duplicates: Optional["NearDuplicateIndex"] = None,
+    samplers: Optional[Sequence["FenwickSampler"]] = None,
+) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Select (mcqs, shorts, longs) from already looked-up pools.
+
+    Near-duplicate questions are kept out of the same paper, using the
+    bank's near-duplicate index unless one is passed in. `samplers` (one
+    per pool) switch to weighted selection, see recency_samplers.
+    """
+    if near_duplicates is None:
+        near_duplicates = get_near_duplicate_index()
+    used_groups: Set[int] = set()
+    samplers = samplers or (None, None, None)
+    return tuple(
+        _select_questions(pool, requested, rng, near_duplicates, used_groups, sampler)
+        for pool, requested, sampler in zip(pools, (num_mcq, num_short, num_long), samplers)
+    )
+
+
+class QuestionPaper:
+    """
+    A generated paper: the selected questions, with the question paper and
+    answer key text and PDFs rendered on first access and memoized, so
+    artifacts nobody asks for cost nothing.
+
+    Unpacks like the (qp_text, answer_key_text) tuple that generation used
+    to return: `qp_text, answer_key_text = generate_question_paper(...)`.
+    """
+
+    __slots__ = (
+        "grade", "subject", "mcqs", "shorts", "longs", "paper_id", "set_label",
+        "_qp_text", "_answer_key_text", "_pdfs",
+    )
+
+    def __init__(
+        self,
+        grade: str,
+        subject: str,
+        mcqs: List[Dict],
+        shorts: List[Dict],
+        longs: List[Dict],
+        paper_id: str = "",
+        set_label: Optional[str] = None,
+    ):
+        self.grade = grade
+        self.subject = subject
+        self.mcqs = mcqs
+        self.shorts = shorts
+        self.longs = longs
+        self.paper_id = paper_id
+        self.set_label = set_label
+        self._qp_text: Optional[str] = None
+        self._answer_key_text: Optional[str] = None
+        self._pdfs: Dict[Tuple[bool, bool], bytes] = {}
+
+    @property
+    def questions(self) -> List[Dict]:
+        return self.mcqs + self.shorts + self.longs
+
+    @property
+    def qp_text(self) -> str:
+        if self._qp_text is None:
+            self._qp_text = format_question_paper_text(
+                self.grade, self.subject, self.mcqs, self.shorts, self.longs, set_label=self.set_label
+            )
+        return self._qp_text
+
+    @property
+    def answer_key_text(self) -> str:
+        if self._answer_key_text is None:
+            self._answer_key_text = format_answer_key_text(
+                self.grade, self.subject, self.mcqs, self.shorts, self.longs, set_label=self.set_label
+            )
+        return self._answer_key_text
+
+    def _pdf(self, answer_key: bool, title: str, compress: bool) -> bytes:
+        # Laid out from the questions' pre-rendered fragments; the text
+        # does not need to be formatted first.
+        pdf = self._pdfs.get((answer_key, compress))
+        if pdf is None:
+            pdf = self._pdfs[(answer_key, compress)] = paper_pdf_bytes(
+                self.grade, self.subject, self.mcqs, self.shorts, self.longs,
+                answer_key=answer_key, set_label=self.set_label, title=title, compress=compress,
+            )
+        return pdf
+
+    def _title(self, title: str) -> str:
+        return f"{title} - {self.set_label}" if self.set_label else title
+
+    def qp_pdf(self, compress: bool = False) -> bytes:
+        return self._pdf(False, self._title("Question Paper"), compress)
+
+    def answer_key_pdf(self, compress: bool = False) -> bytes:
+        return self._pdf(True, self._title("Answer Key"), compress)
+
+    def texts(self) -> Tuple[str, str]:
+        """
+        (qp_text, answer_key_text); renders whatever is missing in one pass.
+        """
+        if self._qp_text is None and self._answer_key_text is None:
+            self._qp_text, self._answer_key_text = format_paper_texts(
+                self.grade, self.subject, self.mcqs, self.shorts, self.longs, set_label=self.set_label
+            )
+        return self.qp_text, self.answer_key_text
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.texts())
+
+    def __len__(self) -> int:
+        return 2
+
+    def __getitem__(self, index):
+        return self.texts()[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (QuestionPaper, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        counts = f"{len(self.mcqs)} mcq, {len(self.shorts)} short, {len(self.longs)} long"
+        return f"QuestionPaper({self.grade!r}, {self.subject!r}, {counts})"
+
+
+def build_question_paper(
+    grade: str,
+    subject: str,
+    pools: Tuple[List[Dict], List[Dict], List[Dict]],
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    rng: Optional[random.Random] = None,
+    near_duplicates: Optional["NearDuplicateIndex"] = None,
+) -> QuestionPaper:
+    """
+    Generate a paper from already looked-up pools, so batch runs can reuse
+    the pools across papers.
+    """
+    mcqs, shorts, longs = select_question_paper(
+        pools, num_mcq, num_short, num_long, rng, near_duplicates
+    )
+    return QuestionPaper(grade, subject, mcqs, shorts, longs)
+
+
+def generate_question_paper(
+    grade: str,
+    subject: str,
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    seed: Optional[int] = None,
+    history: Optional["UsageHistory"] = None,
+) -> QuestionPaper:
+    """
+    Generate a paper for the given configuration; its question paper and
+    answer key text are formatted on first use.
+
+    With a seed, the same bank and configuration always give the same paper.
+    With a usage `history`, recently used questions are less likely to be
+    chosen and the paper's questions are recorded in the history; such
+    papers also depend on the history, not just the seed.
+    """
+    pools = get_question_pools(grade, subject)
+    rng = random.Random(seed) if seed is not None else None
+    if history is None:
+        return build_question_paper(grade, subject, pools, num_mcq, num_short, num_long, rng)
+
+    # Drawing temporarily zeroes weights in the shared samplers.
+    with _RECENCY_LOCK:
+        now = time.time()
+        samplers = recency_samplers(history, grade, subject, pools, now)
+        mcqs, shorts, longs = select_question_paper(
+            pools, num_mcq, num_short, num_long, rng, samplers=samplers
+        )
+        record_usage(history, grade, subject, pools, (mcqs, shorts, longs), used_at=now)
+    return QuestionPaper(grade, subject, mcqs, shorts, longs)
+
+
+# ---------- RECENCY-WEIGHTED SELECTION ----------
+# Questions recorded in a UsageHistory get a weight that drops to
+# RECENCY_FLOOR right after use and recovers towards 1 with a half-life of
+# RECENCY_HALF_LIFE_DAYS. Weighted draws use a Fenwick tree per pool, so a
+# section of k questions costs O(k log n). Trees are cached per history,
+# bank version and grade/subject, rebuilt when the day changes or another
+# process records a paper, and updated in place for papers recorded here.
+
+RECENCY_HALF_LIFE_DAYS = 120.0
+RECENCY_FLOOR = 0.05
+_SECONDS_PER_DAY = 86400
+
+
+class FenwickSampler:
+    """
+    Weighted sampling without replacement over a Fenwick (binary indexed)
+    tree of item weights: O(n) to build, O(log n) per draw or weight
+    change.
+    """
+
+    def __init__(self, weights: Iterable[float]):
+        self._weights = array("d", weights)
+        n = len(self._weights)
+        tree = array("d", bytes(8 * (n + 1)))
+        for i, weight in enumerate(self._weights, start=1):
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top = 1 << (n.bit_length() - 1) if n else 0
+        self._positive = sum(1 for weight in self._weights if weight > 0)
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def weight(self, i: int) -> float:
+        return self._weights[i]
+
+    def total(self) -> float:
+        tree = self._tree
+        i = len(self._weights)
+        total = 0.0
+        while i:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _add(self, i: int, delta: float) -> None:
+        tree = self._tree
+        n = len(self._weights)
+        i += 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def set_weight(self, i: int, weight: float) -> None:
+        old = self._weights[i]
+        self._positive += (weight > 0) - (old > 0)
+        self._weights[i] = weight
+        self._add(i, weight - old)
+
+    def _find(self, target: float) -> int:
+        """
+        Index of the item whose cumulative weight range contains `target`.
+        """
+        tree = self._tree
+        n = len(self._weights)
+        pos = 0
+        step = self._top
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+    def draw(self, rng) -> Iterator[int]:
+        """
+        Yield item indices with probability proportional to weight, without
+        replacement. Drawn items are zeroed while the generator runs and
+        restored when it finishes or is closed.
+        """
+        removed: List[Tuple[int, float]] = []
+        try:
+            while self._positive:
+                i = self._find(rng.random() * self.total())
+                weight = self._weights[i]
+                if weight <= 0:
+                    continue  # rounding at a range boundary; draw again
+                removed.append((i, weight))
+                self.set_weight(i, 0.0)
+                yield i
+        finally:
+            for i, weight in reversed(removed):
+                self.set_weight(i, weight)
+
+
+def recency_weight(last_used_at: Optional[float], now: float) -> float:
+    """
+    Selection weight of a question last used at `last_used_at` (None if
+    never used).
+    """
+    if last_used_at is None:
+        return 1.0
+    age_days = max(now - last_used_at, 0.0) / _SECONDS_PER_DAY
+    return 1.0 - (1.0 - RECENCY_FLOOR) * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+class _RecencyEntry(NamedTuple):
+    revision: int
+    day: int
+    samplers: Tuple[FenwickSampler, ...]
+    positions: Tuple[Dict[int, int], ...]
+
+
+_RECENCY_CACHE: Dict[Tuple[str, str, str, str], _RecencyEntry] = {}
+_RECENCY_LOCK = threading.RLock()
+
+
+def recency_samplers(
+    history: "UsageHistory",
+    grade: str,
+    subject: str,
+    pools: Tuple[List[Dict], List[Dict], List[Dict]],
+    now: Optional[float] = None,
+) -> Tuple[FenwickSampler, ...]:
+    """
+    One recency-weighted sampler per pool of `grade`/`subject`.
+    """
+    now = time.time() if now is None else now
+    cache_key = (history.path, get_partition_version(grade, subject), grade, subject)
+    revision = history.revision()
+    day = int(now // _SECONDS_PER_DAY)
+    entry = _RECENCY_CACHE.get(cache_key)
+    if entry is not None and entry.revision == revision and entry.day == day:
+        return entry.samplers
+
+    last_used = history.last_used(grade, subject)
+    samplers = []
+    positions = []
+    for pool in pools:
+        keys = [question_key(question) for question in pool]
+        samplers.append(FenwickSampler(recency_weight(last_used.get(key), now) for key in keys))
+        positions.append({key: pos for pos, key in enumerate(keys)})
+    entry = _RecencyEntry(revision, day, tuple(samplers), tuple(positions))
+    _RECENCY_CACHE[cache_key] = entry
+    return entry.samplers
 
-    selected_mcqs = _select_questions(mcqs_pool, num_mcq)
-    selected_shorts = _select_questions(short_pool, num_short)
-    selected_longs = _select_questions(long_pool, num_long)
 
-    qp_text = format_question_paper_text(
-        grade=grade,
-        subject=subject,
-        mcqs=selected_mcqs,
-        shorts=selected_shorts,
-        longs=selected_longs,
+def record_usage(
+    history: "UsageHistory",
+    grade: str,
+    subject: str,
+    pools: Tuple[List[Dict], List[Dict], List[Dict]],
+    selected: Tuple[List[Dict], List[Dict], List[Dict]],
+    paper_id: str = "",
+    used_at: Optional[float] = None,
+) -> None:
+    """
+    Record a paper's questions in `history` and lower their weights in the
+    cached samplers, in O(k log n), instead of rebuilding them.
+    """
+    used_at = time.time() if used_at is None else used_at
+    revision = history.record_paper(
+        grade, subject, [q for section in selected for q in section], paper_id, used_at
     )
-    answer_key_text = format_answer_key_text(
-        grade=grade,
-        subject=subject,
-        mcqs=selected_mcqs,
-        shorts=selected_shorts,
-        longs=selected_longs,
+    cache_key = (history.path, get_partition_version(grade, subject), grade, subject)
+    entry = _RECENCY_CACHE.get(cache_key)
+    if entry is None or entry.revision != revision - 1:
+        return  # not cached, or another process wrote in between: rebuild on next use
+    weight = recency_weight(used_at, used_at)
+    for sampler, positions, section in zip(entry.samplers, entry.positions, selected):
+        for question in section:
+            pos = positions.get(question_key(question))
+            if pos is not None:
+                sampler.set_weight(pos, weight)
+    _RECENCY_CACHE[cache_key] = entry._replace(revision=revision)
+
+
+# ---------- PARALLEL SETS (A/B/C/D) ----------
+# Exam halls use K sets of the same paper with no question shared between
+# sets. All K sets are dealt from one lazy random permutation of each pool
+# instead of re-drawing whole papers until they happen not to overlap.
+
+SET_LABELS = string.ascii_uppercase
+
+
+def check_parallel_sets(
+    grade: str,
+    subject: str,
+    num_sets: int,
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+) -> None:
+    """
+    Raise ValueError if the bank cannot supply `num_sets` non-overlapping
+    sets; answered from the catalog's per-type counts without touching
+    the pools.
+    """
+    if not 1 <= num_sets <= len(SET_LABELS):
+        raise ValueError(f"Number of sets must be between 1 and {len(SET_LABELS)}, got {num_sets}")
+
+    counts = get_question_type_counts(grade, subject)
+    shortfalls = []
+    for qtype, requested in zip(QUESTION_TYPES, (num_mcq, num_short, num_long)):
+        needed = num_sets * max(requested, 0)
+        available = counts.get(qtype, 0)
+        if needed > available:
+            shortfalls.append(f"{qtype}: {num_sets} x {requested} = {needed} needed, {available} available")
+    if shortfalls:
+        raise ValueError(
+            f"Not enough questions for {num_sets} non-overlapping sets of {grade} - {subject}: "
+            + "; ".join(shortfalls)
+        )
+
+
+def _deal_sets(
+    pool: Sequence[Dict],
+    num_sets: int,
+    requested: int,
+    rng,
+    near_duplicates: Optional["NearDuplicateIndex"],
+    used_groups: List[Set[int]],
+) -> List[List[Dict]]:
+    """
+    Deal `requested` questions to each of `num_sets` sets, round-robin,
+    from a single pass over a lazy random permutation of `pool`. A question
+    is skipped by sets that already hold one of its near-duplicates.
+    """
+    sets: List[List[Dict]] = [[] for _ in range(num_sets)]
+    if requested <= 0:
+        return sets
+
+    waiting = deque(range(num_sets))
+    for pos in _iter_random(range(len(pool)), rng):
+        question = pool[pos]
+        group = near_duplicates.group_of(question) if near_duplicates else None
+        for _ in range(len(waiting)):
+            i = waiting.popleft()
+            if group is not None and group in used_groups[i]:
+                waiting.append(i)
+                continue
+            sets[i].append(question)
+            if group is not None:
+                used_groups[i].add(group)
+            if len(sets[i]) < requested:
+                waiting.append(i)
+            break
+        if not waiting:
+            return sets
+    raise ValueError(
+        f"Only {sum(map(len, sets))} of {num_sets * requested} questions could be dealt "
+        "without repeating near-duplicates within a set"
     )
 
-    return qp_text, answer_key_text
+
+def select_parallel_sets(
+    pools: Tuple[List[Dict], List[Dict], List[Dict]],
+    num_sets: int,
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    rng: Optional[random.Random] = None,
+    near_duplicates: Optional["NearDuplicateIndex"] = None,
+) -> List[Tuple[List[Dict], List[Dict], List[Dict]]]:
+    """
+    Select (mcqs, shorts, longs) for each of `num_sets` sets so that no
+    question appears in two sets and every set has the requested counts.
+    """
+    rng = rng or random
+    if near_duplicates is None:
+        near_duplicates = get_near_duplicate_index()
+    used_groups: List[Set[int]] = [set() for _ in range(num_sets)]
+    dealt = [
+        _deal_sets(pool, num_sets, requested, rng, near_duplicates, used_groups)
+        for pool, requested in zip(pools, (num_mcq, num_short, num_long))
+    ]
+    return list(zip(*dealt))
+
+
+def generate_parallel_sets(
+    grade: str,
+    subject: str,
+    num_sets: int,
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    seed: Optional[int] = None,
+) -> List[QuestionPaper]:
+    """
+    Generate `num_sets` non-overlapping sets of one paper configuration,
+    labelled "Set A", "Set B", ... (QuestionPaper.set_label).
+    """
+    check_parallel_sets(grade, subject, num_sets, num_mcq, num_short, num_long)
+    pools = get_question_pools(grade, subject)
+    rng = random.Random(seed) if seed is not None else None
+    sets = select_parallel_sets(pools, num_sets, num_mcq, num_short, num_long, rng)
+
+    return [
+        QuestionPaper(grade, subject, mcqs, shorts, longs, set_label=f"Set {letter}")
+        for letter, (mcqs, shorts, longs) in zip(SET_LABELS, sets)
+    ]
+
+
+# ---------- REPRODUCIBLE PAPERS & PAPER IDS ----------
+# A paper is fully determined by (bank version, configuration, seed), so it
+# can be archived as its paper ID and re-derived on demand.
+
+_PAPER_ID_FORMAT = 1
+_PAPER_ID_STRUCT = struct.Struct("<B8sHHHQ")
+_MAX_COUNT = (1 << 16) - 1
+_SEED_BITS = 64
+# Fresh seeds leave headroom so batch runs can use seed, seed + 1, ...
+_FRESH_SEED_BITS = 48
+
+
+class PaperSpec(NamedTuple):
+    bank_version: str
+    grade: str
+    subject: str
+    num_mcq: int
+    num_short: int
+    num_long: int
+    seed: int
+
+
+def make_paper_spec(
+    grade: str,
+    subject: str,
+    num_mcq: int,
+    num_short: int,
+    num_long: int,
+    seed: Optional[int] = None,
+) -> PaperSpec:
+    """
+    Pin a configuration to the current version of its grade/subject in the
+    bank, drawing a fresh seed if none is given.
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(_FRESH_SEED_BITS)
+    return PaperSpec(get_partition_version(grade, subject), grade, subject, num_mcq, num_short, num_long, seed)
+
+
+def encode_paper_id(spec: PaperSpec) -> str:
+    """
+    Encode a PaperSpec as a short URL-safe string.
+    """
+    if not 0 <= spec.seed < 1 << _SEED_BITS:
+        raise ValueError(f"Seed must be a non-negative {_SEED_BITS}-bit integer")
+    for name in ("num_mcq", "num_short", "num_long"):
+        if not 0 <= getattr(spec, name) <= _MAX_COUNT:
+            raise ValueError(f"{name} must be between 0 and {_MAX_COUNT}")
+    packed = _PAPER_ID_STRUCT.pack(
+        _PAPER_ID_FORMAT,
+        bytes.fromhex(spec.bank_version),
+        spec.num_mcq,
+        spec.num_short,
+        spec.num_long,
+        spec.seed,
+    )
+    packed += "\x1f".join((spec.grade, spec.subject)).encode("utf-8")
+    return base64.urlsafe_b64encode(packed).decode("ascii").rstrip("=")
+
+
+def decode_paper_id(paper_id: str) -> PaperSpec:
+    try:
+        packed = base64.urlsafe_b64decode(paper_id + "=" * (-len(paper_id) % 4))
+        fmt, version, num_mcq, num_short, num_long, seed = _PAPER_ID_STRUCT.unpack_from(packed)
+        grade, subject = packed[_PAPER_ID_STRUCT.size:].decode("utf-8").split("\x1f")
+    except (binascii.Error, struct.error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid paper ID: {paper_id!r}") from None
+    if fmt != _PAPER_ID_FORMAT:
+        raise ValueError(f"Unsupported paper ID format {fmt}")
+    return PaperSpec(version.hex(), grade, subject, num_mcq, num_short, num_long, seed)
+
+
+def generate_from_spec(spec: PaperSpec) -> QuestionPaper:
+    """
+    Generate the paper described by `spec`, with its paper ID set. Raises
+    ValueError if the grade/subject has changed in the bank since the spec
+    was made, as the paper could not be reproduced faithfully.
+    """
+    current = get_partition_version(spec.grade, spec.subject)
+    if spec.bank_version != current:
+        raise ValueError(
+            f"Paper was generated from bank version {spec.bank_version}, "
+            f"current bank version is {current}"
+        )
+    paper = generate_question_paper(
+        grade=spec.grade,
+        subject=spec.subject,
+        num_mcq=spec.num_mcq,
+        num_short=spec.num_short,
+        num_long=spec.num_long,
+        seed=spec.seed,
+    )
+    paper.paper_id = encode_paper_id(spec)
+    return paper
+
+
+def regenerate_question_paper(paper_id: str) -> QuestionPaper:
+    """
+    Re-derive the paper for a paper ID.
+    """
+    return generate_from_spec(decode_paper_id(paper_id))
+
+
+# ---------- BLUEPRINT SELECTION ----------
+# A blueprint describes a paper by constraints instead of plain counts:
+# questions per type, total marks, a minimum number of questions per
+# difficulty level and per topic, and questions that must not be reused.
+# Questions carry their attributes as tags: "difficulty:easy",
+# "topic:loops" (any tag can be a topic constraint) and "marks:3"
+# (otherwise DEFAULT_MARKS for the question type applies).
+
+DEFAULT_MARKS = {"mcq": 1, "short": 2, "long": 5}
+_NO_DIFFICULTY = ""
+_EMPTY_CONSTRAINTS: Mapping[str, int] = MappingProxyType({})
+
+
+class BlueprintInfeasible(ValueError):
+    """Raised when no selection of questions satisfies a blueprint."""
+
+    def __init__(self, reasons: List[str]):
+        super().__init__("Blueprint cannot be satisfied: " + "; ".join(reasons))
+        self.reasons = reasons
+
+
+class Blueprint(NamedTuple):
+    counts: Mapping[str, int]
+    total_marks: Optional[int] = None
+    difficulty: Mapping[str, int] = _EMPTY_CONSTRAINTS
+    topics: Mapping[str, int] = _EMPTY_CONSTRAINTS
+    exclude: Container[int] = frozenset()
+
+
+class RecentPapers:
+    """
+    Question keys used by the last `n` papers. Pass it as
+    Blueprint.exclude to avoid repeating questions within `n` papers.
+    """
+
+    def __init__(self, n: int):
+        self._papers: Deque[List[int]] = deque()
+        self._counts: Counter = Counter()
+        self.n = n
+
+    def add(self, questions: Iterable[Question]) -> None:
+        keys = [question_key(q) for q in questions]
+        self._papers.append(keys)
+        self._counts.update(keys)
+        while len(self._papers) > self.n:
+            self._counts.subtract(self._papers.popleft())
+            self._counts += Counter()  # drop keys whose count reached zero
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._counts
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._counts)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+def _iter_random(population: Sequence, rng: random.Random) -> Iterator:
+    """
+    Yield the items of `population` in random order, lazily: a partial
+    Fisher-Yates shuffle over a sparse swap table, so drawing k items costs
+    O(k) regardless of the population size.
+    """
+    swapped: Dict[int, int] = {}
+    size = len(population)
+    for i in range(size):
+        j = rng.randrange(i, size)
+        picked = swapped.get(j, j)
+        swapped[j] = swapped.get(i, i)
+        yield population[picked]
+
+
+class _PoolIndex:
+    """
+    Per-attribute index over one grade/subject, built once per bank
+    version: marks, difficulty, tags and near-duplicate group per question,
+    plus position lists per (type, difficulty), per tag and per (type,
+    difficulty, marks).
+    """
+
+    def __init__(
+        self,
+        pools: Dict[str, Sequence[Question]],
+        near_duplicates: Optional["NearDuplicateIndex"] = None,
+    ):
+        self.pools = pools
+        self.marks: Dict[str, array] = {}
+        self.difficulty: Dict[str, List[str]] = {}
+        self.tags: Dict[str, List[Tuple[str, ...]]] = {}
+        self.by_difficulty: Dict[str, Dict[str, List[int]]] = {}
+        self.by_tag: Dict[str, Dict[str, List[int]]] = {}
+        self.by_marks: Dict[Tuple[str, str], Dict[int, List[int]]] = {}
+        self.marks_counts: Dict[str, Counter] = {}
+        self.position_of: Dict[int, Tuple[str, int]] = {}
+        # Only questions with near-duplicates have a group.
+        self.group: Dict[str, Dict[int, int]] = {}
+
+        for qtype, pool in pools.items():
+            marks = array("H")
+            difficulty = []
+            tags = []
+            by_difficulty: Dict[str, List[int]] = {}
+            groups: Dict[int, int] = {}
+            for pos, question in enumerate(pool):
+                question_tags = tuple(question.get("tags", ()))
+                level = _NO_DIFFICULTY
+                mark = DEFAULT_MARKS.get(qtype, 1)
+                for tag in question_tags:
+                    key, _, value = tag.partition(":")
+                    if key == "difficulty":
+                        level = value
+                    elif key == "marks" and value.isdigit():
+                        mark = int(value)
+                    self.by_tag.setdefault(tag, {}).setdefault(qtype, []).append(pos)
+                marks.append(mark)
+                difficulty.append(level)
+                tags.append(question_tags)
+                by_difficulty.setdefault(level, []).append(pos)
+                self.by_marks.setdefault((qtype, level), {}).setdefault(mark, []).append(pos)
+                key = question_key(question)
+                self.position_of[key] = (qtype, pos)
+                group = near_duplicates.group_of_key(key) if near_duplicates else None
+                if group is not None:
+                    groups[pos] = group
+
+            self.marks[qtype] = marks
+            self.difficulty[qtype] = difficulty
+            self.tags[qtype] = tags
+            self.by_difficulty[qtype] = by_difficulty
+            self.marks_counts[qtype] = Counter(marks)
+            self.group[qtype] = groups
+
+
+@functools.lru_cache(maxsize=32)
+def _pool_index(grade: str, subject: str, bank_version: str) -> _PoolIndex:
+    pools = dict(zip(QUESTION_TYPES, get_question_pools(grade, subject)))
+    return _PoolIndex(pools, get_near_duplicate_index())
+
+
+def _check_blueprint(index: _PoolIndex, blueprint: Blueprint) -> None:
+    """
+    Reject blueprints that cannot be satisfied, before searching.
+    """
+    reasons = []
+    excluded_types: Counter = Counter()
+    excluded_levels: Counter = Counter()
+    excluded_tags: Counter = Counter()
+    for key in blueprint.exclude:
+        where = index.position_of.get(key)
+        if where is None or not blueprint.counts.get(where[0]):
+            continue
+        qtype, pos = where
+        excluded_types[qtype] += 1
+        excluded_levels[index.difficulty[qtype][pos]] += 1
+        excluded_tags.update(index.tags[qtype][pos])
+
+    total_questions = 0
+    for qtype, requested in blueprint.counts.items():
+        if qtype not in index.pools:
+            reasons.append(f"unknown question type {qtype!r}")
+            continue
+        available = len(index.pools[qtype]) - excluded_types[qtype]
+        if requested > available:
+            reasons.append(f"{requested} {qtype} questions requested, {available} available")
+        total_questions += requested
+
+    if sum(blueprint.difficulty.values()) > total_questions:
+        reasons.append("difficulty minimums exceed the number of questions")
+    for level, minimum in blueprint.difficulty.items():
+        available = sum(
+            len(index.by_difficulty[qtype].get(level, ()))
+            for qtype in index.pools if blueprint.counts.get(qtype)
+        ) - excluded_levels[level]
+        if minimum > available:
+            reasons.append(f"{minimum} {level!r} questions required, {available} available")
+
+    for tag, minimum in blueprint.topics.items():
+        available = sum(
+            len(positions) for qtype, positions in index.by_tag.get(tag, {}).items()
+            if blueprint.counts.get(qtype)
+        ) - excluded_tags[tag]
+        if minimum > available:
+            reasons.append(f"{minimum} {tag!r} questions required, {available} available")
+
+    if blueprint.total_marks is not None and not reasons:
+        lowest = highest = 0
+        for qtype, requested in blueprint.counts.items():
+            values = sorted(index.marks_counts[qtype].elements())
+            lowest += sum(values[:requested])
+            highest += sum(values[len(values) - requested:]) if requested else 0
+        if not lowest <= blueprint.total_marks <= highest:
+            reasons.append(
+                f"total marks {blueprint.total_marks} outside the achievable range {lowest}-{highest}"
+            )
+
+    if reasons:
+        raise BlueprintInfeasible(reasons)
+
+
+class _Selection:
+    """
+    Questions chosen so far in one blueprint attempt, with running totals.
+    """
+
+    def __init__(self, index: _PoolIndex, blueprint: Blueprint):
+        self.index = index
+        self.blueprint = blueprint
+        self.capacity = dict(blueprint.counts)
+        self.chosen: Dict[str, List[int]] = {qtype: [] for qtype in QUESTION_TYPES}
+        self.taken: Set[Tuple[str, int]] = set()
+        self.levels: Counter = Counter()
+        self.tags: Counter = Counter()
+        self.groups: Set[int] = set()
+        self.marks = 0
+
+    def usable(self, qtype: str, pos: int) -> bool:
+        if (qtype, pos) in self.taken or self.index.group[qtype].get(pos) in self.groups:
+            return False
+        exclude = self.blueprint.exclude
+        return not exclude or question_key(self.index.pools[qtype][pos]) not in exclude
+
+    def take(self, qtype: str, pos: int) -> None:
+        self.capacity[qtype] -= 1
+        self.chosen[qtype].append(pos)
+        self.taken.add((qtype, pos))
+        self.levels[self.index.difficulty[qtype][pos]] += 1
+        self.tags.update(self.index.tags[qtype][pos])
+        self._add_group(qtype, pos)
+        self.marks += self.index.marks[qtype][pos]
+
+    def _add_group(self, qtype: str, pos: int) -> None:
+        group = self.index.group[qtype].get(pos)
+        if group is not None:
+            self.groups.add(group)
+
+    def swap(self, qtype: str, slot: int, pos: int) -> None:
+        old = self.chosen[qtype][slot]
+        self.taken.discard((qtype, old))
+        self.tags.subtract(self.index.tags[qtype][old])
+        self.groups.discard(self.index.group[qtype].get(old))
+        self.marks -= self.index.marks[qtype][old]
+        self.chosen[qtype][slot] = pos
+        self.taken.add((qtype, pos))
+        self.tags.update(self.index.tags[qtype][pos])
+        self._add_group(qtype, pos)
+        self.marks += self.index.marks[qtype][pos]
+
+    def unmet(self) -> List[str]:
+        blueprint = self.blueprint
+        problems = [
+            f"{level!r} difficulty" for level, minimum in blueprint.difficulty.items()
+            if self.levels[level] < minimum
+        ]
+        problems += [
+            f"topic {tag!r}" for tag, minimum in blueprint.topics.items()
+            if self.tags[tag] < minimum
+        ]
+        if blueprint.total_marks is not None and self.marks != blueprint.total_marks:
+            problems.append(f"total marks ({self.marks} != {blueprint.total_marks})")
+        return problems
+
+
+def _draw_one(
+    selection: _Selection,
+    candidates: Dict[str, List[int]],
+    rng: random.Random,
+    prefer=None,
+    lookahead: int = 8,
+) -> Optional[Tuple[str, int]]:
+    """
+    Draw a random usable (type, position) from per-type candidate lists,
+    only for types that still have capacity. If `prefer` is given, the
+    first of up to `lookahead` usable draws that satisfies it wins.
+    """
+    lists = [
+        (qtype, positions) for qtype, positions in candidates.items()
+        if positions and selection.capacity.get(qtype, 0) > 0
+    ]
+    if not lists:
+        return None
+
+    offsets = []
+    total = 0
+    for _, positions in lists:
+        offsets.append(total)
+        total += len(positions)
+
+    fallback = None
+    seen = 0
+    for flat in _iter_random(range(total), rng):
+        slot = bisect.bisect_right(offsets, flat) - 1
+        qtype, positions = lists[slot]
+        pos = positions[flat - offsets[slot]]
+        if not selection.usable(qtype, pos):
+            continue
+        if prefer is None or prefer(qtype, pos):
+            return qtype, pos
+        if fallback is None:
+            fallback = (qtype, pos)
+        seen += 1
+        if seen >= lookahead:
+            break
+    return fallback
+
+
+def _repair_marks(selection: _Selection, rng: random.Random, max_steps: int) -> None:
+    """
+    Swap chosen questions for others of the same type and difficulty with
+    different marks until the total matches, without breaking topic
+    minimums.
+    """
+    index = selection.index
+    target = selection.blueprint.total_marks
+    topics = selection.blueprint.topics
+    slots = [(qtype, slot) for qtype in QUESTION_TYPES for slot in range(len(selection.chosen[qtype]))]
+    if not slots:
+        return
+
+    for _ in range(max_steps):
+        delta = target - selection.marks
+        if delta == 0:
+            return
+        qtype, slot = rng.choice(slots)
+        old = selection.chosen[qtype][slot]
+        old_marks = index.marks[qtype][old]
+        by_marks = index.by_marks[(qtype, index.difficulty[qtype][old])]
+
+        # Prefer an exact fix, otherwise any step towards the target.
+        wanted = [old_marks + delta] + [
+            mark for mark in by_marks
+            if mark != old_marks and 0 < (mark - old_marks) * delta and abs(mark - old_marks) < abs(delta)
+        ]
+        for mark in wanted:
+            positions = by_marks.get(mark)
+            if not positions:
+                continue
+            lost = [
+                tag for tag in index.tags[qtype][old]
+                if tag in topics and selection.tags[tag] - 1 < topics[tag]
+            ]
+            for _, pos in zip(range(8), _iter_random(positions, rng)):
+                if not selection.usable(qtype, pos):
+                    continue
+                if any(tag not in index.tags[qtype][pos] for tag in lost):
+                    continue
+                selection.swap(qtype, slot, pos)
+                break
+            else:
+                continue
+            break
+
+
+def select_by_blueprint(
+    grade: str,
+    subject: str,
+    blueprint: Blueprint,
+    rng: Optional[random.Random] = None,
+    max_attempts: int = 50,
+) -> Tuple[List[Question], List[Question], List[Question]]:
+    """
+    Select (mcqs, shorts, longs) satisfying `blueprint`.
+
+    Runs a randomized greedy search over the precomputed pool index:
+    topic minimums first, then difficulty minimums, then the remaining
+    counts, and finally mark-changing swaps. Failed attempts are retried
+    from scratch; raises BlueprintInfeasible if the blueprint is
+    impossible or no attempt succeeds.
+    """
+    index = _pool_index(grade, subject, get_partition_version(grade, subject))
+    return _solve_blueprint(index, blueprint, rng or random.Random(), max_attempts)
+
+
+def _solve_blueprint(
+    index: _PoolIndex,
+    blueprint: Blueprint,
+    rng: random.Random,
+    max_attempts: int,
+) -> Tuple[List[Question], List[Question], List[Question]]:
+    _check_blueprint(index, blueprint)
+
+    problems: List[str] = []
+    for _ in range(max_attempts):
+        selection = _Selection(index, blueprint)
+        failed = False
+
+        def _needs_level(qtype: str, pos: int) -> bool:
+            level = index.difficulty[qtype][pos]
+            return selection.levels[level] < blueprint.difficulty.get(level, 0)
+
+        for tag in rng.sample(list(blueprint.topics), len(blueprint.topics)):
+            while selection.tags[tag] < blueprint.topics[tag] and not failed:
+                picked = _draw_one(selection, index.by_tag.get(tag, {}), rng, _needs_level)
+                if picked is None:
+                    failed = True
+                else:
+                    selection.take(*picked)
+
+        for level in rng.sample(list(blueprint.difficulty), len(blueprint.difficulty)):
+            candidates = {qtype: by_level.get(level, []) for qtype, by_level in index.by_difficulty.items()}
+            while selection.levels[level] < blueprint.difficulty[level] and not failed:
+                picked = _draw_one(selection, candidates, rng)
+                if picked is None:
+                    failed = True
+                else:
+                    selection.take(*picked)
+
+        for qtype, pool in index.pools.items():
+            candidates = {qtype: range(len(pool))}
+            while selection.capacity.get(qtype, 0) > 0 and not failed:
+                picked = _draw_one(selection, candidates, rng)
+                if picked is None:
+                    failed = True
+                else:
+                    selection.take(*picked)
+
+        if failed:
+            problems = ["ran out of usable questions"]
+            continue
+
+        if blueprint.total_marks is not None:
+            _repair_marks(selection, rng, max_steps=20 * sum(blueprint.counts.values()))
+
+        problems = selection.unmet()
+        if not problems:
+            return tuple(
+                [index.pools[qtype][pos] for pos in selection.chosen[qtype]]
+                for qtype in QUESTION_TYPES
+            )
+
+    raise BlueprintInfeasible(
+        [f"no selection found after {max_attempts} attempts"] + [f"unmet {p}" for p in problems]
+    )
+
+
+def generate_blueprint_paper(
+    grade: str,
+    subject: str,
+    blueprint: Blueprint,
+    seed: Optional[int] = None,
+) -> QuestionPaper:
+    """
+    Generate a paper for a blueprint.
+    """
+    mcqs, shorts, longs = select_by_blueprint(grade, subject, blueprint, random.Random(seed))
+    return QuestionPaper(grade, subject, mcqs, shorts, longs)
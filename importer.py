@@ -0,0 +1,90 @@
+"""
+Bulk-import questions from CSV/JSONL files into a bank file.
+
+    python importer.py questions.jsonl more.csv -o question_bank.qpb
+
+Serve the result with QP_BANK_PATH=question_bank.qpb (see bank_store.py).
+"""
+import argparse
+import sys
+from typing import Dict, List, Optional
+
+from question_bank import ImportErrorRow, import_questions
+
+
+def _format_bytes(num: Optional[int]) -> str:
+    if num is None:
+        return "n/a"
+    return f"{num / (1024 * 1024):.1f} MiB"
+
+
+def _print_progress(stats: Dict) -> None:
+    rate = stats["rows"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+    print(
+        f"  {stats['rows']:,} rows read, {stats['imported']:,} imported ({rate:,.0f} rows/sec)",
+        file=sys.stderr,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import questions into a bank file.")
+    parser.add_argument("sources", nargs="+", help="CSV or JSONL files to import")
+    parser.add_argument("-o", "--output", required=True, help="Bank file to write")
+    parser.add_argument(
+        "--include-existing",
+        action="store_true",
+        help="Also copy the currently configured question bank into the output",
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per batch")
+    parser.add_argument("--strict", action="store_true", help="Stop at the first invalid row")
+    parser.add_argument("--quiet", action="store_true", help="Do not print per-batch progress")
+    parser.add_argument(
+        "--no-near-duplicates",
+        action="store_true",
+        help="Do not build the near-duplicate index next to the bank file",
+    )
+    parser.add_argument(
+        "--no-search-index",
+        action="store_true",
+        help="Do not build the search index next to the bank file",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        stats = import_questions(
+            args.sources,
+            args.output,
+            include_existing=args.include_existing,
+            batch_size=args.batch_size,
+            strict=args.strict,
+            progress=None if args.quiet else _print_progress,
+            near_duplicates=not args.no_near_duplicates,
+            search=not args.no_search_index,
+        )
+    except (ImportErrorRow, OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    for error in stats["errors"]:
+        print(f"skipped {error}", file=sys.stderr)
+
+    print(
+        f"Imported {stats['imported']:,} of {stats['rows']:,} rows into {args.output}"
+    )
+    if args.include_existing:
+        print(f"  existing:   {stats['existing']:,} questions from the current bank")
+    print(
+        f"  duplicates: {stats['duplicates']:,}\n"
+        f"  invalid:    {stats['invalid']:,}\n"
+        f"  elapsed:    {stats['elapsed']:.2f}s ({stats['rows_per_sec']:,.0f} rows/sec)\n"
+        f"  peak memory: {_format_bytes(stats['peak_memory_bytes'])}"
+    )
+    if "near_duplicate_groups" in stats:
+        print(f"  near-duplicate groups: {stats['near_duplicate_groups']:,}")
+    if "search_terms" in stats:
+        print(f"  search index terms: {stats['search_terms']:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from records import question_key
+
+
+# Near-duplicate detection with MinHash + LSH.
+#
+# Each question text is reduced to its set of content words: case-folded,
+# punctuation, function words and question boilerplate ("explain",
+# "with an example") dropped, plural "s" stripped, so
+# rewordings like "What is the primary key in a DBMS?" / "Define primary
+# key in DBMS." share most of their words regardless of order. One 64-byte
+# blake2b digest per word gives 32 independent 16-bit hash values; the
+# minimum of each over all words is the question's MinHash signature,
+# whose per-position agreement estimates the Jaccard similarity of two
+# word sets.
+#
+# The signature is cut into 8 bands of 4 values. Questions sharing a band
+# within the same grade/subject/type become candidates, and candidates whose
+# estimated similarity reaches the threshold are merged into a group. Both
+# steps are linear in the number of questions. Numbers are compared
+# exactly: "What is 2 + 3?" and "What is 4 + 5?" are different questions.
+#
+# Only questions that have a near-duplicate are stored, as question key ->
+# group id, in a sidecar file next to the bank file ("<bank>.dups"). The
+# file is memory-mapped on load, so processes serving the same bank share
+# one copy of the index.
+
+MAGIC = b"QPDUPS"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<6sHI")
+
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+DEFAULT_THRESHOLD = 0.6
+# Members remembered per LSH bucket for verification; larger buckets are
+# almost always one big group already.
+_BUCKET_MEMBERS = 16
+
+_SIGNATURE = struct.Struct(f"<{NUM_HASHES}H")
+_WORD = re.compile(r"[^\W_]+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in into is it its of on or "
+    "the their this that these those to was what when where which who why with "
+    "you your give write explain describe define discuss mention state briefly "
+    "detail concept example suitable meaning term".split()
+)
+
+Signature = Tuple[int, ...]
+
+
+def sidecar_path(bank_path: str) -> str:
+    return bank_path + ".dups"
+
+
+def _content_words(text: str) -> set:
+    words = _WORD.findall(text.casefold())
+    content = {
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in words
+        if word not in _STOPWORDS
+    }
+    return content or set(words)
+
+
+def minhash_signature(text: str) -> Optional[Signature]:
+    """
+    MinHash signature of a question text, or None for empty text.
+    """
+    words = _content_words(text)
+    if not words:
+        return None
+    rows = [
+        _SIGNATURE.unpack(hashlib.blake2b(word.encode("utf-8"), digest_size=64).digest())
+        for word in words
+    ]
+    return tuple(map(min, zip(*rows)))
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """
+    Estimated Jaccard similarity of two signatures.
+    """
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+class NearDuplicateIndex:
+    """
+    Question key -> near-duplicate group id, for questions that have at
+    least one near-duplicate in the same grade/subject/type. Built for one bank
+    version; stored as two sorted arrays (memoryviews of the sidecar file
+    once loaded) and searched with bisect.
+    """
+
+    def __init__(
+        self,
+        bank_version: str,
+        keys: Sequence[int],
+        groups: Sequence[int],
+        threshold: float = DEFAULT_THRESHOLD,
+    ):
+        self.bank_version = bank_version
+        self.threshold = threshold
+        self._keys = keys
+        self._groups = groups
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def group_of(self, question) -> Optional[int]:
+        """
+        Group id of `question`, or None if it has no near-duplicates.
+        """
+        if not self._keys:
+            return None
+        return self.group_of_key(question_key(question))
+
+    def group_of_key(self, key: int) -> Optional[int]:
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._groups[i]
+        return None
+
+    def groups(self) -> Dict[int, List[int]]:
+        """
+        Group id -> question keys in that group.
+        """
+        members: Dict[int, List[int]] = {}
+        for key, group in zip(self._keys, self._groups):
+            members.setdefault(group, []).append(key)
+        return members
+
+    def save(self, path: str) -> None:
+        header = json.dumps({
+            "bank_version": self.bank_version,
+            "threshold": self.threshold,
+            "count": len(self._keys),
+            "byteorder": sys.byteorder,
+        }).encode("utf-8")
+        # Written under a temporary name and renamed over `path`, since a
+        # loaded index maps the old file.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+                f.write(header)
+                f.write(b"\0" * (-f.tell() % 8))
+                f.write(self._keys)
+                f.write(self._groups)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "NearDuplicateIndex":
+        with open(path, "rb") as f:
+            magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a near-duplicate index (format {FORMAT_VERSION})")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+            start = f.tell() + (-f.tell() % 8)
+            count = header["count"]
+            if not count:
+                return cls(header["bank_version"], array("Q"), array("I"), header["threshold"])
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(data)
+        keys = buffer[start:start + 8 * count].cast("Q")
+        groups = buffer[start + 8 * count:start + 12 * count].cast("I")
+        index = cls(header["bank_version"], keys, groups, header["threshold"])
+        index._mmap = data
+        return index
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            parent[item], item = root, parent.get(item, item)
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def _iter_partitions(bank: Mapping) -> Iterable[Tuple[str, str, str, List]]:
+    for grade, subjects in bank.items():
+        for subject, types in subjects.items():
+            for qtype, questions in types.items():
+                yield grade, subject, qtype, questions
+
+
+def build_index(
+    bank: Mapping,
+    bank_version: str,
+    threshold: float = DEFAULT_THRESHOLD,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> NearDuplicateIndex:
+    """
+    Find near-duplicate questions within each grade/subject/type of `bank`.
+    A short and a long question on the same topic are usually meant to be
+    asked together, so questions of different types are never compared.
+    """
+    started = time.perf_counter()
+    union = _UnionFind()
+    scanned = 0
+
+    for grade, subject, qtype, questions in _iter_partitions(bank):
+        signatures: Dict[int, Signature] = {}
+        buckets: Dict[tuple, List[int]] = {}
+        for question in questions:
+            key = question_key(question)
+            if key in signatures:
+                continue  # exact duplicate; grouped by its identical key already
+            signature = minhash_signature(question["question"])
+            if signature is None:
+                continue
+            signatures[key] = signature
+            numbers = tuple(sorted(_NUMBER.findall(question["question"])))
+            for band in range(BANDS):
+                bucket = buckets.setdefault(
+                    (band, numbers, signature[band * ROWS:(band + 1) * ROWS]), []
+                )
+                for other in bucket:
+                    if similarity(signature, signatures[other]) >= threshold:
+                        union.union(key, other)
+                        break
+                if len(bucket) < _BUCKET_MEMBERS:
+                    bucket.append(key)
+        scanned += len(questions)
+        if progress is not None:
+            progress({"grade": grade, "subject": subject, "type": qtype, "questions": scanned,
+                      "elapsed": time.perf_counter() - started})
+
+    roots = {key: union.find(key) for key in list(union.parent)}
+    roots.update((root, root) for root in set(roots.values()))
+    group_ids = {root: group_id for group_id, root in enumerate(sorted(set(roots.values())))}
+    keys = array("Q", sorted(roots))
+    groups = array("I", (group_ids[roots[key]] for key in keys))
+    return NearDuplicateIndex(bank_version, keys, groups, threshold)
+
+
+def update_index(
+    index: NearDuplicateIndex,
+    changes: Iterable[Tuple[str, str, str, Sequence, Sequence]],
+    bank_version: str,
+) -> NearDuplicateIndex:
+    """
+    `index` for a bank where only some grade/subject/type partitions
+    changed, given as (grade, subject, type, old questions, new questions).
+    Only the changed partitions are re-grouped; groups elsewhere keep their
+    ids, and new groups are numbered after them.
+    """
+    removed = set()
+    changed: Dict[str, Dict[str, Dict[str, Sequence]]] = {}
+    for grade, subject, qtype, old, new in changes:
+        removed.update(question_key(question) for question in old)
+        changed.setdefault(grade, {}).setdefault(subject, {})[qtype] = new
+    fresh = build_index(changed, bank_version, index.threshold)
+
+    offset = max(index._groups) + 1 if index._groups else 0
+    entries = {key: group for key, group in zip(index._keys, index._groups) if key not in removed}
+    entries.update((key, group + offset) for key, group in zip(fresh._keys, fresh._groups))
+    keys = array("Q", sorted(entries))
+    groups = array("I", (entries[key] for key in keys))
+    return NearDuplicateIndex(bank_version, keys, groups, index.threshold)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Build the near-duplicate index for a bank file and write it next to it:
+
+        python near_duplicates.py question_bank.qpb
+    """
+    import argparse
+
+    from bank_store import BankStore
+
+    parser = argparse.ArgumentParser(description="Build the near-duplicate index for a bank file.")
+    parser.add_argument("bank", help="Path of the bank file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity at which questions count as duplicates")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    store = BankStore.open(args.bank)
+    try:
+        index = build_index(store.mapping(), store.version, args.threshold)
+    finally:
+        store.close()
+    index.save(sidecar_path(args.bank))
+    print(
+        f"{len(index.groups())} near-duplicate groups ({len(index)} questions) "
+        f"in {time.perf_counter() - started:.1f}s -> {sidecar_path(args.bank)}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
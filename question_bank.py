@@ -1,14 +1,103 @@
-from typing import Dict, List
+import collections.abc
+import contextlib
+import hashlib
+import itertools
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from records import Question, question_key
+
+# The bank file, near-duplicate and search modules (and the csv/json
+# machinery of the importer) are imported where they are first needed, so
+# importing this module stays cheap; see benchmarks/bench_startup.py.
+if TYPE_CHECKING:
+    from bank_delta import DeltaBank
+    from bank_store import BankStore
+    from near_duplicates import NearDuplicateIndex
+    from search_index import SearchHit, SearchIndex
 
 
 # Structure:
 # QUESTION_BANK["Grade X"]["Subject"]["mcq" | "short" | "long"]
-QUESTION_BANK: Dict[str, Dict[str, Dict[str, List[dict]]]] = {}
+#
+# By default the bank is built from the sample questions below. Set
+# QP_BANK_PATH to a bank file (see bank_store.py) to serve a memory-mapped
+# bank instead; its partitions are decoded only when first requested.
+#
+# Nothing is loaded at import: QUESTION_BANK loads the bank on first
+# access. The sample bank is written once to a bank file snapshot under
+# __pycache__ (refreshed when this file changes, like a .pyc), so later
+# starts map it and its indexes instead of rebuilding them. Set
+# QP_BANK_SNAPSHOT=0 to always build it in memory.
+#
+# A bank file can be edited through its delta log (see bank_delta.py);
+# reload_bank() applies new edits in a running process. Processes serving
+# the same bank file share it through the page cache; share_bank() gives
+# worker processes a bank built in memory the same way.
+BANK_PATH_ENV = "QP_BANK_PATH"
+SNAPSHOT_ENV = "QP_BANK_SNAPSHOT"
+
+QUESTION_TYPES = ("mcq", "short", "long")
+
+
+class _LazyBank(collections.abc.Mapping):
+    """
+    QUESTION_BANK: the nested bank mapping, loaded on first access.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, grade: str) -> Mapping[str, Mapping[str, List[Question]]]:
+        return _loaded_bank()[grade]
+
+    def get(self, grade: str, default=None):
+        return _loaded_bank().get(grade, default)
+
+    def __contains__(self, grade: object) -> bool:
+        return grade in _loaded_bank()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_loaded_bank())
 
+    def __len__(self) -> int:
+        return len(_loaded_bank())
 
-def _create_sample_grade_questions():
+    def __repr__(self) -> str:
+        return "<QUESTION_BANK (loaded)>" if _BANK is not None else "<QUESTION_BANK (not loaded)>"
+
+
+QUESTION_BANK: Mapping[str, Mapping[str, Mapping[str, List[Question]]]] = _LazyBank()
+_BANK: Optional[Mapping[str, Mapping[str, Mapping[str, List[Question]]]]] = None
+_LOAD_LOCK = threading.Lock()
+_STORE: Optional["BankStore"] = None
+# The QP_BANK_PATH bank with its logged edits, and the file's identity
+_DELTA: Optional["DeltaBank"] = None
+_BANK_FILE_ID: Optional[Tuple[int, int, int]] = None
+_BANK_VERSION: Optional[str] = None
+_NEAR_DUPLICATES: Optional["NearDuplicateIndex"] = None
+_SEARCH_INDEX: Optional["SearchIndex"] = None
+
+
+# Every sample MCQ shares this one options tuple.
+_SAMPLE_MCQ_OPTIONS = (
+    "A) Option A",
+    "B) Option B",
+    "C) Option C",
+    "D) Option D",
+)
+
+
+def _to_records(questions: List[Dict]) -> List[Question]:
+    return [Question.from_dict(q) for q in questions]
+
+
+def _create_sample_grade_questions(bank: Dict):
     """
-    Create sample questions for Grades 1–12.
+    Add sample questions for Grades 1–12 to `bank`.
 
     Grades 1–3: 4 subjects (English, Mathematics, EVS, GK)
     Grades 4–12: 5 subjects (English, Mathematics, Science,
@@ -25,7 +114,7 @@ def _create_sample_grade_questions():
 
     for grade_num in range(1, 13):
         grade_key = f"Grade {grade_num}"
-        QUESTION_BANK[grade_key] = {}
+        bank[grade_key] = {}
 
         if grade_num <= 3:
             subjects = lower_subjects
@@ -41,48 +130,43 @@ def _create_sample_grade_questions():
             for i in range(1, 7):
                 question_text = f"Sample Grade {grade_num} {subject} MCQ question {i}?"
                 mcq_list.append(
-                    {
-                        "question": question_text,
-                        "options": [
-                            "A) Option A",
-                            "B) Option B",
-                            "C) Option C",
-                            "D) Option D",
-                        ],
-                        "answer": "A",  # placeholder
-                    }
+                    Question(
+                        question=question_text,
+                        options=_SAMPLE_MCQ_OPTIONS,
+                        answer="A",  # placeholder
+                    )
                 )
 
             # Short answers (sample / generic)
             for i in range(1, 5):
                 question_text = f"Sample Grade {grade_num} {subject} short answer question {i}."
                 short_list.append(
-                    {
-                        "question": question_text,
-                        "answer": f"Sample short answer {i} for Grade {grade_num} {subject}.",
-                    }
+                    Question(
+                        question=question_text,
+                        answer=f"Sample short answer {i} for Grade {grade_num} {subject}.",
+                    )
                 )
 
             # Long answers (sample / generic)
             for i in range(1, 4):
                 question_text = f"Sample Grade {grade_num} {subject} long answer question {i}."
                 long_list.append(
-                    {
-                        "question": question_text,
-                        "answer": f"Sample long answer {i} for Grade {grade_num} {subject}.",
-                    }
+                    Question(
+                        question=question_text,
+                        answer=f"Sample long answer {i} for Grade {grade_num} {subject}.",
+                    )
                 )
 
-            QUESTION_BANK[grade_key][subject] = {
+            bank[grade_key][subject] = {
                 "mcq": mcq_list,
                 "short": short_list,
                 "long": long_list,
             }
 
 
-def _create_btech_questions():
+def _create_btech_questions(bank: Dict):
     """
-    Create REAL-LIKE questions for B.Tech subjects:
+    Add REAL-LIKE questions for B.Tech subjects to `bank`:
 
     - Python Programming
     - Data Structures
@@ -93,7 +177,7 @@ def _create_btech_questions():
         Shorts: min 6
         Longs:  min 4
     """
-    QUESTION_BANK["B.Tech"] = {}
+    bank["B.Tech"] = {}
 
     # ---------- Python Programming ----------
     python_mcq = [
@@ -258,10 +342,10 @@ def _create_btech_questions():
         },
     ]
 
-    QUESTION_BANK["B.Tech"]["Python Programming"] = {
-        "mcq": python_mcq,
-        "short": python_short,
-        "long": python_long,
+    bank["B.Tech"]["Python Programming"] = {
+        "mcq": _to_records(python_mcq),
+        "short": _to_records(python_short),
+        "long": _to_records(python_long),
     }
 
     # ---------- Data Structures ----------
@@ -414,10 +498,10 @@ def _create_btech_questions():
         },
     ]
 
-    QUESTION_BANK["B.Tech"]["Data Structures"] = {
-        "mcq": ds_mcq,
-        "short": ds_short,
-        "long": ds_long,
+    bank["B.Tech"]["Data Structures"] = {
+        "mcq": _to_records(ds_mcq),
+        "short": _to_records(ds_short),
+        "long": _to_records(ds_long),
     }
 
     # ---------- DBMS ----------
@@ -570,26 +654,796 @@ def _create_btech_questions():
         },
     ]
 
-    QUESTION_BANK["B.Tech"]["DBMS"] = {
-        "mcq": dbms_mcq,
-        "short": dbms_short,
-        "long": dbms_long,
+    bank["B.Tech"]["DBMS"] = {
+        "mcq": _to_records(dbms_mcq),
+        "short": _to_records(dbms_short),
+        "long": _to_records(dbms_long),
     }
 
 
+# ---------- CATALOG INDEX ----------
+
+class BankCatalog:
+    """
+    Immutable metadata index over the bank: grades in display order,
+    subjects per grade, per-type question counts and tag facets per
+    grade/subject. Built once per bank load so metadata queries are
+    dictionary lookups instead of walks over the nested bank.
+    """
+
+    __slots__ = ("grades", "_subjects", "_counts", "_tags", "_facets")
+
+    def __init__(
+        self,
+        grades: Tuple[str, ...],
+        subjects: Dict[str, Tuple[str, ...]],
+        counts: Dict[Tuple[str, str], Dict[str, int]],
+        tags: Dict[Tuple[str, str], Dict[str, int]],
+    ):
+        self.grades = grades
+        self._subjects = MappingProxyType(subjects)
+        self._counts = MappingProxyType(
+            {key: MappingProxyType(value) for key, value in counts.items()}
+        )
+        self._tags = MappingProxyType(
+            {key: MappingProxyType(value) for key, value in tags.items()}
+        )
+        self._facets = MappingProxyType(
+            {key: _tag_facets(value) for key, value in tags.items()}
+        )
+
+    def subjects(self, grade: str) -> Tuple[str, ...]:
+        return self._subjects.get(grade, ())
+
+    def type_counts(self, grade: str, subject: str) -> Mapping[str, int]:
+        return self._counts.get((grade, subject), _EMPTY_COUNTS)
+
+    def tag_counts(self, grade: str, subject: str) -> Mapping[str, int]:
+        return self._tags.get((grade, subject), _EMPTY_MAPPING)
+
+    def facets(self, grade: str, subject: str) -> Mapping[str, Mapping[str, int]]:
+        """
+        Tag counts grouped by facet: "topic:loops" counts under
+        facets["topic"]["loops"]; tags without a colon go under "tag".
+        """
+        return self._facets.get((grade, subject), _EMPTY_MAPPING)
+
+
+_EMPTY_MAPPING: Mapping = MappingProxyType({})
+_EMPTY_COUNTS: Mapping[str, int] = MappingProxyType({qtype: 0 for qtype in QUESTION_TYPES})
+_CATALOG: Optional[BankCatalog] = None
+
+
+def _tag_facets(tag_counts: Mapping[str, int]) -> Mapping[str, Mapping[str, int]]:
+    facets: Dict[str, Dict[str, int]] = {}
+    for tag, count in tag_counts.items():
+        key, sep, value = tag.partition(":")
+        if not sep:
+            key, value = "tag", tag
+        values = facets.setdefault(key, {})
+        values[value] = values.get(value, 0) + count
+    return MappingProxyType({key: MappingProxyType(values) for key, values in facets.items()})
+
+
+def _grade_sort_key(grade: str, position: int) -> Tuple[int, int]:
+    # "Grade 1".."Grade 12" in numeric order, then other levels in bank order.
+    parts = grade.split()
+    if len(parts) == 2 and parts[0] == "Grade" and parts[1].isdigit():
+        return 0, int(parts[1])
+    return 1, position
+
+
+def _build_catalog() -> BankCatalog:
+    bank = _loaded_bank()
+    # Counts of edited subjects come from the bank, not the file's header.
+    edited = {(grade, subject) for grade, subject, _ in _DELTA.edited} if _DELTA is not None else set()
+    if _STORE is not None and not edited:
+        grade_names = _STORE.grades()
+    else:
+        grade_names = list(bank.keys())
+
+    grades = tuple(
+        grade for _, grade in sorted(
+            ((_grade_sort_key(grade, pos), grade) for pos, grade in enumerate(grade_names))
+        )
+    )
+    subjects: Dict[str, Tuple[str, ...]] = {}
+    counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+    tags: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    for grade in grades:
+        if _STORE is not None and not edited:
+            subjects[grade] = tuple(_STORE.subjects(grade))
+        else:
+            subjects[grade] = tuple(bank[grade].keys())
+
+        for subject in subjects[grade]:
+            subject_counts = {qtype: 0 for qtype in QUESTION_TYPES}
+            subject_tags: Dict[str, int] = {}
+            if _STORE is not None and (grade, subject) not in edited:
+                subject_counts.update(_STORE.type_counts(grade, subject))
+                for qtype in subject_counts:
+                    for tag, count in _STORE.tag_counts(grade, subject, qtype).items():
+                        subject_tags[tag] = subject_tags.get(tag, 0) + count
+            else:
+                for qtype, questions in bank[grade][subject].items():
+                    subject_counts[qtype] = len(questions)
+                    for question in questions:
+                        for tag in question.get("tags", ()):
+                            subject_tags[tag] = subject_tags.get(tag, 0) + 1
+            counts[(grade, subject)] = subject_counts
+            tags[(grade, subject)] = subject_tags
+
+    return BankCatalog(grades, subjects, counts, tags)
+
+
+def get_catalog() -> BankCatalog:
+    """
+    The catalog index for the current bank, built on first use.
+    """
+    global _CATALOG
+    if _CATALOG is None:
+        _CATALOG = _build_catalog()
+    return _CATALOG
+
+
 def get_subjects_for_grade(grade: str):
-    return list(QUESTION_BANK.get(grade, {}).keys())
+    return list(get_catalog().subjects(grade))
 
 
 def get_question_type_counts(grade: str, subject: str):
-    data = QUESTION_BANK.get(grade, {}).get(subject, {})
-    return {
-        "mcq": len(data.get("mcq", [])),
-        "short": len(data.get("short", [])),
-        "long": len(data.get("long", [])),
+    return get_catalog().type_counts(grade, subject)
+
+
+def get_bank_version() -> str:
+    """
+    Short content hash identifying the questions currently in the bank.
+    Paper IDs embed it so a paper is only re-derived from the same bank.
+    """
+    global _BANK_VERSION
+    bank = _loaded_bank()
+    delta = _DELTA
+    if delta is not None:
+        return delta.version
+    if _STORE is not None:
+        return _STORE.version
+    if _BANK_VERSION is None:
+        from bank_store import bank_version
+
+        _BANK_VERSION = bank_version(bank)
+    return _BANK_VERSION
+
+
+def get_partition_version(grade: str, subject: str) -> str:
+    """
+    Version of one grade/subject: the version of the delta edit that last
+    touched it, else the bank version. Paper IDs and per-subject caches use
+    it, so editing one subject leaves papers of the others reproducible.
+    """
+    _loaded_bank()
+    delta = _DELTA
+    if delta is not None:
+        return delta.partition_version(grade, subject)
+    return get_bank_version()
+
+
+def get_near_duplicate_index() -> "NearDuplicateIndex":
+    """
+    Near-duplicate groups of the current bank: read from the bank file's
+    sidecar when it matches the bank version (updated for any delta edits),
+    otherwise built on first use.
+    """
+    from near_duplicates import NearDuplicateIndex, build_index, sidecar_path, update_index
+
+    global _NEAR_DUPLICATES
+    version = get_bank_version()
+    if _NEAR_DUPLICATES is None or _NEAR_DUPLICATES.bank_version != version:
+        index = None
+        if _STORE is not None and os.path.exists(sidecar_path(_STORE.path)):
+            index = NearDuplicateIndex.load(sidecar_path(_STORE.path))
+            if index.bank_version == _STORE.version and _DELTA is not None and _DELTA.edited:
+                index = update_index(index, _DELTA.base_changes(), version)
+            elif index.bank_version != version:
+                index = None
+        # An index with no groups is falsy, so test for None explicitly.
+        _NEAR_DUPLICATES = index if index is not None else build_index(QUESTION_BANK, version)
+    return _NEAR_DUPLICATES
+
+
+def get_search_index() -> "SearchIndex":
+    """
+    Full-text search index of the current bank: memory-mapped from the bank
+    file's sidecar when it matches the bank version (updated for any delta
+    edits), otherwise built on first use.
+    """
+    import search_index
+
+    global _SEARCH_INDEX
+    version = get_bank_version()
+    if _SEARCH_INDEX is None or _SEARCH_INDEX.bank_version != version:
+        index = None
+        path = search_index.sidecar_path(_STORE.path) if _STORE is not None else None
+        if path is not None and os.path.exists(path):
+            index = search_index.SearchIndex.load(path)
+            if index.bank_version == _STORE.version and _DELTA is not None and _DELTA.edited:
+                from bank_delta import update_search_index
+
+                index = update_search_index(index, _DELTA.base_changes(), version)
+            elif index.bank_version != version:
+                index = None
+        _SEARCH_INDEX = index if index is not None else search_index.build_index(QUESTION_BANK, version)
+    return _SEARCH_INDEX
+
+
+def _questions_by_key(grade: str, subject: str, qtype: str) -> Dict[int, Question]:
+    key = (get_partition_version(grade, subject), grade, subject, qtype)
+    questions = _QUESTIONS_BY_KEY.get(key)
+    if questions is None:
+        if len(_QUESTIONS_BY_KEY) >= _MAX_KEYED_PARTITIONS:
+            _QUESTIONS_BY_KEY.clear()
+        questions = _QUESTIONS_BY_KEY[key] = {}
+        for question in QUESTION_BANK.get(grade, {}).get(subject, {}).get(qtype, []):
+            questions.setdefault(question_key(question), question)
+    return questions
+
+
+_QUESTIONS_BY_KEY: Dict[Tuple[str, str, str, str], Dict[int, Question]] = {}
+_MAX_KEYED_PARTITIONS = 64
+
+
+def search_questions(
+    query: str,
+    limit: Optional[int] = None,
+    grade: Optional[str] = None,
+    subject: Optional[str] = None,
+    qtype: Optional[str] = None,
+) -> List[Tuple["SearchHit", Question]]:
+    """
+    Questions matching `query` (words, and tags like "topic:joins"), best
+    first, as (hit, question) pairs. `limit` defaults to
+    search_index.DEFAULT_LIMIT.
+    """
+    import search_index
+
+    if limit is None:
+        limit = search_index.DEFAULT_LIMIT
+    hits = get_search_index().search(query, limit, grade, subject, qtype)
+    return [
+        (hit, _questions_by_key(hit.grade, hit.subject, hit.qtype)[hit.key])
+        for hit in hits
+    ]
+
+
+def _write_near_duplicate_index(bank_path: str) -> "NearDuplicateIndex":
+    from bank_store import BankStore
+    from near_duplicates import build_index, sidecar_path
+
+    store = BankStore.open(bank_path)
+    try:
+        index = build_index(store.mapping(), store.version)
+    finally:
+        store.close()
+    index.save(sidecar_path(bank_path))
+    return index
+
+
+def export_question_bank(path: str) -> Dict:
+    """
+    Write the current question bank to a memory-mappable bank file, with
+    its near-duplicate and search indexes next to it.
+    """
+    from bank_store import write_bank
+    import near_duplicates
+    import search_index
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        header = write_bank(QUESTION_BANK, tmp_path)
+        get_near_duplicate_index().save(near_duplicates.sidecar_path(tmp_path))
+        get_search_index().save(search_index.sidecar_path(tmp_path))
+        _replace_bank_files(tmp_path, path)
+    except BaseException:
+        _remove_bank_files(tmp_path)
+        raise
+    return header
+
+
+def _replace_bank_files(tmp_path: str, path: str) -> None:
+    """
+    Rename a bank file written under `tmp_path`, and whichever of its
+    indexes were written next to it, over `path`: the indexes first and the
+    bank file last, so a reader never sees a bank older than its indexes.
+    """
+    import near_duplicates
+    import search_index
+
+    for sidecar_path in (near_duplicates.sidecar_path, search_index.sidecar_path):
+        if os.path.exists(sidecar_path(tmp_path)):
+            os.replace(sidecar_path(tmp_path), sidecar_path(path))
+    os.replace(tmp_path, path)
+
+
+def _remove_bank_files(tmp_path: str) -> None:
+    import near_duplicates
+    import search_index
+
+    for leftover in (tmp_path, near_duplicates.sidecar_path(tmp_path), search_index.sidecar_path(tmp_path)):
+        with contextlib.suppress(OSError):
+            os.remove(leftover)
+
+
+# ---------- BULK IMPORT (CSV / JSONL) ----------
+
+_OPTION_LETTERS = "ABCDEFGH"
+
+
+class ImportErrorRow(ValueError):
+    """Raised for a row that does not match the mcq/short/long schema."""
+
+
+def _iter_jsonl_rows(path: str) -> Iterator[Tuple[int, Dict]]:
+    import json
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_no, {"__error__": f"invalid JSON: {exc.msg}"}
+                continue
+            if not isinstance(row, dict):
+                row = {"__error__": f"expected a JSON object, got {type(row).__name__}"}
+            yield line_no, row
+
+
+def _iter_csv_rows(path: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    CSV columns: grade, subject, type, question, answer and either an
+    "options" column separated by "|" or option_a, option_b, ... columns.
+    An optional "tags" column is also separated by "|".
+    """
+    import csv
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            options = row.pop("options", None)
+            if options:
+                row["options"] = [opt.strip() for opt in options.split("|")]
+            else:
+                letter_cols = [f"option_{letter.lower()}" for letter in _OPTION_LETTERS]
+                options = [(row.get(col) or "").strip() for col in letter_cols]
+                while options and not options[-1]:
+                    options.pop()
+                # A blank column before the last filled one stays in place
+                # (and fails validation) rather than shifting the letters.
+                row["options"] = options
+            tags = row.pop("tags", None)
+            row["tags"] = [tag.strip() for tag in tags.split("|") if tag.strip()] if tags else []
+            yield reader.line_num, row
+
+
+def _iter_rows(path: str) -> Iterator[Tuple[int, Dict]]:
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        return _iter_jsonl_rows(path)
+    if path.lower().endswith(".csv"):
+        return _iter_csv_rows(path)
+    raise ValueError(f"Unsupported import file type: {path}")
+
+
+_ATTRIBUTE_FIELDS = ("difficulty", "topic", "chapter", "marks")
+
+
+def _text_field(row: Dict, field: str) -> str:
+    value = row.get(field)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ImportErrorRow(f"{field} must be a string, got {type(value).__name__}")
+    return value.strip()
+
+
+def validate_question_row(row: Dict) -> Tuple[str, str, str, Question]:
+    """
+    Check one imported row against the bank schema and return
+    (grade, subject, type, question record) ready for the bank writer.
+
+    MCQ options are normalised to the "A) text" form used by the bank and
+    the answer must be the letter of one of them. Optional difficulty,
+    topic, chapter and marks fields become "key:value" tags, which the
+    blueprint selector reads.
+    """
+    if "__error__" in row:
+        raise ImportErrorRow(row["__error__"])
+
+    grade = _text_field(row, "grade")
+    subject = _text_field(row, "subject")
+    qtype = _text_field(row, "type").lower()
+    text = _text_field(row, "question")
+    answer = _text_field(row, "answer")
+    options = row.get("options") or []
+    tags = row.get("tags") or []
+
+    if not isinstance(tags, list) or not all(isinstance(tag, str) and tag.strip() for tag in tags):
+        raise ImportErrorRow("tags must be a list of non-empty strings")
+    tags = [tag.strip() for tag in tags]
+    for field in _ATTRIBUTE_FIELDS:
+        value = row.get(field)
+        value = "" if value is None else str(value).strip()
+        if not value:
+            continue
+        if field == "marks" and not (value.isdigit() and int(value) > 0):
+            raise ImportErrorRow(f"marks must be a positive integer, got {value!r}")
+        tags.append(f"{field}:{value}")
+
+    if not grade or not subject:
+        raise ImportErrorRow("grade and subject are required")
+    if qtype not in QUESTION_TYPES:
+        raise ImportErrorRow(f"type must be one of {', '.join(QUESTION_TYPES)}, got {qtype!r}")
+    if not text:
+        raise ImportErrorRow("question text is empty")
+    if not answer:
+        raise ImportErrorRow("answer is empty")
+
+    if qtype != "mcq":
+        if options:
+            raise ImportErrorRow(f"{qtype} questions must not have options")
+        return grade, subject, qtype, Question(text, answer=answer, tags=tags)
+
+    if not isinstance(options, list) or not 2 <= len(options) <= len(_OPTION_LETTERS):
+        raise ImportErrorRow(f"mcq needs 2 to {len(_OPTION_LETTERS)} options")
+
+    normalised = []
+    for letter, opt in zip(_OPTION_LETTERS, options):
+        opt = str(opt).strip()
+        if not opt:
+            raise ImportErrorRow(f"option {letter} is empty")
+        if not opt.startswith(f"{letter})"):
+            opt = f"{letter}) {opt}"
+        normalised.append(opt)
+
+    answer = answer.upper().rstrip(")")
+    if len(answer) != 1 or answer not in _OPTION_LETTERS[:len(normalised)]:
+        raise ImportErrorRow(f"answer must be one of the option letters, got {answer!r}")
+
+    return grade, subject, qtype, Question(text, normalised, answer, tags)
+
+
+def _dedup_key(grade: str, subject: str, qtype: str, text: str) -> bytes:
+    normalised = " ".join(text.casefold().split())
+    return hashlib.blake2b(
+        "\x1f".join((grade, subject, qtype, normalised)).encode("utf-8"),
+        digest_size=16,
+    ).digest()
+
+
+def _peak_memory_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def import_questions(
+    sources: Iterable[str],
+    output_path: str,
+    include_existing: bool = False,
+    batch_size: int = 10_000,
+    strict: bool = False,
+    max_errors_reported: int = 20,
+    progress: Optional[Callable[[Dict], None]] = None,
+    near_duplicates: bool = True,
+    search: bool = True,
+) -> Dict:
+    """
+    Stream questions from CSV/JSONL files into a new bank file.
+
+    Rows are read and written in batches of `batch_size`, so memory stays
+    bounded by the batch plus a 16-byte fingerprint per question (used to
+    drop duplicates of the same grade/subject/type/question text). Invalid
+    rows are skipped and reported, or raise ImportErrorRow if `strict`.
+    Unless `near_duplicates` is False, the near-duplicate index of the new
+    bank is written next to it, and unless `search` is False its search
+    index. With `include_existing`, the search index extends the current
+    bank's index, so only the imported questions are tokenized.
+
+    Returns import statistics including rows/sec and peak memory;
+    "imported" counts source rows written, "existing" the current bank's
+    questions copied with `include_existing`.
+    """
+    stats = {
+        "rows": 0,
+        "imported": 0,
+        "existing": 0,
+        "duplicates": 0,
+        "invalid": 0,
+        "errors": [],
     }
+    from bank_store import BankWriter
+    import search_index
+
+    seen = set()
+    started = time.perf_counter()
+    search_builder = None
+    if search:
+        base = get_search_index() if include_existing else None
+        search_builder = search_index.SearchIndexBuilder(base)
+
+    def _add(writer: "BankWriter", grade: str, subject: str, qtype: str, question: Question,
+             existing: bool = False) -> None:
+        key = _dedup_key(grade, subject, qtype, question["question"])
+        if key in seen:
+            stats["duplicates"] += 1
+            return
+        seen.add(key)
+        writer.add(grade, subject, qtype, question)
+        if search_builder is not None and not existing:
+            search_builder.add(grade, subject, qtype, question)
+        stats["existing" if existing else "imported"] += 1
+
+    # The bank and its indexes are written under temporary names and renamed
+    # into place together, so processes reading the old files are undisturbed.
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with BankWriter(tmp_path) as writer:
+            if include_existing:
+                for grade, subjects in QUESTION_BANK.items():
+                    for subject, types in subjects.items():
+                        for qtype, questions in types.items():
+                            for question in questions:
+                                _add(writer, grade, subject, qtype, question, existing=True)
+
+            for path in sources:
+                rows = _iter_rows(path)
+                while True:
+                    batch = list(itertools.islice(rows, batch_size))
+                    if not batch:
+                        break
+                    for line_no, row in batch:
+                        stats["rows"] += 1
+                        try:
+                            grade, subject, qtype, question = validate_question_row(row)
+                        except ImportErrorRow as exc:
+                            if strict:
+                                raise ImportErrorRow(f"{path}:{line_no}: {exc}") from None
+                            stats["invalid"] += 1
+                            if len(stats["errors"]) < max_errors_reported:
+                                stats["errors"].append(f"{path}:{line_no}: {exc}")
+                            continue
+                        _add(writer, grade, subject, qtype, question)
+                    if progress is not None:
+                        progress(dict(stats, elapsed=time.perf_counter() - started))
+
+        if near_duplicates:
+            stats["near_duplicate_groups"] = len(_write_near_duplicate_index(tmp_path).groups())
+        if search_builder is not None:
+            index = search_builder.finish(writer.version)
+            index.save(search_index.sidecar_path(tmp_path))
+            stats["search_terms"] = index.term_count
+        _replace_bank_files(tmp_path, output_path)
+    except BaseException:
+        _remove_bank_files(tmp_path)
+        raise
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed"] = elapsed
+    stats["rows_per_sec"] = stats["rows"] / elapsed if elapsed > 0 else 0.0
+    stats["peak_memory_bytes"] = _peak_memory_bytes()
+    return stats
+
+
+# ---------- LOADING ----------
+
+def _source_stamp(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def _snapshot_path() -> str:
+    """
+    Where the sample bank's snapshot lives: next to this module's .pyc,
+    named after this file's mtime and size so an edited bank is rebuilt.
+    """
+    here = os.path.abspath(__file__)
+    cache_dir = os.path.join(os.path.dirname(here), "__pycache__")
+    return os.path.join(cache_dir, f"question_bank.{_source_stamp(here)}.qpb")
+
+
+def _write_bank_files(bank: Mapping, path: str) -> bool:
+    """
+    Write `bank` to the bank file `path` with its near-duplicate and search
+    indexes; False if that fails (e.g. a read-only directory).
+    """
+    from bank_store import write_bank
+    import near_duplicates
+    import search_index
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        version = write_bank(bank, tmp_path)["version"]
+        near_duplicates.build_index(bank, version).save(near_duplicates.sidecar_path(tmp_path))
+        search_index.build_index(bank, version).save(search_index.sidecar_path(tmp_path))
+        # Several workers may start at once: each writes its own files and
+        # renames them into place, the bank file last.
+        _replace_bank_files(tmp_path, path)
+    except OSError:
+        _remove_bank_files(tmp_path)
+        return False
+    return True
+
+
+def _write_snapshot(path: str) -> bool:
+    """
+    Build the sample bank and write it to `path`, with its near-duplicate
+    and search indexes; False if that fails (e.g. a read-only install), in
+    which case the bank is built in memory on each start.
+    """
+    bank: Dict = {}
+    _create_sample_grade_questions(bank)
+    _create_btech_questions(bank)
+    if not _write_bank_files(bank, path):
+        return False
+    cache_dir, name = os.path.split(path)
+    for stale in os.listdir(cache_dir):
+        if stale.startswith("question_bank.") and ".qpb" in stale and not stale.startswith(name):
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(cache_dir, stale))
+    return True
+
+
+def _open_snapshot() -> Optional["BankStore"]:
+    from bank_store import BankStore
+
+    if os.environ.get(SNAPSHOT_ENV, "1") == "0":
+        return None
+    path = _snapshot_path()
+    for attempt in range(2):
+        if (attempt or not os.path.exists(path)) and not _write_snapshot(path):
+            return None
+        try:
+            return BankStore.open(path)
+        except ValueError:  # written with an older bank file format
+            continue
+    return None
+
+
+def _file_id(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _load_question_bank() -> Mapping[str, Mapping[str, Mapping[str, List[Question]]]]:
+    global _BANK, _STORE, _DELTA, _BANK_FILE_ID, _CATALOG
+
+    with _LOAD_LOCK:
+        if _BANK is not None:
+            return _BANK
+        bank_path = os.environ.get(BANK_PATH_ENV)
+        if bank_path:
+            from bank_delta import DeltaBank
+            from bank_store import BankStore
+
+            # Identity first: if the file is replaced in between, the next
+            # reload_bank() notices and reopens it.
+            _BANK_FILE_ID = _file_id(bank_path)
+            _STORE = BankStore.open(bank_path)
+            _DELTA = DeltaBank.open(_STORE)
+        else:
+            _STORE = _open_snapshot()
+        if _DELTA is not None:
+            bank = _DELTA
+        elif _STORE is not None:
+            bank = _STORE.mapping()
+        else:
+            bank = {}
+            _create_sample_grade_questions(bank)
+            _create_btech_questions(bank)
+        _CATALOG = None
+        _BANK = bank
+    return bank
+
+
+def _loaded_bank() -> Mapping[str, Mapping[str, Mapping[str, List[Question]]]]:
+    """
+    The bank behind QUESTION_BANK, loading (or mapping) it on first use.
+    """
+    bank = _BANK
+    return bank if bank is not None else _load_question_bank()
+
+
+def _remove_shared_bank(path: str, owner: int) -> None:
+    import near_duplicates
+    import search_index
+
+    if os.getpid() != owner:
+        return  # a forked worker exiting
+    for leftover in (path, near_duplicates.sidecar_path(path), search_index.sidecar_path(path)):
+        with contextlib.suppress(OSError):
+            os.remove(leftover)
+
+
+def share_bank() -> Optional[str]:
+    """
+    Prepare the bank to be shared with worker processes started from now
+    on, and return the bank file they map. A bank file (QP_BANK_PATH or
+    the sample snapshot) is shared already: workers map the same pages. A
+    bank built in memory (QP_BANK_SNAPSHOT=0, or a read-only install) is
+    written once, with its indexes, to shared memory (/dev/shm where there
+    is one) and named in QP_BANK_PATH, so workers map it instead of each
+    building a copy; this process switches to it too. The files are removed
+    when this process exits.
+
+    Returns None if the bank could not be written.
+    """
+    import atexit
+    import tempfile
+
+    global _BANK, _CATALOG
+    bank = _loaded_bank()
+    store = _STORE
+    if store is not None:
+        return store.path
+
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    path = os.path.join(directory, f"question_bank.{os.getpid()}.{get_bank_version()}.qpb")
+    if not _write_bank_files(bank, path):
+        return None
+    atexit.register(_remove_shared_bank, path, os.getpid())
+    os.environ[BANK_PATH_ENV] = path
+    with _LOAD_LOCK:
+        if _BANK is bank:
+            # Same questions, same version: the indexes built so far stay valid.
+            _BANK = None
+            _CATALOG = None
+    _loaded_bank()
+    return path
+
+
+def reload_bank() -> int:
+    """
+    Pick up edits to the QP_BANK_PATH bank file without a restart: apply
+    edits appended to its delta log since the bank was loaded or last
+    reloaded. Only the partitions they touch are replaced, and the
+    near-duplicate and search indexes are updated for those partitions
+    only. A compacted or replaced bank file is reopened on next access.
+
+    Returns the number of partitions replaced (-1 if the bank file was
+    reopened). Does nothing for the sample bank or a bank not yet loaded.
+    """
+    global _BANK, _STORE, _DELTA, _CATALOG, _NEAR_DUPLICATES, _SEARCH_INDEX
+    from bank_delta import StaleDeltaError, delta_path, partition_changes, update_search_index
+    from near_duplicates import update_index
 
+    with _LOAD_LOCK:
+        delta = _DELTA
+        if _BANK is None or delta is None:
+            return 0
+        try:
+            if _file_id(_STORE.path) != _BANK_FILE_ID:
+                raise StaleDeltaError(f"{_STORE.path} was replaced")
+            bank, changed = delta.refreshed(delta_path(_STORE.path))
+        except (OSError, StaleDeltaError):
+            # Readers may still hold questions of the old file, so it is
+            # left for the garbage collector rather than closed.
+            _BANK = _STORE = _DELTA = None
+            _CATALOG = _NEAR_DUPLICATES = _SEARCH_INDEX = None
+            return -1
+        if bank is delta:
+            return 0
 
-# Build the question bank on import
-_create_sample_grade_questions()
-_create_btech_questions()
+        changes = list(partition_changes(delta, bank, changed))
+        if _NEAR_DUPLICATES is not None and _NEAR_DUPLICATES.bank_version == delta.version:
+            _NEAR_DUPLICATES = update_index(_NEAR_DUPLICATES, changes, bank.version)
+        if _SEARCH_INDEX is not None and _SEARCH_INDEX.bank_version == delta.version:
+            _SEARCH_INDEX = update_search_index(_SEARCH_INDEX, changes, bank.version)
+        _CATALOG = None
+        _BANK = _DELTA = bank
+    return len(changed)
@@ -0,0 +1,152 @@
+import hashlib
+import sys
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+# Option tuples are shared between questions with identical options (e.g.
+# every sample MCQ's "A) Option A" ... "D) Option D"), and option strings
+# are interned, so repeated options cost one pointer per question.
+_OPTION_TUPLES: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_MAX_SHARED_OPTION_TUPLES = 1 << 16
+
+
+def shared_options(options: Iterable[str]) -> Tuple[str, ...]:
+    options = tuple(sys.intern(opt) for opt in options)
+    if not options:
+        return ()
+    shared = _OPTION_TUPLES.get(options)
+    if shared is not None:
+        return shared
+    if len(_OPTION_TUPLES) < _MAX_SHARED_OPTION_TUPLES:
+        _OPTION_TUPLES[options] = options
+    return options
+
+
+class Question:
+    """
+    Compact, read-only question record.
+
+    Uses __slots__ instead of a per-question dict and shares option tuples
+    between questions. Supports the read side of the dict interface
+    (q["question"], q.get("options", [])) so code written against the
+    original question dicts keeps working.
+
+    `tags` are free-form labels; "key:value" tags (e.g. "topic:loops")
+    are grouped into facets by the bank catalog.
+
+    Records also carry their pre-rendered paper fragment (see fragment()),
+    which is not part of the record's value.
+    """
+
+    __slots__ = ("question", "options", "answer", "tags", "_fragment")
+
+    _FIELDS = ("question", "options", "answer", "tags")
+
+    def __init__(
+        self,
+        question: str,
+        options: Iterable[str] = (),
+        answer: str = "",
+        tags: Iterable[str] = (),
+    ):
+        object.__setattr__(self, "question", question)
+        object.__setattr__(self, "options", shared_options(options))
+        object.__setattr__(self, "answer", answer)
+        object.__setattr__(self, "tags", tuple(sys.intern(tag) for tag in tags))
+        object.__setattr__(self, "_fragment", None)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Question":
+        if isinstance(data, Question):
+            return data
+        return cls(
+            data["question"],
+            data.get("options", ()),
+            data.get("answer", ""),
+            data.get("tags", ()),
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Question records are read-only")
+
+    def fragment(self, render: Callable[["Question"], Any]) -> Any:
+        """
+        This question rendered for papers by `render`, built on first use
+        and kept for the lifetime of the record (bank records live as long
+        as their bank, so each is rendered once per process).
+        """
+        fragment = self._fragment
+        if fragment is None:
+            fragment = render(self)
+            object.__setattr__(self, "_fragment", fragment)
+        return fragment
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ("options", "tags") and not getattr(self, key):
+            raise KeyError(key)
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def keys(self) -> Tuple[str, ...]:
+        return tuple(key for key in self._FIELDS if key in self)
+
+    def to_dict(self) -> Dict:
+        """
+        The equivalent question dict ("options" only for MCQs, "tags" only
+        if there are any).
+        """
+        data = {"question": self.question}
+        if self.options:
+            data["options"] = list(self.options)
+        data["answer"] = self.answer
+        if self.tags:
+            data["tags"] = list(self.tags)
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Question):
+            return (self.question, self.options, self.answer, self.tags) == (
+                other.question, other.options, other.answer, other.tags
+            )
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        tags = f", tags={self.tags!r}" if self.tags else ""
+        return f"Question({self.question!r}, options={self.options!r}, answer={self.answer!r}{tags})"
+
+    def __reduce__(self):
+        return (Question, (self.question, self.options, self.answer, self.tags))
+
+
+def as_question_dict(question: Any) -> Dict:
+    """
+    Plain-dict form of a Question record or question dict.
+    """
+    if isinstance(question, Question):
+        return question.to_dict()
+    return question
+
+
+def question_key(question: Any) -> int:
+    """
+    Stable 64-bit key for a question, from its whitespace- and
+    case-normalised text. Used to recognise the same question across
+    papers, processes and bank versions.
+    """
+    normalised = " ".join(question["question"].casefold().split())
+    digest = hashlib.blake2b(normalised.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
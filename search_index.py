@@ -0,0 +1,677 @@
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+from records import question_key
+
+
+# Full-text and tag search over the question bank: an inverted index from
+# terms to postings, ranked with BM25.
+#
+# Documents are questions (question text, options and answer), identified
+# by their grade/subject/type partition and records.question_key, so the
+# index stays valid when a bank file is rewritten with the same questions.
+# Terms are case-folded words without function words, with a plural "s"
+# stripped. Tags are indexed as "#tag" terms ("#topic:loops"); a query
+# word containing ":" or starting with "#" filters by tag.
+#
+# Postings are kept in document order as two flat arrays (document ids and
+# term frequencies) per index, with the sorted term list as one UTF-8 blob,
+# and stored in a sidecar file next to the bank file ("<bank>.search") that
+# is memory-mapped on load, so opening an index reads only its header.
+# Term weights are computed at query time from term frequencies and
+# document lengths, so new questions can be appended (SearchIndexBuilder
+# with a base index) without re-tokenizing the existing ones. Removing a
+# question drops it from its terms' postings and leaves its document id
+# unused.
+
+MAGIC = b"QPSRCH"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<6sHI")
+
+K1 = 1.2
+B = 0.75
+DEFAULT_LIMIT = 20
+_MAX_TF = 0xFFFF
+# Terms with more postings than this also keep "leaders": for each term
+# frequency, the _LEADERS shortest documents. A one-word query's best
+# results are always among them (at equal term frequency a shorter
+# document scores higher), so it is answered without a pass over the
+# term's postings.
+_LEADER_MIN_DF = 4096
+_LEADERS = 128
+
+_WORD = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in into is it its of on or "
+    "the their this that these those to was what when where which who why with".split()
+)
+
+
+def sidecar_path(bank_path: str) -> str:
+    return bank_path + ".search"
+
+
+def _normalise(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Search terms of a text, in order (repeats kept).
+    """
+    return [
+        _normalise(word)
+        for word in _WORD.findall(text.casefold())
+        if word not in _STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def tag_term(tag: str) -> str:
+    return "#" + tag.strip().lstrip("#").casefold()
+
+
+def parse_query(query: str) -> Tuple[List[str], List[str]]:
+    """
+    (search terms, tag terms) of a query: "topic:joins normal form"
+    searches for "normal form" among questions tagged topic:joins.
+    """
+    words, tags = [], []
+    for part in query.split():
+        if part.startswith("#") or ":" in part:
+            tags.append(tag_term(part))
+        else:
+            words.extend(tokenize(part))
+    return list(dict.fromkeys(words)), list(dict.fromkeys(tags))
+
+
+class SearchHit(NamedTuple):
+    score: float
+    grade: str
+    subject: str
+    qtype: str
+    key: int
+
+
+class SearchIndex:
+    """
+    Read-only inverted index for one bank version. Built by
+    SearchIndexBuilder or loaded (memory-mapped) from a sidecar file.
+    """
+
+    def __init__(
+        self,
+        bank_version: str,
+        partitions: List[Tuple[str, str, str]],
+        doc_partitions: Sequence[int],
+        doc_keys: Sequence[int],
+        doc_lengths: Sequence[int],
+        term_blob: bytes,
+        term_offsets: Sequence[int],
+        posting_offsets: Sequence[int],
+        posting_docs: Sequence[int],
+        posting_tfs: Sequence[int],
+        leader_offsets: Sequence[int],
+        leader_docs: Sequence[int],
+        leader_tfs: Sequence[int],
+        runs: List[Tuple[int, int, int]],
+        total_length: int,
+        live_docs: Optional[int] = None,
+    ):
+        self.bank_version = bank_version
+        self.partitions = [tuple(partition) for partition in partitions]
+        self._doc_partitions = doc_partitions
+        self._doc_keys = doc_keys
+        self._doc_lengths = doc_lengths
+        self._term_blob = term_blob
+        self._term_offsets = term_offsets
+        self._posting_offsets = posting_offsets
+        self._posting_docs = posting_docs
+        self._posting_tfs = posting_tfs
+        self._leader_offsets = leader_offsets
+        self._leader_docs = leader_docs
+        self._leader_tfs = leader_tfs
+        # (partition id, first document, end) for each run of consecutive
+        # documents in one partition
+        self._runs = [tuple(run) for run in runs]
+        self._total_length = total_length
+        # Document ids of removed questions stay allocated but unused.
+        self._live_docs = len(doc_keys) if live_docs is None else live_docs
+        self._norms: Optional[array] = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    @property
+    def term_count(self) -> int:
+        return len(self._term_offsets) - 1
+
+    def _term(self, index: int) -> bytes:
+        return bytes(self._term_blob[self._term_offsets[index]:self._term_offsets[index + 1]])
+
+    def terms(self) -> Iterable[str]:
+        return (self._term(i).decode("utf-8") for i in range(self.term_count))
+
+    def _find_term(self, term: str) -> int:
+        target = term.encode("utf-8")
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.term_count and self._term(lo) == target else -1
+
+    def _postings_range(self, index: int) -> Tuple[int, int]:
+        return self._posting_offsets[index], self._posting_offsets[index + 1]
+
+    def postings(self, term: str) -> Tuple[Sequence[int], Sequence[int]]:
+        """
+        (document ids, term frequencies) of a term, in document order.
+        """
+        index = self._find_term(term)
+        if index < 0:
+            return (), ()
+        start, end = self._postings_range(index)
+        return self._posting_docs[start:end], self._posting_tfs[start:end]
+
+    def _leaders(self, term: str) -> Tuple[Sequence[int], Sequence[int]]:
+        index = self._find_term(term)
+        if index < 0:
+            return (), ()
+        start, end = self._leader_offsets[index], self._leader_offsets[index + 1]
+        return self._leader_docs[start:end], self._leader_tfs[start:end]
+
+    def _length_norms(self) -> array:
+        # k1 * (1 - b + b * length / average length), per document
+        if self._norms is None:
+            average = self._total_length / len(self) if len(self) else 1.0
+            scale = K1 * B / (average or 1.0)
+            base = K1 * (1 - B)
+            self._norms = array("d", [base + scale * length for length in self._doc_lengths])
+        return self._norms
+
+    def _allowed_partitions(self, grade: Optional[str], subject: Optional[str], qtype: Optional[str]) -> Optional[Set[int]]:
+        if grade is None and subject is None and qtype is None:
+            return None
+        return {
+            pid for pid, (g, s, t) in enumerate(self.partitions)
+            if (grade is None or g == grade) and (subject is None or s == subject) and (qtype is None or t == qtype)
+        }
+
+    def _restrict(self, docs: Sequence[int], tfs: Sequence[int], ranges: Optional[List[Tuple[int, int]]]):
+        """
+        The postings within the document id `ranges` (all of them for None),
+        as (docs, tfs) slices.
+        """
+        if ranges is None:
+            return [(docs, tfs)]
+        slices = []
+        for start, end in ranges:
+            i = bisect_left(docs, start)
+            j = bisect_left(docs, end, i)
+            if i < j:
+                slices.append((docs[i:j], tfs[i:j]))
+        return slices
+
+    def search(
+        self,
+        query: str,
+        limit: int = DEFAULT_LIMIT,
+        grade: Optional[str] = None,
+        subject: Optional[str] = None,
+        qtype: Optional[str] = None,
+    ) -> List[SearchHit]:
+        """
+        The `limit` best matches for `query` by BM25 score, optionally
+        restricted to a grade, subject and/or question type. A query of
+        only tags lists tagged questions in bank order, with score 0.
+        """
+        words, tags = parse_query(query)
+        allowed = self._allowed_partitions(grade, subject, qtype)
+        if (not words and not tags) or allowed == set():
+            return []
+        # Documents are numbered in runs per partition, so a partition
+        # filter is a few document id ranges.
+        ranges = None
+        if allowed is not None:
+            ranges = [(start, end) for pid, start, end in self._runs if pid in allowed]
+
+        # Documents carrying every tag (None: no tag filter)
+        tagged: Optional[Set[int]] = None
+        for tag in tags:
+            docs = set(self.postings(tag)[0])
+            tagged = docs if tagged is None else tagged & docs
+            if not tagged:
+                return []
+
+        if not words:
+            docs = (doc for doc in sorted(tagged) if self._in_partitions(doc, allowed))
+            return [self._hit(doc, 0.0) for doc in itertools.islice(docs, limit)]
+
+        terms = []
+        count = len(self)
+        for word in words:
+            docs, tfs = self.postings(word)
+            if len(docs):
+                weight = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5)) * (K1 + 1)
+                terms.append((weight, docs, tfs))
+        if not terms:
+            return []
+        norms = self._length_norms()
+
+        if len(terms) == 1 and tagged is None:
+            weight, docs, tfs = terms[0]
+            if ranges is None and limit <= _LEADERS and len(docs) > _LEADER_MIN_DF:
+                docs, tfs = self._leaders(words[0])
+            best = heapq.nlargest(
+                limit,
+                itertools.chain.from_iterable(zip(*chunk) for chunk in self._restrict(docs, tfs, ranges)),
+                key=lambda posting: posting[1] / (posting[1] + norms[posting[0]]),
+            )
+            return [self._hit(doc, weight * tf / (tf + norms[doc])) for doc, tf in best]
+
+        # Term-at-a-time, rarest (highest weighted) terms first. A term adds
+        # less than its weight to any score, so once the `limit`-th best
+        # score beats the total weight of the remaining terms, documents not
+        # scored yet cannot make the results: the remaining terms only
+        # update the candidates, looked up by bisection when that is cheaper
+        # than a pass over the postings (MaxScore).
+        terms.sort(key=itemgetter(0), reverse=True)
+        remaining = list(itertools.accumulate(weight for weight, _, _ in reversed(terms)))[::-1]
+        scores: Dict[int, float] = {}
+        for position, (weight, docs, tfs) in enumerate(terms):
+            if len(scores) >= limit:
+                threshold = heapq.nlargest(limit, scores.values())[-1]
+                if remaining[position] < threshold:
+                    scores = {doc: score for doc, score in scores.items() if score + remaining[position] >= threshold}
+                    if len(scores) * 16 < len(docs):
+                        for doc in scores:
+                            i = bisect_left(docs, doc)
+                            if i < len(docs) and docs[i] == doc:
+                                scores[doc] += weight * tfs[i] / (tfs[i] + norms[doc])
+                    else:
+                        for doc, tf in zip(docs, tfs):
+                            if doc in scores:
+                                scores[doc] += weight * tf / (tf + norms[doc])
+                    continue
+            for chunk_docs, chunk_tfs in self._restrict(docs, tfs, ranges):
+                if not scores and tagged is None:
+                    scores = {doc: weight * tf / (tf + norms[doc]) for doc, tf in zip(chunk_docs, chunk_tfs)}
+                    continue
+                get = scores.get
+                for doc, tf in zip(chunk_docs, chunk_tfs):
+                    if tagged is None or doc in tagged:
+                        scores[doc] = get(doc, 0.0) + weight * tf / (tf + norms[doc])
+
+        best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [self._hit(doc, score) for doc, score in best]
+
+    def _in_partitions(self, doc: int, allowed: Optional[Set[int]]) -> bool:
+        return allowed is None or self._doc_partitions[doc] in allowed
+
+    def _hit(self, doc: int, score: float) -> SearchHit:
+        grade, subject, qtype = self.partitions[self._doc_partitions[doc]]
+        return SearchHit(score, grade, subject, qtype, self._doc_keys[doc])
+
+    def save(self, path: str) -> None:
+        header = json.dumps({
+            "bank_version": self.bank_version,
+            "partitions": self.partitions,
+            "docs": len(self._doc_keys),
+            "live_docs": len(self),
+            "terms": self.term_count,
+            "postings": len(self._posting_docs),
+            "leaders": len(self._leader_docs),
+            "runs": self._runs,
+            "term_bytes": len(self._term_blob),
+            "total_length": self._total_length,
+            "byteorder": sys.byteorder,
+        }).encode("utf-8")
+        # Written under a temporary name and renamed over `path`: a loaded
+        # index maps the old file, which must not change underneath it.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+                f.write(header)
+                f.write(b"\0" * (-f.tell() % 8))
+                # Widest items first, so every section stays aligned.
+                for data in (
+                    self._doc_keys, self._term_offsets, self._posting_offsets, self._leader_offsets,
+                    self._doc_partitions, self._doc_lengths, self._posting_docs, self._leader_docs,
+                    self._posting_tfs, self._leader_tfs,
+                    self._term_blob,
+                ):
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        with open(path, "rb") as f:
+            magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a search index (format {FORMAT_VERSION})")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(data)
+        position = _PREFIX.size + header_len
+        position += -position % 8
+        sections = []
+        docs, terms, postings, leaders = header["docs"], header["terms"], header["postings"], header["leaders"]
+        for typecode, size, count in (
+            ("Q", 8, docs), ("Q", 8, terms + 1), ("Q", 8, terms + 1), ("Q", 8, terms + 1),
+            ("I", 4, docs), ("I", 4, docs), ("I", 4, postings), ("I", 4, leaders),
+            ("H", 2, postings), ("H", 2, leaders),
+        ):
+            sections.append(buffer[position:position + size * count].cast(typecode))
+            position += size * count
+        term_blob = buffer[position:position + header["term_bytes"]]
+
+        (doc_keys, term_offsets, posting_offsets, leader_offsets, doc_partitions, doc_lengths,
+         posting_docs, leader_docs, posting_tfs, leader_tfs) = sections
+        index = cls(
+            header["bank_version"], header["partitions"], doc_partitions, doc_keys, doc_lengths,
+            term_blob, term_offsets, posting_offsets, posting_docs, posting_tfs,
+            leader_offsets, leader_docs, leader_tfs, header["runs"], header["total_length"],
+            header.get("live_docs"),
+        )
+        index._mmap = data
+        return index
+
+
+class SearchIndexBuilder:
+    """
+    Collect questions into a SearchIndex. Starting from a `base` index
+    appends to it: the base's postings are copied as they are, and only
+    the added questions are tokenized. Callers add only questions that are
+    not in the base already, and remove() edited or retired ones first.
+    """
+
+    def __init__(self, base: Optional[SearchIndex] = None):
+        self._base = base
+        self._partitions: List[Tuple[str, str, str]] = list(base.partitions) if base else []
+        self._partition_ids = {partition: pid for pid, partition in enumerate(self._partitions)}
+        self._first_doc = len(base._doc_keys) if base else 0
+        self._live_docs = len(base) if base else 0
+        # Base documents to drop, and the terms whose postings hold them
+        self._removed: Set[int] = set()
+        self._removed_terms: Set[str] = set()
+        self._base_docs: Dict[int, Dict[int, int]] = {}
+        self._doc_partitions = array("I")
+        self._doc_keys = array("Q")
+        self._doc_lengths = array("I")
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._seen: Set[Tuple[int, int]] = set()
+        self._runs: List[List[int]] = [list(run) for run in base._runs] if base else []
+        self._total_length = base._total_length if base else 0
+
+    def add(self, grade: str, subject: str, qtype: str, question: Mapping) -> bool:
+        """
+        Add a question; False if the same question is already in its
+        grade/subject/type.
+        """
+        partition = (grade, subject, qtype)
+        pid = self._partition_ids.get(partition)
+        if pid is None:
+            pid = self._partition_ids[partition] = len(self._partitions)
+            self._partitions.append(partition)
+        key = question_key(question)
+        if (pid, key) in self._seen:
+            return False
+        self._seen.add((pid, key))
+
+        text = " ".join([question["question"], *question.get("options", ()), question.get("answer", "")])
+        terms = tokenize(text)
+        doc = self._first_doc + len(self._doc_keys)
+        if self._runs and self._runs[-1][0] == pid and self._runs[-1][2] == doc:
+            self._runs[-1][2] = doc + 1
+        else:
+            self._runs.append([pid, doc, doc + 1])
+        self._doc_partitions.append(pid)
+        self._doc_keys.append(key)
+        self._doc_lengths.append(len(terms))
+        self._total_length += len(terms)
+        self._live_docs += 1
+
+        frequencies: Dict[str, int] = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for tag in question.get("tags", ()):
+            frequencies[tag_term(tag)] = 1
+        for term, tf in frequencies.items():
+            entry = self._postings.get(term)
+            if entry is None:
+                entry = self._postings[term] = (array("I"), array("H"))
+            entry[0].append(doc)
+            entry[1].append(min(tf, _MAX_TF))
+        return True
+
+    def remove(self, grade: str, subject: str, qtype: str, question: Mapping) -> bool:
+        """
+        Remove a question of the base index; False if it is not there. Its
+        text is tokenized again to find the postings to cut it from.
+        """
+        pid = self._partition_ids.get((grade, subject, qtype))
+        base = self._base
+        if base is None or pid is None or pid >= len(base.partitions):
+            return False
+        docs = self._base_docs.get(pid)
+        if docs is None:
+            docs = self._base_docs[pid] = {
+                base._doc_keys[doc]: doc
+                for run_pid, start, end in base._runs if run_pid == pid
+                for doc in range(start, end)
+            }
+        doc = docs.pop(question_key(question), None)
+        if doc is None:
+            return False
+        self._removed.add(doc)
+        text = " ".join([question["question"], *question.get("options", ()), question.get("answer", "")])
+        self._removed_terms.update(tokenize(text))
+        self._removed_terms.update(tag_term(tag) for tag in question.get("tags", ()))
+        self._total_length -= base._doc_lengths[doc]
+        self._live_docs -= 1
+        return True
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    def finish(self, bank_version: str) -> SearchIndex:
+        """
+        Merge the base and added postings into a new index.
+        """
+        base = self._base
+        doc_partitions, doc_keys, doc_lengths = array("I"), array("Q"), array("I")
+        base_terms: Dict[str, int] = {}
+        if base is not None:
+            doc_partitions.frombytes(base._doc_partitions.tobytes())
+            doc_keys.frombytes(base._doc_keys.tobytes())
+            doc_lengths.frombytes(base._doc_lengths.tobytes())
+            base_terms = {term: i for i, term in enumerate(base.terms())}
+        doc_partitions.extend(self._doc_partitions)
+        doc_keys.extend(self._doc_keys)
+        doc_lengths.extend(self._doc_lengths)
+        all_terms = sorted(base_terms.keys() | self._postings.keys(), key=lambda term: term.encode("utf-8"))
+
+        term_blob = bytearray()
+        term_offsets = array("Q", [0])
+        posting_offsets = array("Q", [0])
+        posting_docs = array("I")
+        posting_tfs = array("H")
+        leader_offsets = array("Q", [0])
+        leader_docs = array("I")
+        leader_tfs = array("H")
+        for term in all_terms:
+            start = len(posting_docs)
+            base_index = base_terms.get(term)
+            base_leaders = None
+            if base_index is not None:
+                # Base documents come first, so postings stay in document order.
+                base_start, base_end = base._postings_range(base_index)
+                docs = base._posting_docs[base_start:base_end]
+                tfs = base._posting_tfs[base_start:base_end]
+                for i, j in self._kept_slices(docs) if term in self._removed_terms else [(0, len(docs))]:
+                    posting_docs.frombytes(docs[i:j].tobytes())
+                    posting_tfs.frombytes(tfs[i:j].tobytes())
+                leader_start, leader_end = base._leader_offsets[base_index], base._leader_offsets[base_index + 1]
+                if leader_end > leader_start:
+                    base_leaders = (base._leader_docs[leader_start:leader_end], base._leader_tfs[leader_start:leader_end])
+                    if not self._removed.isdisjoint(base_leaders[0]):
+                        base_leaders = None
+            added = self._postings.get(term, ((), ()))
+            posting_docs.extend(added[0])
+            posting_tfs.extend(added[1])
+            if len(posting_docs) == start:
+                continue  # all of its questions were removed
+            term_blob += term.encode("utf-8")
+            term_offsets.append(len(term_blob))
+            posting_offsets.append(len(posting_docs))
+
+            if len(posting_docs) - start > _LEADER_MIN_DF:
+                if base_leaders is not None:
+                    # The base's leaders are the shortest of its documents,
+                    # and none of them was removed.
+                    candidates = itertools.chain(zip(*base_leaders), zip(*added))
+                else:
+                    candidates = zip(posting_docs[start:], posting_tfs[start:])
+                for doc, tf in _select_leaders(candidates, doc_lengths):
+                    leader_docs.append(doc)
+                    leader_tfs.append(tf)
+            leader_offsets.append(len(leader_docs))
+
+        return SearchIndex(
+            bank_version, self._partitions, doc_partitions, doc_keys, doc_lengths, bytes(term_blob),
+            term_offsets, posting_offsets, posting_docs, posting_tfs,
+            leader_offsets, leader_docs, leader_tfs, self._runs, self._total_length, self._live_docs,
+        )
+
+    def _kept_slices(self, docs: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        [start, end) slices of a base term's postings without removed documents.
+        """
+        cuts = sorted(i for i in (bisect_left(docs, doc) for doc in self._removed) if i < len(docs))
+        slices, start = [], 0
+        for i in cuts:
+            if docs[i] in self._removed:
+                if i > start:
+                    slices.append((start, i))
+                start = i + 1
+        if start < len(docs):
+            slices.append((start, len(docs)))
+        return slices
+
+
+def _select_leaders(postings: Iterable[Tuple[int, int]], doc_lengths: Sequence[int]) -> List[Tuple[int, int]]:
+    by_tf: Dict[int, List[int]] = {}
+    for doc, tf in postings:
+        by_tf.setdefault(tf, []).append(doc)
+    return [
+        (doc, tf)
+        for tf in sorted(by_tf)
+        for doc in heapq.nsmallest(_LEADERS, by_tf[tf], key=doc_lengths.__getitem__)
+    ]
+
+
+def build_index(
+    bank: Mapping,
+    bank_version: str,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> SearchIndex:
+    """
+    Index every question of `bank` (QUESTION_BANK or a BankView).
+    """
+    started = time.perf_counter()
+    builder = SearchIndexBuilder()
+    for grade, subjects in bank.items():
+        for subject, types in subjects.items():
+            for qtype, questions in types.items():
+                for question in questions:
+                    builder.add(grade, subject, qtype, question)
+                if progress is not None:
+                    progress({"grade": grade, "subject": subject, "type": qtype, "questions": len(builder),
+                              "elapsed": time.perf_counter() - started})
+    return builder.finish(bank_version)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Build the search index for a bank file and write it next to it, or
+    query it:
+
+        python search_index.py question_bank.qpb
+        python search_index.py question_bank.qpb --query "normal form topic:normalization"
+    """
+    import argparse
+    import os
+
+    from bank_store import BankStore
+
+    parser = argparse.ArgumentParser(description="Build or query the search index of a bank file.")
+    parser.add_argument("bank", help="Path of the bank file")
+    parser.add_argument("--query", help="Search the existing index instead of building it")
+    parser.add_argument("--grade")
+    parser.add_argument("--subject")
+    parser.add_argument("--type", dest="qtype", choices=("mcq", "short", "long"))
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args(argv)
+
+    if args.query is not None:
+        if not os.path.exists(sidecar_path(args.bank)):
+            print(f"error: no search index at {sidecar_path(args.bank)}", file=sys.stderr)
+            return 1
+        index = SearchIndex.load(sidecar_path(args.bank))
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit, args.grade, args.subject, args.qtype)
+        elapsed = time.perf_counter() - started
+
+        store = BankStore.open(args.bank)
+        try:
+            for hit in hits:
+                text = next(
+                    (q["question"] for q in store.questions(hit.grade, hit.subject, hit.qtype)
+                     if question_key(q) == hit.key),
+                    "?",
+                )
+                print(f"{hit.score:6.2f}  {hit.grade} / {hit.subject} / {hit.qtype}: {text}")
+        finally:
+            store.close()
+        print(f"{len(hits)} results in {elapsed * 1000:.1f}ms", file=sys.stderr)
+        return 0
+
+    started = time.perf_counter()
+    store = BankStore.open(args.bank)
+    try:
+        index = build_index(store.mapping(), store.version)
+    finally:
+        store.close()
+    index.save(sidecar_path(args.bank))
+    print(
+        f"{len(index):,} questions, {index.term_count:,} terms "
+        f"in {time.perf_counter() - started:.1f}s -> {sidecar_path(args.bank)}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
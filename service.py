@@ -0,0 +1,436 @@
+"""
+Headless HTTP generation service, e.g. for LMS integrations.
+
+    python service.py --port 8080 --workers 4
+
+Endpoints (JSON in, JSON or PDF out):
+
+    GET  /health
+    POST /papers                {"grade", "subject", "num_mcq", "num_short",
+                                 "num_long", "seed" (optional)}
+                                -> {"paper_id", "question_paper", "answer_key"}
+    GET  /papers/<paper ID>     the same JSON, re-derived from the paper ID
+    GET  /papers/<paper ID>.pdf ?part=answer_key, ?compress=1 -> PDF
+    POST /pdf                   {"text", "title", "compress"} -> PDF
+
+Paper selection is cheap and runs on the event loop. PDF rendering is
+CPU-bound and runs in a process pool: requests arriving within
+--batch-delay-ms of each other go to a worker together (up to --max-batch)
+to amortise the inter-process overhead. At most --max-pending PDF requests
+wait for a worker; beyond that the service answers 503 with Retry-After
+instead of queueing without bound. Every --reload-interval seconds the
+service applies new edits to its bank file's delta log (see
+bank_delta.py), replacing only the partitions they touch; papers of other
+subjects keep their paper IDs. SIGTERM or SIGINT stops the service: it
+closes the listening socket and shuts the worker pool down. This module
+does not import streamlit.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from generator import decode_paper_id, encode_paper_id, generate_from_spec, make_paper_spec
+from question_bank import reload_bank
+from utils import text_to_pdf_bytes
+
+MAX_BODY_BYTES = 1 << 20
+_MAX_HEADER_BYTES = 16 << 10
+_RETRY_AFTER_SECONDS = 1
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+_PARTS = ("question_paper", "answer_key")
+_PDF_TITLES = {"question_paper": "Question Paper", "answer_key": "Answer Key"}
+
+# (text, title, compress)
+PdfJob = Tuple[str, str, bool]
+# (status, content type, body, extra headers)
+Response = Tuple[int, str, bytes, Dict[str, str]]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _render_batch(jobs: List[PdfJob]) -> List[bytes]:
+    return [text_to_pdf_bytes(text, title=title, compress=compress) for text, title, compress in jobs]
+
+
+class PdfBatcher:
+    """
+    Bounded queue of PDF jobs, rendered in batches on an executor.
+
+    At most `max_in_flight` batches run at once; jobs beyond that wait in
+    the queue, and once `max_pending` jobs are waiting new ones are
+    rejected with 503.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor],
+        max_batch: int = 16,
+        batch_delay: float = 0.002,
+        max_pending: int = 256,
+        max_in_flight: int = 2,
+    ):
+        self._executor = executor
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.batches = 0
+        self.jobs = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def render(self, text: str, title: str, compress: bool = False) -> bytes:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(((text, title, compress), future))
+        except asyncio.QueueFull:
+            raise HttpError(
+                503, "Too many pending PDF requests", {"Retry-After": str(_RETRY_AFTER_SECONDS)}
+            ) from None
+        return await future
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self.batch_delay > 0 and self._queue.empty():
+                await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await self._slots.acquire()
+            self.batches += 1
+            self.jobs += len(batch)
+            task = loop.run_in_executor(self._executor, _render_batch, [job for job, _ in batch])
+            task.add_done_callback(lambda done, batch=batch: self._deliver(done, batch))
+
+    def _deliver(self, done: asyncio.Future, batch: List) -> None:
+        self._slots.release()
+        error = asyncio.CancelledError() if done.cancelled() else done.exception()
+        results = done.result() if error is None else [None] * len(batch)
+        for (_, future), pdf in zip(batch, results):
+            if future.done():
+                continue  # client went away
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(pdf)
+
+
+def _json_response(data: Dict, status: int = 200) -> Response:
+    return status, "application/json", json.dumps(data).encode("utf-8"), {}
+
+
+def _parse_json(body: bytes) -> Dict:
+    try:
+        data = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise HttpError(400, f"Invalid JSON body: {exc}") from None
+    if not isinstance(data, dict):
+        raise HttpError(400, "JSON body must be an object")
+    return data
+
+
+def _int_field(data: Dict, name: str, default: Optional[int] = None) -> Optional[int]:
+    value = data.get(name, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise HttpError(400, f"{name} must be a non-negative integer")
+    return value
+
+
+def _pool_context():
+    # Forked workers would inherit the listening socket and keep the port
+    # open if the server died first; forkserver/spawn workers start clean.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class GenerationService:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_batch: int = 16,
+        batch_delay: float = 0.002,
+        max_pending: int = 256,
+        reload_interval: float = 5.0,
+    ):
+        if workers == 0:
+            self._executor: Optional[Executor] = None  # render on the loop's default thread pool
+            in_flight = 1
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+            in_flight = 2 * (workers or os.cpu_count() or 1)
+        self.batcher = PdfBatcher(self._executor, max_batch, batch_delay, max_pending, in_flight)
+        self._batcher_task: Optional[asyncio.Task] = None
+        self.reload_interval = reload_interval
+        self._reload_task: Optional[asyncio.Task] = None
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        if self._executor is not None:
+            # Start the workers before binding, so the first requests do not
+            # wait for them.
+            await asyncio.get_running_loop().run_in_executor(self._executor, _render_batch, [])
+        self._batcher_task = asyncio.ensure_future(self.batcher.run())
+        if self.reload_interval > 0:
+            self._reload_task = asyncio.ensure_future(self._reload_bank())
+        return await asyncio.start_server(self._handle_connection, host, port, limit=_MAX_HEADER_BYTES)
+
+    async def _reload_bank(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                # Off the loop: updating the indexes of a large partition takes a while.
+                await loop.run_in_executor(None, reload_bank)
+            except Exception:
+                traceback.print_exc()
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop the batcher and reload tasks and shut the worker pool down,
+        waiting for the workers to exit unless `wait` is False.
+        """
+        for task in (self._batcher_task, self._reload_task):
+            if task is not None:
+                task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ---------- HTTP/1.1 ----------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, *self._error(HttpError(413, "Request headers too large")), False)
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self._write(writer, *self._error(HttpError(400, "Malformed request line")), False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self._write(writer, *self._error(HttpError(413, "Request body too large")), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                response = await self._respond(method, target, body)
+                await self._write(writer, *response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(
+        writer: asyncio.StreamWriter,
+        status: int,
+        content_type: str,
+        body: bytes,
+        extra: Dict[str, str],
+        keep_alive: bool,
+    ) -> None:
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in extra.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    def _error(exc: HttpError) -> Response:
+        status, content_type, body, _ = _json_response({"error": str(exc)}, exc.status)
+        return status, content_type, body, exc.headers
+
+    async def _respond(self, method: str, target: str, body: bytes) -> Response:
+        try:
+            return await self._dispatch(method, target, body)
+        except HttpError as exc:
+            return self._error(exc)
+        except ValueError as exc:
+            return self._error(HttpError(400, str(exc)))
+        except Exception:
+            traceback.print_exc()
+            return self._error(HttpError(500, "Internal server error"))
+
+    # ---------- ROUTES ----------
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Response:
+        url = urlsplit(target)
+        path = unquote(url.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        if path == "/health":
+            self._require(method, "GET")
+            return _json_response({"status": "ok", "pending_pdfs": self.batcher.pending})
+        if path == "/papers":
+            self._require(method, "POST")
+            return self._create_paper(_parse_json(body))
+        if path.startswith("/papers/"):
+            self._require(method, "GET")
+            paper_id = path[len("/papers/"):]
+            if paper_id.endswith(".pdf"):
+                return await self._paper_pdf(paper_id[:-len(".pdf")], query)
+            return self._paper_json(paper_id)
+        if path == "/pdf":
+            self._require(method, "POST")
+            return await self._text_pdf(_parse_json(body))
+        raise HttpError(404, f"No route for {path}")
+
+    @staticmethod
+    def _require(method: str, allowed: str) -> None:
+        if method != allowed:
+            raise HttpError(405, f"Use {allowed}", {"Allow": allowed})
+
+    def _create_paper(self, data: Dict) -> Response:
+        grade, subject = data.get("grade"), data.get("subject")
+        if not isinstance(grade, str) or not isinstance(subject, str):
+            raise HttpError(400, "grade and subject are required strings")
+        spec = make_paper_spec(
+            grade=grade,
+            subject=subject,
+            num_mcq=_int_field(data, "num_mcq", 5),
+            num_short=_int_field(data, "num_short", 3),
+            num_long=_int_field(data, "num_long", 2),
+            seed=_int_field(data, "seed"),
+        )
+        paper_id = encode_paper_id(spec)
+        return self._paper_json(paper_id, generate_from_spec(spec))
+
+    @staticmethod
+    def _paper_json(paper_id: str, paper: Optional[Tuple[str, str]] = None) -> Response:
+        qp_text, answer_key_text = paper or generate_from_spec(decode_paper_id(paper_id))
+        return _json_response({"paper_id": paper_id, "question_paper": qp_text, "answer_key": answer_key_text})
+
+    async def _paper_pdf(self, paper_id: str, query: Dict[str, str]) -> Response:
+        part = query.get("part", "question_paper")
+        if part not in _PARTS:
+            raise HttpError(400, f"part must be one of {', '.join(_PARTS)}")
+        paper = generate_from_spec(decode_paper_id(paper_id))
+        text = paper.qp_text if part == "question_paper" else paper.answer_key_text
+        pdf = await self.batcher.render(text, _PDF_TITLES[part], query.get("compress") in ("1", "true"))
+        return 200, "application/pdf", pdf, {}
+
+    async def _text_pdf(self, data: Dict) -> Response:
+        text, title = data.get("text"), data.get("title", "Question Paper")
+        if not isinstance(text, str) or not isinstance(title, str):
+            raise HttpError(400, "text (and title, if given) must be strings")
+        pdf = await self.batcher.render(text, title, bool(data.get("compress", False)))
+        return 200, "application/pdf", pdf, {}
+
+
+async def serve(
+    host: str,
+    port: int,
+    workers: Optional[int] = None,
+    max_batch: int = 16,
+    batch_delay: float = 0.002,
+    max_pending: int = 256,
+    reload_interval: float = 5.0,
+) -> None:
+    service = GenerationService(workers, max_batch, batch_delay, max_pending, reload_interval)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        with contextlib.suppress(NotImplementedError):  # Windows: Ctrl+C raises KeyboardInterrupt
+            loop.add_signal_handler(signum, stopping.set)
+    try:
+        server = await service.start(host, port)
+        bound_host, bound_port = server.sockets[0].getsockname()[:2]
+        print(f"Serving on http://{bound_host}:{bound_port}", flush=True)
+        async with server:  # closes the listening socket on the way out
+            await stopping.wait()
+    finally:
+        service.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve question paper generation over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (0 = any free port)")
+    parser.add_argument("--workers", type=int, default=None, help="PDF worker processes (0 = threads)")
+    parser.add_argument("--max-batch", type=int, default=16, help="PDF jobs per worker task")
+    parser.add_argument(
+        "--batch-delay-ms",
+        type=float,
+        default=2.0,
+        help="How long to wait for more PDF jobs before sending a batch",
+    )
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=256,
+        help="Queued PDF jobs before new ones are rejected with 503",
+    )
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between checks for bank delta edits (0 = never)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(
+            args.host,
+            args.port,
+            workers=args.workers,
+            max_batch=args.max_batch,
+            batch_delay=args.batch_delay_ms / 1000,
+            max_pending=args.max_pending,
+            reload_interval=args.reload_interval,
+        ))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
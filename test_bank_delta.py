@@ -0,0 +1,149 @@
+"""
+Tests for delta edits: appending them to the log, applying them over a
+bank file, and compacting the log into a new bank file.
+
+    python -m unittest test_bank_delta
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import bank_delta
+import near_duplicates
+import search_index
+from bank_store import BankStore, write_bank
+from records import Question
+
+BANK = {
+    "Grade 5": {
+        "Science": {
+            "short": [
+                Question("Why do leaves fall in autumn?", answer="To save water."),
+                Question("What do roots do?", answer="Take up water."),
+            ],
+            "mcq": [Question("Which planet is largest?", ("A) Mars", "B) Jupiter"), "B")],
+        },
+        "Maths": {"short": [Question("What is 7 x 8?", answer="56")]},
+    },
+}
+
+
+def _edit(op, **fields):
+    return dict(fields, op=op, grade="Grade 5", subject="Science", type="short")
+
+
+def _texts(bank, grade="Grade 5", subject="Science", qtype="short"):
+    return [q["question"] for q in bank[grade][subject][qtype]]
+
+
+class DeltaTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "bank.qpb")
+        self.version = write_bank(BANK, self.path)["version"]
+        near_duplicates.build_index(BANK, self.version).save(near_duplicates.sidecar_path(self.path))
+        search_index.build_index(BANK, self.version).save(search_index.sidecar_path(self.path))
+
+    def _open(self):
+        store = BankStore.open(self.path)
+        self.addCleanup(store.close)
+        return store, bank_delta.DeltaBank.open(store)
+
+    def _append_sample_edits(self):
+        return bank_delta.append_edits(self.path, [
+            _edit("add", question="How do seeds spread?", answer="By wind and animals."),
+            _edit("retire", question="What do roots do?"),
+            _edit("modify", replaces="Why do leaves fall in autumn?",
+                  question="Why do many trees lose their leaves in autumn?", answer="To save water."),
+        ])
+
+    def test_apply(self):
+        _, before = self._open()
+        result = self._append_sample_edits()
+        self.assertEqual((result["add"], result["retire"], result["modify"]), (1, 1, 1))
+        self.assertNotEqual(result["version"], self.version)
+
+        store, bank = self._open()
+        self.assertEqual(bank.version, result["version"])
+        self.assertEqual(bank.edits, 3)
+        self.assertEqual(_texts(bank), ["Why do many trees lose their leaves in autumn?", "How do seeds spread?"])
+        self.assertEqual(_texts(bank, qtype="mcq"), ["Which planet is largest?"])
+        # Only the edited subject gets a new version.
+        self.assertEqual(bank.partition_version("Grade 5", "Science"), result["version"])
+        self.assertEqual(bank.partition_version("Grade 5", "Maths"), self.version)
+        self.assertEqual(_texts(store.mapping()), ["Why do leaves fall in autumn?", "What do roots do?"])
+
+        refreshed, changed = before.refreshed(bank_delta.delta_path(self.path))
+        self.assertEqual(changed, {("Grade 5", "Science", "short")})
+        self.assertEqual(_texts(refreshed), _texts(bank))
+        self.assertEqual(refreshed.version, bank.version)
+        self.assertEqual(refreshed.refreshed(bank_delta.delta_path(self.path)), (refreshed, set()))
+
+    def test_invalid_edits_are_not_applied(self):
+        with self.assertRaises(ValueError) as raised:
+            bank_delta.append_edits(self.path, [
+                _edit("add", question="How do seeds spread?", answer="By wind."),
+                _edit("retire", question="Not in the bank"),
+                _edit("add", question="Why do leaves fall in autumn?", answer="Again."),
+                ["not", "an", "edit"],
+            ])
+        self.assertEqual(str(raised.exception).count("row "), 3)
+        _, bank = self._open()
+        self.assertEqual(bank.version, self.version)
+        self.assertEqual(_texts(bank), ["Why do leaves fall in autumn?", "What do roots do?"])
+
+    def test_apply_cli_reports_bad_lines(self):
+        edits = os.path.join(os.path.dirname(self.path), "edits.jsonl")
+        with open(edits, "w", encoding="utf-8") as f:
+            f.write(json.dumps(_edit("retire", question="What do roots do?")) + "\n\n{not json\n[1]\n")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(bank_delta.main([self.path, "apply", edits]), 1)
+        self.assertIn(f"{edits}:3: invalid JSON", stderr.getvalue())
+        self.assertIn(f"{edits}:4: expected a JSON object, got list", stderr.getvalue())
+        _, bank = self._open()
+        self.assertEqual(bank.version, self.version)
+
+        with open(edits, "w", encoding="utf-8") as f:
+            f.write(json.dumps(_edit("retire", question="What do roots do?")) + "\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(bank_delta.main([self.path, "apply", edits]), 0)
+        _, bank = self._open()
+        self.assertEqual(_texts(bank), ["Why do leaves fall in autumn?"])
+
+    def test_compact(self):
+        version = self._append_sample_edits()["version"]
+        _, edited = self._open()
+        expected = {qtype: _texts(edited, qtype=qtype) for qtype in ("short", "mcq")}
+
+        result = bank_delta.compact(self.path)
+        self.assertEqual((result["version"], result["edited_partitions"]), (version, 1))
+
+        store, bank = self._open()
+        self.assertEqual(store.version, version)
+        self.assertEqual(bank.edits, 0)
+        self.assertEqual({qtype: _texts(store.mapping(), qtype=qtype) for qtype in expected}, expected)
+        self.assertEqual(store.partition_versions(), {"Grade 5": {"Maths": self.version}})
+        self.assertEqual(bank.partition_version("Grade 5", "Science"), version)
+        self.assertEqual(bank.partition_version("Grade 5", "Maths"), self.version)
+        duplicates = near_duplicates.NearDuplicateIndex.load(near_duplicates.sidecar_path(self.path))
+        self.assertEqual(duplicates.bank_version, version)
+        searcher = search_index.SearchIndex.load(search_index.sidecar_path(self.path))
+        self.assertEqual(searcher.bank_version, version)
+        self.assertEqual(len(searcher.search("seeds")), 1)
+        self.assertEqual(searcher.search("roots"), [])
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))),
+                         ["bank.qpb", "bank.qpb.delta", "bank.qpb.dups", "bank.qpb.search"])
+
+        # The old log was replaced, so a reader of the old bank has to reopen it.
+        with self.assertRaises(bank_delta.StaleDeltaError):
+            edited.refreshed(bank_delta.delta_path(self.path))
+        self.assertEqual(bank_delta.compact(self.path)["edited_partitions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Tests for the bank file format: BankWriter/BankStore round-trips, and
+rewriting a bank and its indexes while another reader has them mapped.
+
+    python -m unittest test_bank_store
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import bank_store
+import near_duplicates
+import search_index
+from bank_store import BankStore, BankWriter, bank_version, read_header, write_bank
+from records import Question
+
+BANK = {
+    "Grade 5": {
+        "Science": {
+            "mcq": [
+                Question("Which planet is largest?", ("A) Mars", "B) Jupiter", "C) Venus", "D) Earth"), "B"),
+                Question("Which gas do plants absorb?", ("A) Oxygen", "B) Carbon dioxide"), "B", ("topic:plants",)),
+            ],
+            "short": [
+                Question("Why do leaves fall in autumn?", answer="To save water in winter.", tags=("marks:2",)),
+                Question("Why do leaves fall in the autumn?", answer="To save water."),
+            ],
+        },
+        "Maths": {"long": [Question("Prove that the angles of a triangle add up to 180 degrees.")]},
+    },
+    "Grade 6": {"Hindi": {"short": [Question("भारत की राजधानी क्या है?", answer="नई दिल्ली")]}},
+}
+
+OTHER_BANK = {"Grade 1": {"Art": {"short": [Question("Name a primary colour.", answer="Red")]}}}
+
+
+def _as_dicts(bank):
+    return {
+        grade: {
+            subject: {qtype: [q.to_dict() for q in questions] for qtype, questions in types.items()}
+            for subject, types in subjects.items()
+        }
+        for grade, subjects in bank.items()
+    }
+
+
+class BankStoreRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "bank.qpb")
+
+    def test_round_trip(self):
+        header = write_bank(BANK, self.path)
+        self.assertEqual(header["count"], 6)
+        self.assertEqual(header["version"], bank_version(BANK))
+        self.assertEqual(read_header(self.path)["version"], header["version"])
+
+        store = BankStore.open(self.path)
+        self.addCleanup(store.close)
+        self.assertEqual(store.version, header["version"])
+        self.assertEqual(store.grades(), ["Grade 5", "Grade 6"])
+        self.assertEqual(store.type_counts("Grade 5", "Science"), {"mcq": 2, "short": 2})
+        self.assertEqual(store.tag_counts("Grade 5", "Science", "mcq"), {"topic:plants": 1})
+        self.assertEqual(_as_dicts(store.mapping()), _as_dicts(BANK))
+        self.assertEqual(store.questions("Grade 5", "Maths", "short"), [])
+
+    def test_partition_versions(self):
+        with BankWriter(self.path, "ab" * 8, {"Grade 6": {"Hindi": "cd" * 8}}) as writer:
+            for grade, subjects in BANK.items():
+                for subject, types in subjects.items():
+                    for qtype, questions in types.items():
+                        for question in questions:
+                            writer.add(grade, subject, qtype, question)
+        store = BankStore.open(self.path)
+        self.addCleanup(store.close)
+        self.assertEqual(store.version, "ab" * 8)
+        self.assertEqual(store.partition_versions(), {"Grade 6": {"Hindi": "cd" * 8}})
+
+    def test_decoded_partitions_are_bounded(self):
+        write_bank(BANK, self.path)
+        store = BankStore(self.path, max_decoded=2)
+        self.addCleanup(store.close)
+        for _ in range(2):
+            self.assertEqual(_as_dicts(store.mapping()), _as_dicts(BANK))
+
+    def test_shared_strings_are_bounded(self):
+        bank = {
+            "Grade 1": {
+                f"Subject {s}": {
+                    "mcq": [
+                        Question(f"Q{s}.{i}?", [f"A) {s}.{i}.{o}" for o in range(4)], "A", [f"topic:{s}.{i}"])
+                        for i in range(50)
+                    ]
+                }
+                for s in range(10)
+            }
+        }
+        write_bank(bank, self.path)
+        store = BankStore(self.path, max_decoded=50)
+        self.addCleanup(store.close)
+        with mock.patch.object(bank_store, "SHARED_STRINGS_CACHE", 300):
+            for _ in range(2):
+                self.assertEqual(_as_dicts(store.mapping()), _as_dicts(bank))
+                self.assertLessEqual(len(store._shared_strings), 300)
+                self.assertLessEqual(store._decoded_count, 50)
+
+    def test_failed_write_keeps_the_old_file(self):
+        write_bank(BANK, self.path)
+        with self.assertRaises(RuntimeError):
+            with BankWriter(self.path) as writer:
+                writer.add("Grade 1", "Art", "short", OTHER_BANK["Grade 1"]["Art"]["short"][0])
+                raise RuntimeError("interrupted")
+        self.assertEqual(read_header(self.path)["version"], bank_version(BANK))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["bank.qpb"])
+
+
+class LiveReaderTest(unittest.TestCase):
+    """
+    Rewriting a bank file or index must not change what a process that has
+    the old file mapped reads (truncating it in place made such readers
+    fault with SIGBUS).
+    """
+
+    def test_rewrite_while_mapped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bank.qpb")
+            version = write_bank(BANK, path)["version"]
+            near_duplicates.build_index(BANK, version, threshold=0.5).save(near_duplicates.sidecar_path(path))
+            search_index.build_index(BANK, version).save(search_index.sidecar_path(path))
+
+            store = BankStore.open(path)
+            self.addCleanup(store.close)
+            duplicates = near_duplicates.NearDuplicateIndex.load(near_duplicates.sidecar_path(path))
+            searcher = search_index.SearchIndex.load(search_index.sidecar_path(path))
+            groups = duplicates.groups()
+            self.assertEqual(len(groups), 1)
+            hits = searcher.search("leaves autumn")
+            self.assertEqual(len(hits), 2)
+
+            # Smaller files, so reading past their end would fault.
+            other = write_bank(OTHER_BANK, path)["version"]
+            near_duplicates.build_index(OTHER_BANK, other).save(near_duplicates.sidecar_path(path))
+            search_index.build_index(OTHER_BANK, other).save(search_index.sidecar_path(path))
+
+            self.assertEqual(_as_dicts(store.mapping()), _as_dicts(BANK))
+            self.assertEqual(duplicates.groups(), groups)
+            self.assertEqual(searcher.search("leaves autumn"), hits)
+            self.assertEqual(read_header(path)["version"], other)
+            self.assertEqual(sorted(os.listdir(tmp)), ["bank.qpb", "bank.qpb.dups", "bank.qpb.search"])
+
+
+if __name__ == "__main__":
+    unittest.main()
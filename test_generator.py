@@ -0,0 +1,223 @@
+"""
+Tests for paper IDs (encoding round-trips and re-deriving the same paper)
+and for the blueprint solver, checked against a brute-force search.
+
+    python -m unittest test_generator
+"""
+import itertools
+import random
+import unittest
+from collections import Counter
+
+from generator import (
+    DEFAULT_MARKS,
+    Blueprint,
+    BlueprintInfeasible,
+    PaperSpec,
+    _check_blueprint,
+    _PoolIndex,
+    _repair_marks,
+    _Selection,
+    _solve_blueprint,
+    decode_paper_id,
+    encode_paper_id,
+    generate_from_spec,
+    generate_question_paper,
+    make_paper_spec,
+    regenerate_question_paper,
+)
+from question_bank import QUESTION_BANK, get_partition_version
+from records import Question, question_key
+
+
+def _first_subject():
+    grade = next(iter(QUESTION_BANK))
+    return grade, next(iter(QUESTION_BANK[grade]))
+
+
+class PaperIdTest(unittest.TestCase):
+    def test_round_trip(self):
+        for spec in (
+            PaperSpec("0123456789abcdef", "Grade 5", "Science", 10, 5, 2, 0),
+            PaperSpec("ffffffffffffffff", "कक्षा 6", "Hindi – Grammar", 0, 0, 1, (1 << 64) - 1),
+        ):
+            paper_id = encode_paper_id(spec)
+            self.assertRegex(paper_id, r"^[A-Za-z0-9_-]+$")
+            self.assertEqual(decode_paper_id(paper_id), spec)
+
+    def test_invalid_ids(self):
+        for paper_id in ("", "not a paper id", encode_paper_id(PaperSpec("00" * 8, "G", "S", 1, 1, 1, 1))[:8]):
+            with self.assertRaises(ValueError):
+                decode_paper_id(paper_id)
+        for spec in (
+            PaperSpec("00" * 8, "G", "S", 1, 1, 1, 1 << 64),
+            PaperSpec("00" * 8, "G", "S", 1 << 16, 1, 1, 1),
+            PaperSpec("00" * 8, "G", "S", 1, -1, 1, 1),
+        ):
+            with self.assertRaises(ValueError):
+                encode_paper_id(spec)
+
+    def test_reproducible(self):
+        grade, subject = _first_subject()
+        spec = make_paper_spec(grade, subject, 2, 1, 1, seed=42)
+        self.assertEqual(spec.bank_version, get_partition_version(grade, subject))
+
+        paper = generate_from_spec(spec)
+        self.assertEqual(decode_paper_id(paper.paper_id), spec)
+        self.assertEqual(paper, generate_question_paper(grade, subject, 2, 1, 1, seed=42))
+        again = regenerate_question_paper(paper.paper_id)
+        self.assertEqual(again.paper_id, paper.paper_id)
+        self.assertEqual(again.texts(), paper.texts())
+
+    def test_fresh_seeds(self):
+        grade, subject = _first_subject()
+        self.assertNotEqual(make_paper_spec(grade, subject, 2, 1, 1).seed, make_paper_spec(grade, subject, 2, 1, 1).seed)
+
+    def test_other_bank_version(self):
+        grade, subject = _first_subject()
+        spec = make_paper_spec(grade, subject, 2, 1, 1, seed=42)._replace(bank_version="00" * 8)
+        with self.assertRaises(ValueError):
+            generate_from_spec(spec)
+
+
+POOLS = {
+    "mcq": [
+        Question(f"MCQ {i}?", ("A) yes", "B) no"), "A", tags)
+        for i, tags in enumerate((
+            ("difficulty:easy", "topic:plants"),
+            ("difficulty:easy",),
+            ("difficulty:hard", "topic:plants", "marks:2"),
+            ("difficulty:hard",),
+            ("difficulty:easy", "marks:2"),
+            (),
+        ))
+    ],
+    "short": [
+        Question(f"Short {i}?", answer="A", tags=tags)
+        for i, tags in enumerate((
+            ("difficulty:easy", "topic:water"),
+            ("difficulty:hard", "marks:3"),
+            ("difficulty:easy", "marks:3", "topic:plants"),
+            ("difficulty:hard",),
+            ("difficulty:easy", "marks:4"),
+        ))
+    ],
+    "long": [
+        Question(f"Long {i}?", tags=tags)
+        for i, tags in enumerate((
+            ("difficulty:hard",),
+            ("difficulty:hard", "marks:6", "topic:water"),
+            ("marks:4",),
+        ))
+    ],
+}
+
+
+def _marks(qtype, question):
+    marks = [int(tag[6:]) for tag in question.tags if tag.startswith("marks:")]
+    return marks[0] if marks else DEFAULT_MARKS[qtype]
+
+
+def _satisfies(blueprint, selection):
+    """
+    Whether (mcqs, shorts, longs) meets every constraint of `blueprint`.
+    """
+    chosen = [(qtype, q) for qtype, questions in zip(POOLS, selection) for q in questions]
+    keys = [question_key(q) for _, q in chosen]
+    levels = Counter(
+        next((tag[11:] for tag in q.tags if tag.startswith("difficulty:")), "") for _, q in chosen
+    )
+    tags = Counter(tag for _, q in chosen for tag in q.tags)
+    return (
+        all(len(questions) == blueprint.counts.get(qtype, 0) for qtype, questions in zip(POOLS, selection))
+        and len(set(keys)) == len(keys)
+        and not any(key in blueprint.exclude for key in keys)
+        and all(levels[level] >= minimum for level, minimum in blueprint.difficulty.items())
+        and all(tags[tag] >= minimum for tag, minimum in blueprint.topics.items())
+        and blueprint.total_marks in (None, sum(_marks(qtype, q) for qtype, q in chosen))
+    )
+
+
+def _brute_force(blueprint):
+    """
+    Whether any selection from POOLS satisfies `blueprint`, by trying them all.
+    """
+    return set(blueprint.counts) <= set(POOLS) and any(
+        _satisfies(blueprint, selection)
+        for selection in itertools.product(*(
+            itertools.combinations(pool, blueprint.counts.get(qtype, 0)) for qtype, pool in POOLS.items()
+        ))
+    )
+
+
+class BlueprintTest(unittest.TestCase):
+    def setUp(self):
+        self.index = _PoolIndex(POOLS)
+
+    def _blueprint(self, mcq=0, short=0, long=0, **constraints):
+        return Blueprint({"mcq": mcq, "short": short, "long": long}, **constraints)
+
+    def test_solver_agrees_with_brute_force(self):
+        excluded = frozenset(question_key(POOLS[qtype][pos]) for qtype, pos in (("mcq", 0), ("short", 2)))
+        for blueprint, feasible in (
+            (self._blueprint(3, 2, 1), True),
+            (self._blueprint(3, 2, 1, total_marks=16), True),
+            (self._blueprint(3, 2, 1, total_marks=13, difficulty={"hard": 3}, topics={"topic:plants": 2}), True),
+            (self._blueprint(2, 1, topics={"topic:plants": 1}, exclude=excluded), True),
+            (self._blueprint(2, 2, 1, difficulty={"easy": 3, "hard": 2}, topics={"topic:water": 2}), True),
+            (self._blueprint(6, 5, 3, total_marks=37), True),
+            # Excluded questions of other types do not count against the minimums.
+            (self._blueprint(2, difficulty={"hard": 2}, topics={"topic:plants": 1}, exclude=excluded), True),
+            # Pass the up-front checks, but no combination works.
+            (self._blueprint(1, difficulty={"hard": 1}, topics={"topic:plants": 1}, total_marks=1), False),
+            (self._blueprint(1, 1, topics={"topic:plants": 2}, total_marks=3), False),
+            (self._blueprint(short=2, difficulty={"hard": 2}, total_marks=4), False),
+            (self._blueprint(long=2, topics={"topic:water": 1}, difficulty={"": 1}, total_marks=9), False),
+        ):
+            with self.subTest(blueprint=blueprint):
+                self.assertEqual(_brute_force(blueprint), feasible)
+                for seed in range(10):
+                    if feasible:
+                        selection = _solve_blueprint(self.index, blueprint, random.Random(seed), 50)
+                        self.assertTrue(_satisfies(blueprint, selection))
+                    else:
+                        with self.assertRaisesRegex(BlueprintInfeasible, "no selection found after 5 attempts"):
+                            _solve_blueprint(self.index, blueprint, random.Random(seed), 5)
+
+    def test_rejected_up_front(self):
+        for blueprint, reason in (
+            (self._blueprint(7), "7 mcq questions requested, 6 available"),
+            (Blueprint({"essay": 1}), "unknown question type 'essay'"),
+            (self._blueprint(2, difficulty={"easy": 2, "hard": 1}), "difficulty minimums exceed the number of questions"),
+            (self._blueprint(3, difficulty={"hard": 3}), "3 'hard' questions required, 2 available"),
+            (self._blueprint(3, topics={"topic:water": 1}), "1 'topic:water' questions required, 0 available"),
+            (self._blueprint(2, 1, total_marks=9), "total marks 9 outside the achievable range 4-8"),
+            (
+                self._blueprint(1, topics={"topic:plants": 2}, exclude={question_key(POOLS["mcq"][2])}),
+                "2 'topic:plants' questions required, 1 available",
+            ),
+        ):
+            with self.subTest(reason=reason):
+                self.assertFalse(_brute_force(blueprint))
+                with self.assertRaises(BlueprintInfeasible) as raised:
+                    _check_blueprint(self.index, blueprint)
+                self.assertIn(reason, raised.exception.reasons)
+
+    def test_repair_marks_keeps_topics(self):
+        blueprint = self._blueprint(2, 1, total_marks=6, topics={"topic:water": 1})
+        for seed in range(10):
+            selection = _Selection(self.index, blueprint)
+            for qtype, pos in (("mcq", 1), ("mcq", 3), ("short", 0)):
+                selection.take(qtype, pos)
+            self.assertEqual(selection.marks, 4)
+            _repair_marks(selection, random.Random(seed), max_steps=200)
+            # Only swaps within a type and difficulty, and short 0 is the
+            # only short about water: both MCQs must move to 2 marks.
+            self.assertEqual(selection.marks, 6)
+            self.assertEqual(sorted(selection.chosen["mcq"]), [2, 4])
+            self.assertEqual(selection.chosen["short"], [0])
+            self.assertEqual(selection.unmet(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Tests for the bulk importer: row validation, CSV and JSONL parsing, and
+the statistics and error report of import_questions.
+
+    python -m unittest test_importer
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from bank_store import BankStore
+from question_bank import QUESTION_BANK, ImportErrorRow, import_questions, validate_question_row
+
+
+def _row(**fields):
+    return dict({"grade": "Grade 5", "subject": "Science", "type": "short", "question": "Q?", "answer": "A"}, **fields)
+
+
+class ValidateRowTest(unittest.TestCase):
+    def test_mcq(self):
+        grade, subject, qtype, question = validate_question_row(_row(
+            type="MCQ", question="  Largest planet?  ", options=["Mars", "B) Jupiter", " Venus "], answer="b)",
+        ))
+        self.assertEqual((grade, subject, qtype), ("Grade 5", "Science", "mcq"))
+        self.assertEqual(question["question"], "Largest planet?")
+        self.assertEqual(question["options"], ("A) Mars", "B) Jupiter", "C) Venus"))
+        self.assertEqual(question["answer"], "B")
+
+    def test_attributes_become_tags(self):
+        question = validate_question_row(_row(tags=["lab"], difficulty="easy", topic="plants", marks=3))[3]
+        self.assertEqual(question["tags"], ("lab", "difficulty:easy", "topic:plants", "marks:3"))
+        self.assertEqual(validate_question_row(_row(marks="", topic=None))[3].tags, ())
+
+    def test_invalid_rows(self):
+        for row, message in (
+            (_row(type="essay"), "type must be one of"),
+            (_row(grade=""), "grade and subject are required"),
+            (_row(question="   "), "question text is empty"),
+            (_row(answer=""), "answer is empty"),
+            (_row(question=5), "question must be a string"),
+            (_row(grade=10), "grade must be a string"),
+            (_row(options=["x", "y"]), "short questions must not have options"),
+            (_row(type="mcq", options=["x"], answer="A"), "mcq needs 2 to 8 options"),
+            (_row(type="mcq", options=["x", "", "z"], answer="C"), "option B is empty"),
+            (_row(type="mcq", options=["x", "y"], answer="C"), "answer must be one of the option letters"),
+            (_row(tags="lab"), "tags must be a list"),
+            (_row(marks=0), "marks must be a positive integer"),
+            (_row(marks="-2"), "marks must be a positive integer"),
+            ({"__error__": "invalid JSON: Expecting value"}, "invalid JSON"),
+        ):
+            with self.assertRaisesRegex(ImportErrorRow, message):
+                validate_question_row(row)
+
+
+class ImportQuestionsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.output = os.path.join(tmp.name, "bank.qpb")
+
+    def _file(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def _questions(self, path=None):
+        store = BankStore.open(path or self.output)
+        self.addCleanup(store.close)
+        return {
+            (grade, subject, qtype): [question.to_dict() for question in questions]
+            for grade, subjects in store.mapping().items()
+            for subject, types in subjects.items()
+            for qtype, questions in types.items()
+        }
+
+    def test_csv_and_jsonl_agree(self):
+        csv_path = self._file("questions.csv", (
+            "grade,subject,type,question,answer,options,option_a,option_b,option_c,tags,marks\n"
+            "Grade 5,Science,mcq,Largest planet?,B,Mars|Jupiter,,,,space|planets,\n"
+            "Grade 5,Science,mcq,Smallest planet?,a,,Mercury,Mars,,,\n"
+            "Grade 5,Science,short,Why is the sky blue?,Scattering.,,,,,,2\n"
+        ))
+        jsonl_path = self._file("questions.jsonl", "\n".join(json.dumps(row) for row in (
+            _row(type="mcq", question="Largest planet?", answer="B", options=["Mars", "Jupiter"],
+                 tags=["space", "planets"]),
+            _row(type="mcq", question="Smallest planet?", answer="a", options=["Mercury", "Mars"]),
+            _row(question="Why is the sky blue?", answer="Scattering.", marks=2),
+        )) + "\n\n")
+
+        stats = import_questions([csv_path], self.output, near_duplicates=False, search=False)
+        self.assertEqual((stats["rows"], stats["imported"], stats["invalid"]), (3, 3, 0))
+        from_csv = self._questions()
+        import_questions([jsonl_path], self.output, near_duplicates=False, search=False)
+        self.assertEqual(self._questions(), from_csv)
+        self.assertEqual(from_csv[("Grade 5", "Science", "mcq")][1]["options"], ["A) Mercury", "B) Mars"])
+        self.assertEqual(from_csv[("Grade 5", "Science", "short")][0]["tags"], ["marks:2"])
+
+    def test_option_gap_is_rejected(self):
+        path = self._file("gap.csv", (
+            "grade,subject,type,question,answer,option_a,option_b,option_c,option_d\n"
+            "Grade 5,Science,mcq,Which is a gas?,C,Iron,,Oxygen,\n"
+            "Grade 5,Science,mcq,Which is a metal?,A,Iron,Water,,\n"
+        ))
+        stats = import_questions([path], self.output, near_duplicates=False, search=False)
+        self.assertEqual((stats["imported"], stats["invalid"]), (1, 1))
+        self.assertEqual(stats["errors"], [f"{path}:2: option B is empty"])
+
+    def test_duplicates_and_error_report(self):
+        path = self._file("questions.jsonl", "\n".join((
+            json.dumps(_row(question="Why do leaves fall?")),
+            json.dumps(_row(question="  why do LEAVES   fall?")),
+            json.dumps(_row(question="Why do leaves fall?", subject="Biology")),
+            "{not json",
+            "[1, 2]",
+            json.dumps(_row(marks=0)),
+        )) + "\n")
+        stats = import_questions([path], self.output, max_errors_reported=2, near_duplicates=False, search=False)
+        self.assertEqual(
+            (stats["rows"], stats["imported"], stats["duplicates"], stats["invalid"], stats["existing"]),
+            (6, 2, 1, 3, 0),
+        )
+        self.assertEqual(len(stats["errors"]), 2)
+        self.assertTrue(stats["errors"][0].startswith(f"{path}:4: invalid JSON"))
+        self.assertEqual(stats["errors"][1], f"{path}:5: expected a JSON object, got list")
+
+        with self.assertRaisesRegex(ImportErrorRow, f"{path}:4: invalid JSON"):
+            import_questions([path], os.path.join(self.dir, "strict.qpb"), strict=True)
+        self.assertEqual(sorted(os.listdir(self.dir)), ["bank.qpb", "questions.jsonl"])
+
+    def test_include_existing(self):
+        existing = sum(
+            len(questions) for subjects in QUESTION_BANK.values() for types in subjects.values()
+            for questions in types.values()
+        )
+        path = self._file("questions.jsonl", json.dumps(_row(grade="Grade 99")) + "\n")
+        stats = import_questions([path], self.output, include_existing=True, near_duplicates=False, search=False)
+        self.assertEqual((stats["rows"], stats["imported"], stats["existing"]), (1, 1, existing))
+        self.assertEqual(sum(len(questions) for questions in self._questions().values()), existing + 1)
+
+    def test_writes_indexes(self):
+        path = self._file("questions.jsonl", "\n".join(json.dumps(_row(question=text)) for text in (
+            "Why do leaves fall in autumn?", "Why do the leaves fall in autumn?", "What do roots do?",
+        )) + "\n")
+        stats = import_questions([path], self.output)
+        self.assertEqual(stats["imported"], 3)
+        self.assertIn("near_duplicate_groups", stats)
+        self.assertGreater(stats["search_terms"], 0)
+        self.assertEqual(sorted(os.listdir(self.dir)),
+                         ["bank.qpb", "bank.qpb.dups", "bank.qpb.search", "questions.jsonl"])
+
+
+if __name__ == "__main__":
+    unittest.main()
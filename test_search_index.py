@@ -0,0 +1,167 @@
+"""
+Tests for the search index: rankings, partition filters and tag queries
+against a brute-force BM25 scorer, for built, loaded and appended indexes.
+
+    python -m unittest test_search_index
+"""
+import math
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+
+import search_index
+from records import Question, question_key
+from search_index import B, K1, SearchIndex, SearchIndexBuilder, build_index, parse_query, tag_term, tokenize
+
+WORDS = "leaf leaves root water light seed stem flower planet orbit moon gas heat the of why".split()
+TAGS = ("topic:plants", "topic:space", "difficulty:easy", "difficulty:hard")
+QUERIES = (
+    "leaf",
+    "seeds",
+    "water light",
+    "why do leaves need light and water",
+    "moon orbit orbit planet gas heat",
+    "unknownword",
+    "the of why",
+    "topic:plants",
+    "#topic:space difficulty:hard",
+    "topic:plants water root",
+    "topic:space difficulty:easy moon",
+    "topic:missing water",
+)
+FILTERS = (
+    {},
+    {"grade": "Grade 5"},
+    {"subject": "Physics"},
+    {"qtype": "mcq"},
+    {"grade": "Grade 6", "subject": "Science", "qtype": "short"},
+    {"grade": "Grade 9"},
+)
+
+
+def _bank(rng, count):
+    bank = {}
+    for i in range(count):
+        grade = rng.choice(("Grade 5", "Grade 6"))
+        subject = rng.choice(("Science", "Physics"))
+        qtype = rng.choice(("mcq", "short", "long"))
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        options = [f"{letter}) {rng.choice(WORDS)}" for letter in "AB"] if qtype == "mcq" else ()
+        question = Question(f"Q{i} {text}?", options, rng.choice(WORDS), rng.sample(TAGS, rng.randint(0, 2)))
+        bank.setdefault(grade, {}).setdefault(subject, {}).setdefault(qtype, []).append(question)
+    return bank
+
+
+def _documents(bank):
+    return [
+        ((grade, subject, qtype), question)
+        for grade, subjects in bank.items()
+        for subject, types in subjects.items()
+        for qtype, questions in types.items()
+        for question in questions
+    ]
+
+
+def _brute_force(documents, query, grade=None, subject=None, qtype=None):
+    """
+    [((grade, subject, type), key, score)] of every match for `query`, in
+    document order, scoring each document from scratch.
+    """
+    words, tags = parse_query(query)
+    if not words and not tags:
+        return []
+    terms = [
+        Counter(tokenize(" ".join([q["question"], *q.get("options", ()), q.get("answer", "")])))
+        for _, q in documents
+    ]
+    average = sum(sum(tf.values()) for tf in terms) / len(documents)
+    frequency = Counter(term for tf in terms for term in tf)
+    results = []
+    for (partition, question), tf in zip(documents, terms):
+        if any(value is not None and value != actual for value, actual in zip((grade, subject, qtype), partition)):
+            continue
+        if not set(tags) <= {tag_term(tag) for tag in question.get("tags", ())}:
+            continue
+        if not words:
+            results.append((partition, question_key(question), 0.0))
+            continue
+        if not any(tf[word] for word in words):
+            continue
+        norm = K1 * (1 - B + B * sum(tf.values()) / average)
+        score = sum(
+            math.log(1 + (len(documents) - frequency[word] + 0.5) / (frequency[word] + 0.5))
+            * (K1 + 1) * tf[word] / (tf[word] + norm)
+            for word in words if tf[word]
+        )
+        results.append((partition, question_key(question), score))
+    return results
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.bank = _bank(random.Random(7), 300)
+        self.documents = _documents(self.bank)
+
+    def _assert_matches(self, index, documents, limits=(1, 3, 10, 1000)):
+        for query in QUERIES:
+            for filters in FILTERS:
+                expected = _brute_force(documents, query, **filters)
+                scores = {(partition, key): score for partition, key, score in expected}
+                for limit in limits:
+                    with self.subTest(query=query, filters=filters, limit=limit):
+                        hits = index.search(query, limit, **filters)
+                        found = [((hit.grade, hit.subject, hit.qtype), hit.key) for hit in hits]
+                        if not parse_query(query)[0]:
+                            # Tag-only queries list matches in bank order.
+                            self.assertEqual(found, [(partition, key) for partition, key, _ in expected][:limit])
+                            continue
+                        # Equal scores may come in any order, so compare the
+                        # score sequence and each hit's own score.
+                        best = sorted(scores.values(), reverse=True)[:limit]
+                        self.assertEqual(len(hits), len(best))
+                        self.assertEqual(len(set(found)), len(found))
+                        for hit, hit_id, score in zip(hits, found, best):
+                            self.assertAlmostEqual(hit.score, score, places=9)
+                            self.assertAlmostEqual(scores[hit_id], hit.score, places=9)
+
+    def test_matches_brute_force(self):
+        index = build_index(self.bank, "ab" * 8)
+        self.assertEqual(len(index), len(self.documents))
+        self._assert_matches(index, self.documents)
+
+    def test_loaded_index_and_leaders(self):
+        # Every term has leaders, so one-word queries take the leader path.
+        with mock.patch.multiple(search_index, _LEADER_MIN_DF=0, _LEADERS=3):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bank.qpb.search")
+                build_index(self.bank, "ab" * 8).save(path)
+                index = SearchIndex.load(path)
+                self.assertEqual(index.bank_version, "ab" * 8)
+                self._assert_matches(index, self.documents, limits=(1, 3, 1000))
+
+    def test_appended_index(self):
+        documents = self.documents[:200]
+        builder = SearchIndexBuilder()
+        for (grade, subject, qtype), question in documents:
+            builder.add(grade, subject, qtype, question)
+        base = builder.finish("ab" * 8)
+
+        builder = SearchIndexBuilder(base)
+        removed = documents[::7]
+        for (grade, subject, qtype), question in removed:
+            self.assertTrue(builder.remove(grade, subject, qtype, question))
+        added = self.documents[200:]
+        for (grade, subject, qtype), question in added:
+            self.assertTrue(builder.add(grade, subject, qtype, question))
+        index = builder.finish("cd" * 8)
+
+        live = [document for document in documents if document not in removed] + added
+        self.assertEqual(len(index), len(live))
+        self._assert_matches(index, live)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import streamlit as st
-from question_bank import QUESTION_BANK, get_subjects_for_grade, get_question_type_counts
+from question_bank import get_catalog, search_questions
 
 
 def render_header():
@@ -13,20 +13,15 @@ def render_header():
 def render_sidebar():
     st.sidebar.header("⚙️ Configuration")
 
-    # Grades: ensure sorted order Grade 1..Grade 12, then B.Tech
-    grade_keys = sorted(
-        [g for g in QUESTION_BANK.keys() if g.startswith("Grade")],
-        key=lambda x: int(x.split()[1]),
-    )
-    if "B.Tech" in QUESTION_BANK:
-        grade_keys.append("B.Tech")
-
-    grade = st.sidebar.selectbox("Select Grade / Level", grade_keys, index=0)
+    # Grades come from the precomputed catalog, already ordered
+    # Grade 1..Grade 12, then B.Tech
+    catalog = get_catalog()
+    grade = st.sidebar.selectbox("Select Grade / Level", catalog.grades, index=0)
 
-    subjects = get_subjects_for_grade(grade)
+    subjects = catalog.subjects(grade)
     subject = st.sidebar.selectbox("Select Subject", subjects, index=0)
 
-    counts = get_question_type_counts(grade, subject)
+    counts = catalog.type_counts(grade, subject)
     max_mcq = counts.get("mcq", 0)
     max_short = counts.get("short", 0)
     max_long = counts.get("long", 0)
@@ -63,3 +58,29 @@ def render_sidebar():
     )
 
     return grade, subject, num_mcq, num_short, num_long
+
+
+def render_search(grade, subject):
+    """
+    Keyword and tag search over the question bank, for curating papers.
+    """
+    with st.expander("🔎 Search Question Bank"):
+        query = st.text_input(
+            "Keywords and tags",
+            placeholder="e.g. normal form topic:normalization",
+        )
+        this_subject = st.checkbox(f"Only {grade} - {subject}", value=True)
+        if not query.strip():
+            return
+
+        results = search_questions(
+            query,
+            limit=20,
+            grade=grade if this_subject else None,
+            subject=subject if this_subject else None,
+        )
+        if not results:
+            st.info("No matching questions.")
+        for hit, question in results:
+            st.caption(f"{hit.grade} / {hit.subject} / {hit.qtype.upper()}")
+            st.text(question["question"])
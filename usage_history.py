@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from records import question_key
+
+
+# Local record of which questions each generated paper used, so selection
+# can favour questions that have not been asked recently. Stored in SQLite:
+#
+#   papers(id, paper_id, grade, subject, used_at)
+#   usage(paper, grade, subject, question_key, used_at)
+#
+# question_key is records.question_key (unsigned 64-bit), stored as SQLite's
+# signed 64-bit INTEGER. used_at is a Unix timestamp.
+#
+# The app records every generated paper in the history file named by
+# QP_HISTORY_PATH, if set.
+HISTORY_PATH_ENV = "QP_HISTORY_PATH"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    paper_id TEXT NOT NULL DEFAULT '',
+    grade TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    paper INTEGER NOT NULL REFERENCES papers(id),
+    grade TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    question_key INTEGER NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usage_by_subject ON usage (grade, subject, question_key, used_at);
+"""
+
+_SIGN_BIT = 1 << 63
+
+
+def _to_signed(key: int) -> int:
+    return key - (1 << 64) if key >= _SIGN_BIT else key
+
+
+def _to_unsigned(key: int) -> int:
+    return key + (1 << 64) if key < 0 else key
+
+
+class UsageHistory:
+    """
+    SQLite-backed usage history. Safe to share between threads (e.g.
+    Streamlit sessions); separate processes may open the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def open(cls, path: str) -> "UsageHistory":
+        return cls(path)
+
+    def record_paper(
+        self,
+        grade: str,
+        subject: str,
+        questions: Iterable,
+        paper_id: str = "",
+        used_at: Optional[float] = None,
+    ) -> int:
+        """
+        Record that a paper used `questions`; returns the new revision.
+        """
+        used_at = time.time() if used_at is None else used_at
+        keys = {_to_signed(question_key(question)) for question in questions}
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO papers (paper_id, grade, subject, used_at) VALUES (?, ?, ?, ?)",
+                (paper_id, grade, subject, used_at),
+            )
+            paper = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO usage (paper, grade, subject, question_key, used_at) VALUES (?, ?, ?, ?, ?)",
+                [(paper, grade, subject, key, used_at) for key in keys],
+            )
+        return paper
+
+    def revision(self) -> int:
+        """
+        Increases with every recorded paper (in any process).
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM papers").fetchone()
+        return row[0]
+
+    def last_used(self, grade: str, subject: str) -> Dict[int, float]:
+        """
+        Question key -> time it was last used, for one grade/subject.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question_key, MAX(used_at) FROM usage WHERE grade = ? AND subject = ? "
+                "GROUP BY question_key",
+                (grade, subject),
+            ).fetchall()
+        return {_to_unsigned(key): used_at for key, used_at in rows}
+
+    @classmethod
+    def from_env(cls) -> Optional["UsageHistory"]:
+        path = os.environ.get(HISTORY_PATH_ENV)
+        return cls(path) if path else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "UsageHistory":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
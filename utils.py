@@ -1,118 +1,721 @@
-from typing import List, Dict, Optional
-import textwrap
+from array import array
+from typing import BinaryIO, List, Dict, Iterable, Iterator, Optional, Tuple, Union
+import functools
+import io
+import zlib
+
+from records import Question
 
 
 # ---------- TEXT FORMATTING FOR QP & ANSWER KEY ----------
 
-def format_question_paper_text(
+_SECTIONS = (
+    "Section A: Multiple Choice Questions",
+    "Section B: Short Answer Questions",
+    "Section C: Long Answer Questions",
+)
+
+
+class QuestionFragment:
+    """
+    A question pre-rendered for papers, so assembling a paper is numbering
+    plus concatenation:
+
+    - text: the question (`question`), its options as indented lines
+      (`options`) and the answer (`answer`);
+    - PDF: the same, wrapped to the page width with content-stream
+      escaping applied (pdf_lines / pdf_options).
+
+    The first line of a numbered question wraps the same way for every
+    number with the same count of digits (digits are equally wide in
+    Helvetica), so PDF layouts are kept per digit count.
+    """
+
+    __slots__ = ("question", "options", "answer", "_options_lines", "_layouts")
+
+    def __init__(self, question: str, options: Iterable[str], answer: str):
+        self.question = f"{question}"
+        self.options = "".join([f"   {opt}\n" for opt in options])
+        self.answer = f"{answer}"
+        self._options_lines: Optional[Tuple[str, ...]] = None
+        self._layouts: Dict[Tuple[bool, int], Tuple[str, Tuple[str, ...]]] = {}
+
+    def pdf_lines(self, answer: bool, digits: int) -> Tuple[str, Tuple[str, ...]]:
+        """
+        Escaped layout of "N. <question>" (or "N. <answer>") for a number N
+        with `digits` digits: the first line without its "N." and the
+        following lines.
+        """
+        layout = self._layouts.get((answer, digits))
+        if layout is None:
+            placeholder = "0" * digits
+            first, *rest = f"{self.answer if answer else self.question}\n".splitlines()
+            lines = _wrap_line_to_width(f"{placeholder}. {first}")
+            following = [_escape_pdf_text(line) for line in lines[1:]]
+            following += [_escape_pdf_text(line) for line in _iter_layout_lines(rest)]
+            layout = self._layouts[(answer, digits)] = (
+                _escape_pdf_text(lines[0][digits + 1:]), tuple(following)
+            )
+        return layout
+
+    def pdf_options(self) -> Tuple[str, ...]:
+        if self._options_lines is None:
+            self._options_lines = tuple(
+                _escape_pdf_text(line) for line in _iter_layout_lines(self.options.splitlines())
+            )
+        return self._options_lines
+
+
+def _render_fragment(q) -> QuestionFragment:
+    return QuestionFragment(q["question"], q.get("options", []), q.get("answer", ""))
+
+
+def question_fragment(q) -> QuestionFragment:
+    """
+    The pre-rendered fragment of a question. Question records keep theirs
+    (see Question.fragment); plain question dicts are rendered each time.
+    """
+    if type(q) is Question:
+        return q.fragment(_render_fragment)
+    return _render_fragment(q)
+
+
+def render_paper(
     grade: str,
     subject: str,
     mcqs: List[Dict],
     shorts: List[Dict],
     longs: List[Dict],
-) -> str:
-    lines = []
-    lines.append(f"{grade} - {subject}")
-    lines.append("Question Paper")
-    lines.append("-" * 60)
-    lines.append("")
+    question_paper=None,
+    answer_key=None,
+    set_label: Optional[str] = None,
+) -> None:
+    """
+    Render the question paper and the answer key in one pass over the
+    selected questions. Each output is written to its own target, anything
+    with a write(str) method (io.StringIO, a text file, ...), with a single
+    write per paper; pass None to skip an output.
+    """
+    suffix = f" - {set_label}" if set_label else ""
+    rule = "-" * 60
+    qp: Optional[List[str]] = None
+    ak: Optional[List[str]] = None
+    if question_paper is not None:
+        qp = [f"{grade} - {subject}\nQuestion Paper{suffix}\n{rule}\n\n"]
+    if answer_key is not None:
+        ak = [f"{grade} - {subject}\nAnswer Key{suffix}\n{rule}\n\n"]
 
     q_num = 1
-
     if mcqs:
-        lines.append("Section A: Multiple Choice Questions")
-        lines.append("")
+        if qp is not None:
+            qp.append(f"{_SECTIONS[0]}\n\n")
+        if ak is not None:
+            ak.append(f"{_SECTIONS[0]}\n\n")
         for q in mcqs:
-            lines.append(f"{q_num}. {q['question']}")
-            for opt in q.get("options", []):
-                lines.append(f"   {opt}")
-            lines.append("")
-            q_num += 1
-
-    if shorts:
-        lines.append("")
-        lines.append("Section B: Short Answer Questions")
-        lines.append("")
-        for q in shorts:
-            lines.append(f"{q_num}. {q['question']}")
-            lines.append("")
+            fragment = question_fragment(q)
+            if qp is not None:
+                qp.append(f"{q_num}. {fragment.question}\n{fragment.options}\n")
+            if ak is not None:
+                # MCQ answers are listed without blank lines between them.
+                ak.append(f"{q_num}. {fragment.answer}\n")
             q_num += 1
+        if ak is not None:
+            ak.append("\n")
 
-    if longs:
-        lines.append("")
-        lines.append("Section C: Long Answer Questions")
-        lines.append("")
-        for q in longs:
-            lines.append(f"{q_num}. {q['question']}")
-            lines.append("")
+    for heading, questions in ((_SECTIONS[1], shorts), (_SECTIONS[2], longs)):
+        if not questions:
+            continue
+        if qp is not None:
+            # The question paper leaves an extra blank line between sections.
+            qp.append(f"\n{heading}\n\n")
+        if ak is not None:
+            ak.append(f"{heading}\n\n")
+        for q in questions:
+            fragment = question_fragment(q)
+            if qp is not None:
+                qp.append(f"{q_num}. {fragment.question}\n\n")
+            if ak is not None:
+                ak.append(f"{q_num}. {fragment.answer}\n\n")
             q_num += 1
 
-    return "\n".join(lines).strip() + "\n"
+    if qp is not None:
+        question_paper.write("".join(qp).strip() + "\n")
+    if ak is not None:
+        answer_key.write("".join(ak).strip() + "\n")
 
 
-def format_answer_key_text(
+def format_paper_texts(
     grade: str,
     subject: str,
     mcqs: List[Dict],
     shorts: List[Dict],
     longs: List[Dict],
-) -> str:
-    lines = []
-    lines.append(f"{grade} - {subject}")
-    lines.append("Answer Key")
-    lines.append("-" * 60)
-    lines.append("")
+    set_label: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    (question paper text, answer key text), rendered in one pass.
+    """
+    question_paper = io.StringIO()
+    answer_key = io.StringIO()
+    render_paper(grade, subject, mcqs, shorts, longs, question_paper, answer_key, set_label)
+    return question_paper.getvalue(), answer_key.getvalue()
 
-    q_num = 1
 
-    if mcqs:
-        lines.append("Section A: Multiple Choice Questions")
-        lines.append("")
-        for q in mcqs:
-            ans = q.get("answer", "")
-            lines.append(f"{q_num}. {ans}")
-            q_num += 1
-        lines.append("")
-
-    if shorts:
-        lines.append("Section B: Short Answer Questions")
-        lines.append("")
-        for q in shorts:
-            ans = q.get("answer", "")
-            lines.append(f"{q_num}. {ans}")
-            lines.append("")
-            q_num += 1
+def format_question_paper_text(
+    grade: str,
+    subject: str,
+    mcqs: List[Dict],
+    shorts: List[Dict],
+    longs: List[Dict],
+    set_label: Optional[str] = None,
+) -> str:
+    out = io.StringIO()
+    render_paper(grade, subject, mcqs, shorts, longs, question_paper=out, set_label=set_label)
+    return out.getvalue()
 
-    if longs:
-        lines.append("Section C: Long Answer Questions")
-        lines.append("")
-        for q in longs:
-            ans = q.get("answer", "")
-            lines.append(f"{q_num}. {ans}")
-            lines.append("")
-            q_num += 1
 
-    return "\n".join(lines).strip() + "\n"
+def format_answer_key_text(
+    grade: str,
+    subject: str,
+    mcqs: List[Dict],
+    shorts: List[Dict],
+    longs: List[Dict],
+    set_label: Optional[str] = None,
+) -> str:
+    out = io.StringIO()
+    render_paper(grade, subject, mcqs, shorts, longs, answer_key=out, set_label=set_label)
+    return out.getvalue()
 
 
 # ---------- MINIMAL PDF GENERATOR (NO REPORTLAB) ----------
 
-def _wrap_text_to_lines(text: str, max_chars_per_line: int = 90) -> List[str]:
+# Basic A4 dimensions (points)
+_PAGE_WIDTH = 595
+_PAGE_HEIGHT = 842
+_MARGIN_LEFT = 50
+_MARGIN_TOP = 50
+_LINE_HEIGHT = 14
+_FONT_SIZE = 12
+
+# Compressed (PDF 1.5) output settings
+_COMPRESSION_LEVEL = 6
+_OBJECTS_PER_STREAM = 100
+_NOT_IN_OBJECT_STREAM = 0xFFFFFFFF
+
+
+# ---------- FONT-METRIC TEXT LAYOUT ----------
+
+# Helvetica advance widths (1/1000 em) for character codes 32-126 from the
+# standard Adobe AFM file, in the font's built-in StandardEncoding (which
+# is what a /Type1 font without /Encoding uses). Other codes use _DEFAULT_WIDTH.
+_HELVETICA_ASCII_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 222, 333, 333, 389, 584, 278, 333, 278, 278,  # space - /
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,  # 0 - ?
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,  # @ - O
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,  # P - _
+    222, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,  # ` - o
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,  # p - ~
+)
+_DEFAULT_WIDTH = 556
+
+# Width per byte of the Latin-1 encoded text, so a word's width is a sum
+# of table lookups.
+_CHAR_WIDTHS = tuple(
+    _HELVETICA_ASCII_WIDTHS[code - 32] if 32 <= code <= 126 else _DEFAULT_WIDTH
+    for code in range(256)
+)
+_SPACE_WIDTH = _CHAR_WIDTHS[ord(" ")]
+
+# Width available for text, in 1/1000 em of the body font
+_TEXT_WIDTH = (_PAGE_WIDTH - 2 * _MARGIN_LEFT) * 1000 // _FONT_SIZE
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _word_width(word: str) -> int:
+    return sum([_CHAR_WIDTHS[code] for code in _encode_pdf(word)])
+
+
+def _split_long_word(word: str, max_width: int) -> List[str]:
+    """
+    Break a word that is wider than a line into line-sized pieces.
+    """
+    pieces = []
+    current = ""
+    current_width = 0
+    for char in word:
+        char_width = _word_width(char)
+        if current and current_width + char_width > max_width:
+            pieces.append(current)
+            current = ""
+            current_width = 0
+        current += char
+        current_width += char_width
+    pieces.append(current)
+    return pieces
+
+
+def _wrap_line_to_width(line: str, max_width: int = _TEXT_WIDTH) -> List[str]:
+    """
+    Greedily break one line of text into lines no wider than `max_width`
+    (1/1000 em) in Helvetica. Leading indentation is kept on the first
+    line; runs of whitespace between words collapse to one space.
     """
-    Wrap text into lines by character count. This is a simple approximation
-    for PDF text layout without dealing with font metrics.
+    words = line.split()
+    if not words:
+        return [""]
+
+    prefix = line[:len(line) - len(line.lstrip())]
+    wrapped: List[str] = []
+    current: List[str] = []
+    current_width = _word_width(prefix)
+
+    for word in words:
+        word_width = _word_width(word)
+        if current and current_width + _SPACE_WIDTH + word_width > max_width:
+            wrapped.append(prefix + " ".join(current))
+            prefix, current, current_width = "", [], 0
+
+        if current_width + word_width > max_width and not current:
+            # Wider than a whole line: hard-break it.
+            *full_pieces, word = _split_long_word(word, max_width - current_width)
+            for piece in full_pieces:
+                wrapped.append(prefix + piece)
+                prefix, current_width = "", 0
+            word_width = _word_width(word)
+
+        if current:
+            current_width += _SPACE_WIDTH
+        current.append(word)
+        current_width += word_width
+
+    wrapped.append(prefix + " ".join(current))
+    return wrapped
+
+
+def _iter_layout_lines(lines: Iterable[str], max_width: int = _TEXT_WIDTH) -> Iterator[str]:
     """
-    all_lines: List[str] = []
-    for line in text.splitlines():
+    Lazily wrap lines to the page width using Helvetica metrics.
+    """
+    for line in lines:
         if not line:
-            all_lines.append("")
+            yield ""
             continue
-        wrapped = textwrap.wrap(line, width=max_chars_per_line) or [""]
-        all_lines.extend(wrapped)
-    return all_lines
+        yield from _wrap_line_to_width(line, max_width)
+
+
+def _iter_pages(lines: Iterable[str], max_lines_per_page: int) -> Iterator[List[str]]:
+    """
+    Group lines into pages, holding only the current page in memory.
+    Always yields at least one (possibly empty) page.
+    """
+    current_page: List[str] = []
+    emitted = False
+    for line in lines:
+        if len(current_page) >= max_lines_per_page:
+            yield current_page
+            emitted = True
+            current_page = []
+        current_page.append(line)
+    if current_page or not emitted:
+        yield current_page
+
+
+def _escape_pdf_text(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+            .replace("(", "\\(")
+            .replace(")", "\\)")
+    )
+
+
+def _encode_pdf(text: str) -> bytes:
+    # Helvetica only covers Latin-1; anything else becomes "?".
+    return text.encode("latin-1", errors="replace")
+
+
+class _PdfWriter:
+    """
+    Incremental PDF object writer.
+
+    Objects are written to the sink as soon as they are complete, and the
+    xref offsets are tracked from the number of bytes written, so only the
+    offset table (about 8 bytes per object) grows with the document.
+
+    With compress=True the output is PDF 1.5: streams are FlateDecode
+    compressed, non-stream objects are packed into compressed object
+    streams, and a compressed xref stream replaces the xref table.
+    """
+
+    def __init__(self, sink: BinaryIO, compress: bool = False):
+        self._sink = sink
+        self._compress = compress
+        self._position = 0
+        # Per object: byte offset, or for objects packed in an object stream
+        # the object stream's number and the index inside it.
+        self._offsets = array("Q", [0])  # index 0 unused but needed for xref
+        self._stream_index = array("I", [_NOT_IN_OBJECT_STREAM])
+        self._pending: List[Tuple[int, bytes]] = []
+
+        if compress:
+            self._write(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+        else:
+            self._write(b"%PDF-1.4\n")
+
+    def _write(self, data: bytes) -> None:
+        self._sink.write(data)
+        self._position += len(data)
+
+    def reserve(self) -> int:
+        """
+        Allocate the next object number; the object can be written later.
+        """
+        self._offsets.append(0)
+        self._stream_index.append(_NOT_IN_OBJECT_STREAM)
+        return len(self._offsets) - 1
+
+    def write_object(self, obj_id: int, body: str) -> None:
+        if self._compress:
+            self._pending.append((obj_id, _encode_pdf(body)))
+            if len(self._pending) >= _OBJECTS_PER_STREAM:
+                self._flush_object_stream()
+            return
+
+        self._offsets[obj_id] = self._position
+        self._write(f"{obj_id} 0 obj\n".encode("latin-1"))
+        self._write(_encode_pdf(body))
+        self._write(b"\nendobj\n")
+
+    def write_stream(self, obj_id: int, data: bytes, entries: str = "") -> None:
+        if self._compress:
+            data = zlib.compress(data, _COMPRESSION_LEVEL)
+            entries = f"/Filter /FlateDecode {entries}"
+        self._offsets[obj_id] = self._position
+        self._write(f"{obj_id} 0 obj\n<< {entries}/Length {len(data)} >>\nstream\n".encode("latin-1"))
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+
+    def _flush_object_stream(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        stream_id = self.reserve()
+        index_parts = []
+        body_parts = []
+        body_size = 0
+        for index, (obj_id, body) in enumerate(pending):
+            self._offsets[obj_id] = stream_id
+            self._stream_index[obj_id] = index
+            index_parts.append(f"{obj_id} {body_size}")
+            body_parts.append(body)
+            body_size += len(body) + 1
+
+        index_bytes = (" ".join(index_parts) + "\n").encode("latin-1")
+        data = index_bytes + b"\n".join(body_parts) + b"\n"
+        self.write_stream(
+            stream_id,
+            data,
+            f"/Type /ObjStm /N {len(pending)} /First {len(index_bytes)} ",
+        )
+
+    def finish(self, root_id: int, title: Optional[str] = None) -> None:
+        """
+        Write the document info, then the xref table (or stream) and trailer.
+        """
+        trailer_entries = f"/Root {root_id} 0 R"
+        if title:
+            info_id = self.reserve()
+            self.write_object(info_id, f"<< /Title ({_escape_pdf_text(title)}) >>")
+            trailer_entries += f" /Info {info_id} 0 R"
+
+        if self._compress:
+            self._flush_object_stream()
+            self._write_xref_stream(trailer_entries)
+            return
+
+        xref_start = self._position
+        size = len(self._offsets)
+        self._write(f"xref\n0 {size}\n".encode("latin-1"))
+        self._write(b"0000000000 65535 f \n")  # object 0
+        for obj_id in range(1, size):
+            self._write(f"{self._offsets[obj_id]:010d} 00000 n \n".encode("latin-1"))
 
+        trailer = (
+            "trailer\n"
+            f"<< /Size {size} {trailer_entries} >>\n"
+        )
+        self._write(_encode_pdf(trailer))
+        self._write(f"startxref\n{xref_start}\n%%EOF\n".encode("latin-1"))
+
+    def _write_xref_stream(self, trailer_entries: str) -> None:
+        xref_id = self.reserve()
+        xref_start = self._position
+        self._offsets[xref_id] = xref_start
+        size = len(self._offsets)
+
+        # Field widths: type (1 byte), offset or object stream number, and
+        # generation or index inside the object stream.
+        offset_width = max((xref_start.bit_length() + 7) // 8, 1)
+        entries = bytearray(b"\x00" + b"\x00" * offset_width + b"\xff\xff")  # object 0
+        for obj_id in range(1, size):
+            index = self._stream_index[obj_id]
+            if index == _NOT_IN_OBJECT_STREAM:
+                entries.append(1)
+                entries += self._offsets[obj_id].to_bytes(offset_width, "big")
+                entries += b"\x00\x00"
+            else:
+                entries.append(2)
+                entries += self._offsets[obj_id].to_bytes(offset_width, "big")
+                entries += index.to_bytes(2, "big")
+
+        self.write_stream(
+            xref_id,
+            bytes(entries),
+            f"/Type /XRef /Size {size} /W [1 {offset_width} 2] {trailer_entries} ",
+        )
+        self._write(f"startxref\n{xref_start}\n%%EOF\n".encode("latin-1"))
+
+
+def _page_content_stream(page_lines: List[str]) -> bytes:
+    # page_lines are laid out and already escaped (_escape_pdf_text).
+    content_text_lines = []
+    content_text_lines.append("BT")
+    content_text_lines.append(f"/F1 {_FONT_SIZE} Tf")
+    content_text_lines.append(f"{_LINE_HEIGHT} TL")
+    # Start position: (margin_left, top from bottom)
+    # PDF origin is bottom-left, so y coordinate downwards:
+    start_y = _PAGE_HEIGHT - _MARGIN_TOP
+    content_text_lines.append(f"{_MARGIN_LEFT} {start_y} Td")
+
+    # The first line is shown in place; each later line uses T* (move down
+    # by the leading set with TL) or ' (move down and show).
+    first_line = True
+    for line in page_lines:
+        if first_line:
+            if line:
+                content_text_lines.append(f"({line}) Tj")
+            first_line = False
+        elif line:
+            content_text_lines.append(f"({line}) '")
+        else:
+            content_text_lines.append("T*")
+
+    content_text_lines.append("ET")
+    return _encode_pdf("\n".join(content_text_lines) + "\n")
+
+
+class _PdfDocument:
+    """
+    A text document being streamed into a _PdfWriter. Text can be added in
+    several parts, each starting on a new page; all parts share one
+    catalog, page tree and font.
+    """
+
+    def __init__(self, sink: BinaryIO, compress: bool = False):
+        # Object numbering:
+        # 1: Catalog (written last, with outlines/page labels if any)
+        # 2: Pages (written last, once all kids are known; holds the font
+        #    resources that every page inherits)
+        # 3: Font
+        # Then for each page: page_obj_id, contents_obj_id
+        self._writer = _PdfWriter(sink, compress=compress)
+        self.catalog_id = self._writer.reserve()
+        self.pages_id = self._writer.reserve()
+        self.font_id = self._writer.reserve()
+        self._writer.write_object(
+            self.font_id, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+        )
+        self.page_obj_ids = array("I")
+
+        usable_height = _PAGE_HEIGHT - 2 * _MARGIN_TOP
+        self._max_lines_per_page = max(int(usable_height // _LINE_HEIGHT), 1)
+
+    def add_text(self, text: Union[str, Iterable[str]]) -> int:
+        """
+        Lay out `text` starting on a new page and return the index of that
+        page. Each page is written as soon as it is full.
+        """
+        if isinstance(text, str):
+            text = text.splitlines()
+        return self.add_lines(_escape_pdf_text(line) for line in _iter_layout_lines(text))
+
+    def add_lines(self, lines: Iterable[str]) -> int:
+        """
+        Like add_text, for lines that are already laid out and escaped.
+        """
+        first_page = len(self.page_obj_ids)
+        for page_lines in _iter_pages(lines, self._max_lines_per_page):
+            page_id = self._writer.reserve()
+            content_id = self._writer.reserve()
+            self.page_obj_ids.append(page_id)
+
+            self._writer.write_stream(content_id, _page_content_stream(page_lines))
+            self._writer.write_object(
+                page_id,
+                f"<< /Type /Page /Parent {self.pages_id} 0 R /Contents {content_id} 0 R >>",
+            )
+        return first_page
+
+    def _write_outlines(self, outline: List[Tuple[str, int, List[Tuple[str, int]]]]) -> int:
+        """
+        Write a two-level outline of (title, page index, children) entries,
+        where children are (title, page index) pairs. Returns the id of the
+        outline root.
+        """
+        writer = self._writer
+        root_id = writer.reserve()
+        item_ids = [writer.reserve() for _ in outline]
+        total = len(outline)
+
+        for pos, (title, page_index, children) in enumerate(outline):
+            item_id = item_ids[pos]
+            links = f"/Parent {root_id} 0 R"
+            if pos > 0:
+                links += f" /Prev {item_ids[pos - 1]} 0 R"
+            if pos < len(outline) - 1:
+                links += f" /Next {item_ids[pos + 1]} 0 R"
+
+            if children:
+                child_ids = [writer.reserve() for _ in children]
+                links += f" /First {child_ids[0]} 0 R /Last {child_ids[-1]} 0 R /Count {len(children)}"
+                total += len(children)
+                for child_pos, (child_title, child_page) in enumerate(children):
+                    child_links = f"/Parent {item_id} 0 R"
+                    if child_pos > 0:
+                        child_links += f" /Prev {child_ids[child_pos - 1]} 0 R"
+                    if child_pos < len(children) - 1:
+                        child_links += f" /Next {child_ids[child_pos + 1]} 0 R"
+                    writer.write_object(
+                        child_ids[child_pos],
+                        f"<< /Title ({_escape_pdf_text(child_title)}) {child_links} "
+                        f"/Dest [{self.page_obj_ids[child_page]} 0 R /Fit] >>",
+                    )
+
+            writer.write_object(
+                item_id,
+                f"<< /Title ({_escape_pdf_text(title)}) {links} "
+                f"/Dest [{self.page_obj_ids[page_index]} 0 R /Fit] >>",
+            )
+
+        writer.write_object(
+            root_id,
+            f"<< /Type /Outlines /First {item_ids[0]} 0 R /Last {item_ids[-1]} 0 R /Count {total} >>",
+        )
+        return root_id
+
+    def close(
+        self,
+        title: Optional[str] = None,
+        outline: Optional[List[Tuple[str, int, List[Tuple[str, int]]]]] = None,
+        page_labels: Optional[List[Tuple[int, str]]] = None,
+    ) -> None:
+        """
+        Write the page tree, catalog and xref. `page_labels` is a list of
+        (first page index, prefix) ranges, each numbered from 1.
+        """
+        if not self.page_obj_ids:
+            self.add_text("")
+
+        kids_str = " ".join(f"{pid} 0 R" for pid in self.page_obj_ids)
+        self._writer.write_object(
+            self.pages_id,
+            f"<< /Type /Pages /Kids [ {kids_str} ] /Count {len(self.page_obj_ids)} "
+            f"/MediaBox [0 0 {_PAGE_WIDTH} {_PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {self.font_id} 0 R >> >> >>",
+        )
+
+        catalog = f"/Type /Catalog /Pages {self.pages_id} 0 R"
+        if outline:
+            catalog += f" /Outlines {self._write_outlines(outline)} 0 R /PageMode /UseOutlines"
+        if page_labels:
+            nums = " ".join(
+                f"{start} << /S /D /P ({_escape_pdf_text(prefix)}) >>"
+                for start, prefix in page_labels
+            )
+            catalog += f" /PageLabels << /Nums [ {nums} ] >>"
+        self._writer.write_object(self.catalog_id, f"<< {catalog} >>")
+        self._writer.finish(self.catalog_id, title)
+
+
+def write_text_pdf(
+    text: Union[str, Iterable[str]],
+    sink: BinaryIO,
+    title: Optional[str] = None,
+    compress: bool = False,
+) -> None:
+    """
+    Stream a simple, valid PDF for plain text into a binary file-like sink.
+
+    `text` may be a string or an iterable of lines (e.g. a generator over a
+    large file). Lines are wrapped and laid out one page at a time, and each
+    page is written to the sink as soon as it is full, so memory use does
+    not depend on the number of pages.
+
+    compress=True writes a smaller PDF 1.5 file (see _PdfWriter).
+    """
+    document = _PdfDocument(sink, compress=compress)
+    document.add_text(text)
+    document.close(title)
+
+
+class PaperCompilation:
+    """
+    Write many papers (and optionally their answer keys) into one PDF.
+
+    Papers are laid out as they are added, so a batch run can stream a
+    whole class set into a single file. The document shares one catalog,
+    page tree and font, has a bookmark per paper (with "Question Paper" /
+    "Answer Key" children) and page labels such as "Paper 3: 2".
+
+        with PaperCompilation(open("class_set.pdf", "wb")) as compilation:
+            compilation.add_paper("Paper 1", qp_text, answer_key_text)
+    """
+
+    def __init__(self, sink: BinaryIO, title: Optional[str] = None, compress: bool = False):
+        self._document = _PdfDocument(sink, compress=compress)
+        self._title = title
+        self._outline: List[Tuple[str, int, List[Tuple[str, int]]]] = []
+        self._page_labels: List[Tuple[int, str]] = []
+
+    def add_paper(self, label: str, qp_text: str, answer_key_text: Optional[str] = None) -> None:
+        qp_page = self._document.add_text(qp_text)
+        self._page_labels.append((qp_page, f"{label}: "))
+        children = [("Question Paper", qp_page)]
+
+        if answer_key_text:
+            key_page = self._document.add_text(answer_key_text)
+            self._page_labels.append((key_page, f"{label} Answer Key: "))
+            children.append(("Answer Key", key_page))
+
+        self._outline.append((label, qp_page, children if answer_key_text else []))
+
+    def close(self) -> None:
+        self._document.close(self._title, self._outline, self._page_labels)
+
+    def __enter__(self) -> "PaperCompilation":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def papers_to_pdf_bytes(
+    papers: Iterable[Tuple[str, str, Optional[str]]],
+    title: Optional[str] = None,
+    compress: bool = False,
+) -> bytes:
+    """
+    Compile (label, qp_text, answer_key_text or None) papers into one PDF.
+    """
+    buffer = io.BytesIO()
+    with PaperCompilation(buffer, title=title, compress=compress) as compilation:
+        for label, qp_text, answer_key_text in papers:
+            compilation.add_paper(label, qp_text, answer_key_text)
+    return buffer.getvalue()
 
-def text_to_pdf_bytes(text: str, title: Optional[str] = None) -> bytes:
+
+def text_to_pdf_bytes(text: str, title: Optional[str] = None, compress: bool = False) -> bytes:
     """
     Create a simple, valid PDF from plain text.
 
@@ -122,159 +725,91 @@ def text_to_pdf_bytes(text: str, title: Optional[str] = None) -> bytes:
     - Wraps long lines.
     - Supports multiple pages.
     - Produces valid xref offsets.
+
+    See write_text_pdf to stream the PDF into a file instead, and for
+    `compress`.
     """
+    buffer = io.BytesIO()
+    write_text_pdf(text or "", buffer, title=title, compress=compress)
+    return buffer.getvalue()
 
-    if not text:
-        text = ""
 
-    # Prepare text lines
-    lines = _wrap_text_to_lines(text, max_chars_per_line=90)
+# ---------- PAPER PDFS FROM PRE-RENDERED FRAGMENTS ----------
 
-    # Basic A4 dimensions (points)
-    page_width = 595
-    page_height = 842
-    margin_left = 50
-    margin_top = 50
-    line_height = 14
+@functools.lru_cache(maxsize=256)
+def _header_lines(header: str) -> Tuple[str, ...]:
+    return tuple(_escape_pdf_text(line) for line in _iter_layout_lines(header.splitlines()))
 
-    usable_height = page_height - 2 * margin_top
-    max_lines_per_page = max(int(usable_height // line_height), 1)
 
-    # Split lines into pages
-    pages_lines: List[List[str]] = []
-    current_page: List[str] = []
-    for line in lines:
-        if len(current_page) >= max_lines_per_page:
-            pages_lines.append(current_page)
-            current_page = []
-        current_page.append(line)
-    if current_page:
-        pages_lines.append(current_page)
-
-    num_pages = max(len(pages_lines), 1)
-
-    # Object numbering:
-    # 1: Catalog
-    # 2: Pages
-    # 3: Font
-    # Then for each page:
-    #   page_obj_id, contents_obj_id
-    total_objects = 3 + 2 * num_pages
-
-    page_obj_ids = []
-    contents_obj_ids = []
-
-    next_id = 4
-    for _ in range(num_pages):
-        page_obj_ids.append(next_id)
-        contents_obj_ids.append(next_id + 1)
-        next_id += 2
-
-    # Helper to track offsets and build PDF
-    pdf_bytes = bytearray()
-    offsets = [0] * (total_objects + 1)  # index 0 unused but needed for xref
-
-    def _write_line(s: str):
-        pdf_bytes.extend(s.encode("latin-1"))
-
-    def _write_obj(obj_id: int, body: str):
-        offsets[obj_id] = len(pdf_bytes)
-        _write_line(f"{obj_id} 0 obj\n")
-        _write_line(body)
-        _write_line("\nendobj\n")
-
-    # PDF Header
-    _write_line("%PDF-1.4\n")
-
-    # 1: Catalog
-    catalog_body = f"<< /Type /Catalog /Pages 2 0 R >>"
-    _write_obj(1, catalog_body)
-
-    # 2: Pages (will reference page objects)
-    kids_str = " ".join(f"{pid} 0 R" for pid in page_obj_ids)
-    pages_body = f"<< /Type /Pages /Kids [ {kids_str} ] /Count {num_pages} >>"
-    _write_obj(2, pages_body)
-
-    # 3: Font (Helvetica)
-    font_body = "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
-    _write_obj(3, font_body)
-
-    # Page & content objects
-    for idx, page_lines in enumerate(pages_lines):
-        page_id = page_obj_ids[idx]
-        content_id = contents_obj_ids[idx]
-
-        # Build content stream for this page
-        content_text_lines = []
-        content_text_lines.append("BT")
-        content_text_lines.append("/F1 12 Tf")
-        # Start position: (margin_left, top from bottom)
-        # PDF origin is bottom-left, so y coordinate downwards:
-        start_y = page_height - margin_top
-        content_text_lines.append(f"{margin_left} {start_y} Td")
-
-        first_line = True
-        for line in page_lines:
-            # Escape special characters
-            escaped = (
-                line.replace("\\", "\\\\")
-                    .replace("(", "\\(")
-                    .replace(")", "\\)")
-            )
-            if first_line:
-                content_text_lines.append(f"({escaped}) Tj")
-                first_line = False
-            else:
-                content_text_lines.append(f"0 -{line_height} Td")
-                content_text_lines.append(f"({escaped}) Tj")
-
-        content_text_lines.append("ET")
-        content_stream_text = "\n".join(content_text_lines) + "\n"
-        content_stream_bytes = content_stream_text.encode("latin-1")
-        length = len(content_stream_bytes)
-
-        # Content object
-        content_body = (
-            f"<< /Length {length} >>\n"
-            f"stream\n"
-            f"{content_stream_text}"
-            f"endstream"
-        )
-        _write_obj(content_id, content_body)
-
-        # Page object
-        page_body = (
-            "<< /Type /Page /Parent 2 0 R "
-            f"/MediaBox [0 0 {page_width} {page_height}] "
-            "/Resources << /Font << /F1 3 0 R >> >> "
-            f"/Contents {content_id} 0 R >>"
-        )
-        _write_obj(page_id, page_body)
+def _numbered_lines(out: List[str], q_num: int, fragment: QuestionFragment, answer: bool) -> None:
+    first, following = fragment.pdf_lines(answer, len(str(q_num)))
+    out.append(f"{q_num}.{first}")
+    out.extend(following)
 
-    # XRef table
-    xref_start = len(pdf_bytes)
-    _write_line(f"xref\n")
-    _write_line(f"0 {total_objects + 1}\n")
-    _write_line("0000000000 65535 f \n")  # object 0
 
-    for obj_id in range(1, total_objects + 1):
-        offset = offsets[obj_id]
-        _write_line(f"{offset:010d} 00000 n \n")
+def paper_pdf_lines(
+    grade: str,
+    subject: str,
+    mcqs: List[Dict],
+    shorts: List[Dict],
+    longs: List[Dict],
+    answer_key: bool = False,
+    set_label: Optional[str] = None,
+) -> List[str]:
+    """
+    The laid-out, escaped PDF lines of render_paper's question paper (or
+    answer key), assembled from pre-rendered question fragments instead of
+    wrapping the formatted text again.
+    """
+    suffix = f" - {set_label}" if set_label else ""
+    title = "Answer Key" if answer_key else "Question Paper"
+    out = list(_header_lines(f"{grade} - {subject}\n{title}{suffix}\n{'-' * 60}\n\n".lstrip()))
 
-    # Trailer
-    if title:
-        trailer = (
-            "trailer\n"
-            f"<< /Size {total_objects + 1} /Root 1 0 R "
-            f"/Info << /Title ({title}) >> >>\n"
-        )
-    else:
-        trailer = (
-            "trailer\n"
-            f"<< /Size {total_objects + 1} /Root 1 0 R >>\n"
-        )
+    q_num = 1
+    if mcqs:
+        out += (_SECTIONS[0], "")
+        for q in mcqs:
+            fragment = question_fragment(q)
+            _numbered_lines(out, q_num, fragment, answer_key)
+            if not answer_key:
+                out.extend(fragment.pdf_options())
+                out.append("")
+            q_num += 1
+        if answer_key:
+            out.append("")
 
-    _write_line(trailer)
-    _write_line(f"startxref\n{xref_start}\n%%EOF\n")
+    for heading, questions in ((_SECTIONS[1], shorts), (_SECTIONS[2], longs)):
+        if not questions:
+            continue
+        out += (heading, "") if answer_key else ("", heading, "")
+        for q in questions:
+            _numbered_lines(out, q_num, question_fragment(q), answer_key)
+            out.append("")
+            q_num += 1
 
-    return bytes(pdf_bytes)
+    # As render_paper strips the text, drop the trailing blank lines.
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+def paper_pdf_bytes(
+    grade: str,
+    subject: str,
+    mcqs: List[Dict],
+    shorts: List[Dict],
+    longs: List[Dict],
+    answer_key: bool = False,
+    set_label: Optional[str] = None,
+    title: Optional[str] = None,
+    compress: bool = False,
+) -> bytes:
+    """
+    The same PDF as text_to_pdf_bytes on the rendered question paper (or
+    answer key), from pre-rendered fragments.
+    """
+    buffer = io.BytesIO()
+    document = _PdfDocument(buffer, compress=compress)
+    document.add_lines(paper_pdf_lines(grade, subject, mcqs, shorts, longs, answer_key, set_label))
+    document.close(title)
+    return buffer.getvalue()